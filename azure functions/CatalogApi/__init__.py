@@ -0,0 +1,96 @@
+import logging
+import json
+
+import azure.functions as func
+
+from shared_code import catalog, metrics, responses, serialization
+
+JSON_HEADERS = {
+    "Content-Type": "application/json",
+    "Access-Control-Allow-Origin": "*",
+}
+
+
+@metrics.instrument("CatalogApi")
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info("CatalogApi HTTP trigger called")
+    method = req.method.upper()
+
+    try:
+        if method == "GET":
+            return handle_get(req)
+        else:
+            return func.HttpResponse(
+                json.dumps({"error": "Method not allowed"}),
+                headers=JSON_HEADERS,
+                status_code=405,
+            )
+    except Exception as e:
+        logging.exception("Error in CatalogApi")
+        return func.HttpResponse(
+            json.dumps({"error": str(e)}),
+            headers=JSON_HEADERS,
+            status_code=500,
+        )
+
+
+def not_modified(version):
+    return func.HttpResponse(
+        status_code=304,
+        headers={
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Expose-Headers": "X-Catalog-Version, ETag",
+            "X-Catalog-Version": version,
+            "ETag": f'W/"{version}"',
+            "Cache-Control": "no-cache",
+        },
+    )
+
+
+def handle_get(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Everything a customer needs for one area in a single call:
+    the area's restaurants, each with its menu nested under "menu".
+
+    Query parameters:
+      - area    -> required, North / East / West
+      - version -> version the client already has; 304 if still current
+
+    Response:
+    {
+      "area": "North",
+      "version": "3f1c9a2b7d6e4f0a8b5c1d2e",
+      "restaurants": [{ ...restaurant, "menu": [{ ...dish }] }]
+    }
+
+    The version is also sent as ETag / X-Catalog-Version, so
+    If-None-Match works as well.
+    """
+    area = req.params.get("area")
+    if not area:
+        return func.HttpResponse(
+            json.dumps({"error": "area is required"}),
+            headers=JSON_HEADERS,
+            status_code=400,
+        )
+
+    # a client that is up to date costs one point read of the version
+    version = catalog.get_version(area)
+    if version and (req.params.get("version") == version or responses.etag_matches(req, f'W/"{version}"')):
+        return not_modified(version)
+
+    version, restaurants = catalog.get_snapshot(area)
+    if req.params.get("version") == version:
+        return not_modified(version)
+
+    headers = dict(JSON_HEADERS)
+    headers["X-Catalog-Version"] = version
+    headers["Access-Control-Expose-Headers"] = "X-Catalog-Version"
+    etag = f'W/"{version}"'
+
+    body = serialization.dumps({
+        "area": area,
+        "version": version,
+        "restaurants": restaurants,
+    })
+    return responses.cached_get_response(req, body, headers, etag=etag)
@@ -1,10 +1,22 @@
 import logging
-import os
 import json
 
-from azure.data.tables import TableServiceClient
+from azure.core.exceptions import ResourceNotFoundError
 import azure.functions as func
 
+from shared_code import (
+    bulk,
+    fanout,
+    lookup,
+    metrics,
+    odata,
+    paging,
+    projection,
+    responses,
+    storage,
+)
+from shared_code.entities import CUSTOMER as MAPPER, CUSTOMER_FIELDS as FIELDS
+
 JSON_HEADERS = {
     "Content-Type": "application/json",
     "Access-Control-Allow-Origin": "*",
@@ -12,15 +24,20 @@ JSON_HEADERS = {
 
 TABLE_NAME = "CustomerTable"
 
+# JSON fields a PUT may change -> table columns
+UPDATE_MAPPING = {
+    "name": "Name",
+    "lastName": "LastName",
+    "address": "Address",
+    "phone": "Phone",
+}
+
 
 def get_table_client():
-    connection_string = os.environ.get("AzureWebJobsStorage")
-    if not connection_string:
-        raise RuntimeError("Missing AzureWebJobsStorage setting")
-    service = TableServiceClient.from_connection_string(conn_str=connection_string)
-    return service.get_table_client(table_name=TABLE_NAME)
+    return storage.get_table_client(TABLE_NAME)
 
 
+@metrics.instrument("CustomerApi")
 def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info("CustomerApi HTTP trigger called")
     method = req.method.upper()
@@ -54,43 +71,67 @@ def handle_get(req: func.HttpRequest) -> func.HttpResponse:
     Query parameters:
       - area       -> matches PartitionKey
       - customerId -> matches RowKey / CustomerID
+      - limit -> max results per response, next page token in X-Continuation-Token
+      - continuationToken -> token from a previous response
+      - fields -> comma separated JSON fields to return, e.g. area,name
     """
     table = get_table_client()
 
+    try:
+        limit, token = paging.parse_paging(req)
+        fields, select = projection.parse_fields(req, FIELDS)
+    except ValueError as e:
+        return func.HttpResponse(
+            json.dumps({"error": str(e)}),
+            headers=JSON_HEADERS,
+            status_code=400,
+        )
+
     area = req.params.get("area")
     customer_id = req.params.get("customerId")
 
     filters = []
 
     if area:
-        filters.append(f"PartitionKey eq '{area}'")
+        filters.append(odata.eq("PartitionKey", area))
 
     if customer_id:
         # RowKey is C011, C012, etc, same as CustomerID
-        filters.append(f"RowKey eq '{customer_id}'")
-
-    filter_expr = " and ".join(filters)
-
-    if filter_expr:
-        entities = table.query_entities(query_filter=filter_expr)
+        filters.append(odata.eq("RowKey", customer_id))
+
+    filter_expr = odata.all_of(*filters)
+
+    if customer_id and not area:
+        # the lookup table names the partition: one point query instead of one per area
+        id_area = lookup.find_area(table, TABLE_NAME, customer_id)
+        pages = [] if id_area is None else paging.query_pages(
+            table,
+            query_filter=odata.all_of(odata.eq("PartitionKey", id_area), filter_expr),
+            limit=limit,
+            continuation_token=token,
+            select=select,
+        )
+    elif area or limit or token:
+        pages = paging.query_pages(
+            table,
+            query_filter=filter_expr,
+            limit=limit,
+            continuation_token=token,
+            select=select,
+        )
     else:
-        entities = table.list_entities()
-
-    result = []
-    for e in entities:
-        result.append({
-            "area": e["PartitionKey"],
-            "customerId": e["RowKey"],
-            "address": e.get("Address"),
-            "name": e.get("Name"),
-            "lastName": e.get("LastName"),
-            "phone": e.get("Phone"),
-        })
+        # full listing: every area partition at once instead of one long scan
+        pages = fanout.query_pages(table, query_filter=filter_expr, ordered=True, select=select)
+    body, next_token = paging.write_json_pages(
+        pages,
+        projection.project(MAPPER, fields),
+        limit=limit,
+    )
 
-    return func.HttpResponse(
-        json.dumps(result),
-        headers=JSON_HEADERS,
-        status_code=200,
+    return responses.cached_get_response(
+        req,
+        body,
+        paging.page_headers(JSON_HEADERS, next_token),
     )
 
 
@@ -107,6 +148,8 @@ def handle_post(req: func.HttpRequest) -> func.HttpResponse:
       "address": "IE Tower",
       "phone": "+34 600 000 000"
     }
+
+    A JSON array of such objects adds them all in one go, see handle_bulk_post.
     """
     table = get_table_client()
 
@@ -119,27 +162,21 @@ def handle_post(req: func.HttpRequest) -> func.HttpResponse:
             status_code=400,
         )
 
-    area = body.get("area")
-    customer_id = body.get("customerId")
+    if isinstance(body, list):
+        return handle_bulk_post(table, body)
 
-    if not area or not customer_id:
+    entity = build_entity(body)
+    if isinstance(entity, str):
         return func.HttpResponse(
-            json.dumps({"error": "area and customerId are required"}),
+            json.dumps({"error": entity}),
             headers=JSON_HEADERS,
             status_code=400,
         )
-
-    entity = {
-        "PartitionKey": area,
-        "RowKey": customer_id,
-        "CustomerID": customer_id,
-        "Address": body.get("address", ""),
-        "Name": body.get("name", ""),
-        "LastName": body.get("lastName", ""),
-        "Phone": body.get("phone", ""),
-    }
+    area = entity["PartitionKey"]
+    customer_id = entity["RowKey"]
 
     table.upsert_entity(entity=entity)
+    lookup.remember(TABLE_NAME, customer_id, area)
 
     return func.HttpResponse(
         json.dumps({"message": f"Customer {customer_id} created or updated in area {area}"}),
@@ -153,8 +190,11 @@ def handle_put(req: func.HttpRequest) -> func.HttpResponse:
     Edit an existing customer.
 
     Body must contain customerId.
-    Any of [area, name, lastName, address, phone] that are present
-    will be updated.
+    Any of [name, lastName, address, phone] that are present
+    will be updated. area is optional and only used to find the row
+    (it is the PartitionKey, so it cannot be changed here).
+
+    A JSON array of such objects edits them all in one go, see handle_bulk_put.
     """
     table = get_table_client()
 
@@ -167,6 +207,9 @@ def handle_put(req: func.HttpRequest) -> func.HttpResponse:
             status_code=400,
         )
 
+    if isinstance(body, list):
+        return handle_bulk_put(table, body)
+
     customer_id = body.get("customerId")
     if not customer_id:
         return func.HttpResponse(
@@ -175,32 +218,130 @@ def handle_put(req: func.HttpRequest) -> func.HttpResponse:
             status_code=400,
         )
 
-    entities = list(table.query_entities(query_filter=f"RowKey eq '{customer_id}'"))
-    if not entities:
+    # area pins the partition; without it the lookup table tells us where the row lives
+    area = body.get("area") or lookup.find_area(table, TABLE_NAME, customer_id)
+    if not area:
         return func.HttpResponse(
             json.dumps({"error": "Customer not found"}),
             headers=JSON_HEADERS,
             status_code=404,
         )
 
-    entity = entities[0]
+    entity = build_changes(body, area)
+
+    try:
+        table.update_entity(entity=entity, mode="merge")
+    except ResourceNotFoundError:
+        return func.HttpResponse(
+            json.dumps({"error": "Customer not found"}),
+            headers=JSON_HEADERS,
+            status_code=404,
+        )
+
+    return func.HttpResponse(
+        json.dumps({"message": f"Customer {customer_id} updated"}),
+        headers=JSON_HEADERS,
+        status_code=200,
+    )
+
+
+def build_entity(body):
+    """Full CustomerTable entity for a POST body, or an error message."""
+    area = body.get("area")
+    customer_id = body.get("customerId")
+
+    if not area or not customer_id:
+        return "area and customerId are required"
 
-    mapping = {
-        "area": "PartitionKey",
-        "name": "Name",
-        "lastName": "LastName",
-        "address": "Address",
-        "phone": "Phone",
+    return {
+        "PartitionKey": area,
+        "RowKey": customer_id,
+        "CustomerID": customer_id,
+        "Address": body.get("address", ""),
+        "Name": body.get("name", ""),
+        "LastName": body.get("lastName", ""),
+        "Phone": body.get("phone", ""),
     }
 
-    for json_field, table_field in mapping.items():
+
+def build_changes(body, area):
+    """Merge entity with the columns present in a PUT body."""
+    entity = {"PartitionKey": area, "RowKey": body["customerId"]}
+    for json_field, table_field in UPDATE_MAPPING.items():
         if json_field in body:
             entity[table_field] = body[json_field]
+    return entity
 
-    table.update_entity(entity=entity, mode="merge")
 
-    return func.HttpResponse(
-        json.dumps({"message": f"Customer {customer_id} updated"}),
-        headers=JSON_HEADERS,
-        status_code=200,
+def upsert_operation(item):
+    entity = build_entity(item)
+    if isinstance(entity, str):
+        return entity
+    return ("upsert", entity)
+
+
+def merge_operation(item):
+    if not item.get("customerId"):
+        return "customerId is required"
+    if not item.get("area"):
+        return "Customer not found"
+    return ("update", build_changes(item, item["area"]), {"mode": "merge"})
+
+
+def handle_bulk_post(table, items) -> func.HttpResponse:
+    """
+    Add many customers at once.
+
+    Body is a JSON array of POST bodies. Customers are written in one
+    transaction per area (100 customers each), areas in parallel.
+
+    Response (207 if any item failed):
+    {
+      "succeeded": 99,
+      "failed": 1,
+      "results": [{"index": 0, "id": "C021", "ok": true}, ...]
+    }
+    """
+    error = bulk.check_size(items)
+    if error:
+        return func.HttpResponse(
+            json.dumps({"error": error}),
+            headers=JSON_HEADERS,
+            status_code=400,
+        )
+
+    results, written = bulk.write(table, items, "customerId", upsert_operation)
+    if written:
+        lookup.remember_many(
+            TABLE_NAME,
+            [(operation[1]["RowKey"], operation[1]["PartitionKey"]) for operation in written],
+        )
+
+    body, status_code = bulk.summary(results)
+    return func.HttpResponse(json.dumps(body), headers=JSON_HEADERS, status_code=status_code)
+
+
+def handle_bulk_put(table, items) -> func.HttpResponse:
+    """
+    Edit many customers at once.
+
+    Body is a JSON array of PUT bodies. Items without area are located
+    through the lookup table in a few batched queries. Same response
+    shape as handle_bulk_post; unknown customers fail with
+    "Customer not found".
+    """
+    error = bulk.check_size(items)
+    if error:
+        return func.HttpResponse(
+            json.dumps({"error": error}),
+            headers=JSON_HEADERS,
+            status_code=400,
+        )
+
+    items = bulk.locate_areas(table, TABLE_NAME, items, "customerId")
+    results, _ = bulk.write(
+        table, items, "customerId", merge_operation, not_found="Customer not found"
     )
+
+    body, status_code = bulk.summary(results)
+    return func.HttpResponse(json.dumps(body), headers=JSON_HEADERS, status_code=status_code)
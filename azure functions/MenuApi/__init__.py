@@ -1,10 +1,26 @@
 import logging
-import os
 import json
 
-from azure.data.tables import TableServiceClient
+from azure.core.exceptions import ResourceNotFoundError
 import azure.functions as func
 
+from shared_code import (
+    bulk,
+    cache,
+    catalog,
+    dish_index,
+    fanout,
+    lookup,
+    metrics,
+    odata,
+    paging,
+    projection,
+    responses,
+    search_index,
+    storage,
+)
+from shared_code.entities import DISH as MAPPER, DISH_FIELDS as FIELDS
+
 JSON_HEADERS = {
     "Content-Type": "application/json",
     "Access-Control-Allow-Origin": "*",
@@ -12,15 +28,27 @@ JSON_HEADERS = {
 
 TABLE_NAME = "MenuTable"
 
+# per-worker cache of GET results, invalidated by this worker's writes
+CATALOG_CACHE = cache.catalog_cache()
+metrics.register_stats("MenuApi.catalog_cache", CATALOG_CACHE.stats)
+
+# JSON fields a PUT may change -> table columns
+UPDATE_MAPPING = {
+    "name": "Name",
+    "description": "Description",
+    "price": "Price",
+    "restaurantId": "RestaurantID",
+    "imageURL": "ImageURL",
+    "isAvailable": "IsAvailable",
+    "prepTime": "PrepTime",
+}
+
 
 def get_table_client():
-    connection_string = os.environ.get("AzureWebJobsStorage")
-    if not connection_string:
-        raise RuntimeError("Missing AzureWebJobsStorage setting")
-    service = TableServiceClient.from_connection_string(conn_str=connection_string)
-    return service.get_table_client(table_name=TABLE_NAME)
+    return storage.get_table_client(TABLE_NAME)
 
 
+@metrics.instrument("MenuApi")
 def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info("MenuApi HTTP trigger called")
     method = req.method.upper()
@@ -57,9 +85,22 @@ def handle_get(req: func.HttpRequest) -> func.HttpResponse:
       - area      -> matches PartitionKey
       - dishId    -> matches RowKey / DishID
       - max_price -> filters by Price <= max_price
+      - limit -> max results per response, next page token in X-Continuation-Token
+      - continuationToken -> token from a previous response
+      - fields -> comma separated JSON fields to return, e.g. area,name
     """
     table = get_table_client()
 
+    try:
+        limit, token = paging.parse_paging(req)
+        fields, select = projection.parse_fields(req, FIELDS)
+    except ValueError as e:
+        return func.HttpResponse(
+            json.dumps({"error": str(e)}),
+            headers=JSON_HEADERS,
+            status_code=400,
+        )
+
     area = req.params.get("area")
     dish_id = req.params.get("dishId")
     max_price = req.params.get("max_price")
@@ -67,15 +108,15 @@ def handle_get(req: func.HttpRequest) -> func.HttpResponse:
     filters = []
 
     if area:
-        filters.append(f"PartitionKey eq '{area}'")
+        filters.append(odata.eq("PartitionKey", area))
 
     if dish_id:
-        filters.append(f"RowKey eq '{dish_id}'")
+        filters.append(odata.eq("RowKey", dish_id))
 
     if max_price:
         try:
             price_val = float(max_price)
-            filters.append(f"Price le {price_val}")
+            filters.append(odata.compare("Price", "le", price_val))
         except ValueError:
             return func.HttpResponse(
                 json.dumps({"error": "max_price must be a number"}),
@@ -83,31 +124,59 @@ def handle_get(req: func.HttpRequest) -> func.HttpResponse:
                 status_code=400,
             )
 
-    filter_expr = " and ".join(filters)
+    filter_expr = odata.all_of(*filters)
 
-    if filter_expr:
-        entities = table.query_entities(query_filter=filter_expr)
-    else:
-        entities = table.list_entities()
-
-    result = []
-    for e in entities:
-        result.append({
-            "area": e["PartitionKey"],
-            "dishId": e["RowKey"],            # same as DishID
-            "description": e.get("Description"),
-            "name": e.get("Name"),
-            "price": e.get("Price"),
-            "restaurantId": e.get("RestaurantID"),
-            "imageURL": e.get("ImageURL"),
-            "isAvailable": e.get("IsAvailable"),
-            "prepTime": e.get("PrepTime"),
-        })
+    cache_key = (
+        area or None,
+        filter_expr,
+        tuple(fields or ()),
+        limit,
+        req.params.get("continuationToken"),
+    )
+    cached = CATALOG_CACHE.get(cache_key)
+    if cached is not None:
+        body, next_token, etag = cached
+        return responses.cached_get_response(
+            req,
+            body,
+            dict(paging.page_headers(JSON_HEADERS, next_token), **{"X-Cache": "HIT"}),
+            etag=etag,
+        )
 
-    return func.HttpResponse(
-        json.dumps(result),
-        headers=JSON_HEADERS,
-        status_code=200,
+    if dish_id and not area:
+        # the lookup table names the partition: one point query instead of one per area
+        id_area = lookup.find_area(table, TABLE_NAME, dish_id)
+        pages = [] if id_area is None else paging.query_pages(
+            table,
+            query_filter=odata.all_of(odata.eq("PartitionKey", id_area), filter_expr),
+            limit=limit,
+            continuation_token=token,
+            select=select,
+        )
+    elif area or limit or token:
+        pages = paging.query_pages(
+            table,
+            query_filter=filter_expr,
+            limit=limit,
+            continuation_token=token,
+            select=select,
+        )
+    else:
+        # full listing: every area partition at once instead of one long scan
+        pages = fanout.query_pages(table, query_filter=filter_expr, ordered=True, select=select)
+    body, next_token = paging.write_json_pages(
+        pages,
+        projection.project(MAPPER, fields),
+        limit=limit,
+    )
+    etag = responses.make_etag(body)
+    CATALOG_CACHE.set(cache_key, (body, next_token, etag))
+
+    return responses.cached_get_response(
+        req,
+        body,
+        dict(paging.page_headers(JSON_HEADERS, next_token), **{"X-Cache": "MISS"}),
+        etag=etag,
     )
 
 
@@ -127,6 +196,8 @@ def handle_post(req: func.HttpRequest) -> func.HttpResponse:
       "isAvailable": true,
       "prepTime": 20
     }
+
+    A JSON array of such objects adds them all in one go, see handle_bulk_post.
     """
     table = get_table_client()
 
@@ -139,30 +210,28 @@ def handle_post(req: func.HttpRequest) -> func.HttpResponse:
             status_code=400,
         )
 
-    area = body.get("area")
-    dish_id = body.get("dishId")
+    if isinstance(body, list):
+        return handle_bulk_post(table, body)
 
-    if not area or not dish_id:
+    entity = build_entity(body)
+    if isinstance(entity, str):
         return func.HttpResponse(
-            json.dumps({"error": "area and dishId are required"}),
+            json.dumps({"error": entity}),
             headers=JSON_HEADERS,
             status_code=400,
         )
+    area = entity["PartitionKey"]
+    dish_id = entity["RowKey"]
 
-    entity = {
-        "PartitionKey": area,
-        "RowKey": dish_id,
-        "DishID": dish_id,
-        "Name": body.get("name", ""),
-        "Description": body.get("description", ""),
-        "Price": body.get("price", 0),
-        "RestaurantID": body.get("restaurantId", ""),
-        "ImageURL": body.get("imageURL", ""),
-        "IsAvailable": body.get("isAvailable", True),
-        "PrepTime": body.get("prepTime", 0),
-    }
-
+    # an existing dish may be moving to another restaurant
+    previous_restaurant = get_restaurant_id(table, area, dish_id)
     table.upsert_entity(entity=entity)
+    cache.invalidate_areas(CATALOG_CACHE, area)
+    dish_index.remember(entity)
+    search_index.add_dish(entity)
+    lookup.remember(TABLE_NAME, dish_id, area)
+    for restaurant_id in sorted({previous_restaurant, entity["RestaurantID"]} - {None, ""}):
+        catalog.safe_refresh(catalog.refresh_restaurant, area, restaurant_id)
 
     return func.HttpResponse(
         json.dumps({"message": f"Dish {dish_id} created or updated in area {area}"}),
@@ -176,8 +245,12 @@ def handle_put(req: func.HttpRequest) -> func.HttpResponse:
     Edit an existing meal.
 
     Body must contain dishId.
-    Any of [area, name, description, price, restaurantId,
+    Any of [name, description, price, restaurantId,
     imageURL, isAvailable, prepTime] that are present will be updated.
+    area is optional and only used to find the row (it is the PartitionKey,
+    so it cannot be changed here).
+
+    A JSON array of such objects edits them all in one go, see handle_bulk_put.
     """
     table = get_table_client()
 
@@ -190,6 +263,9 @@ def handle_put(req: func.HttpRequest) -> func.HttpResponse:
             status_code=400,
         )
 
+    if isinstance(body, list):
+        return handle_bulk_put(table, body)
+
     dish_id = body.get("dishId")
     if not dish_id:
         return func.HttpResponse(
@@ -198,33 +274,36 @@ def handle_put(req: func.HttpRequest) -> func.HttpResponse:
             status_code=400,
         )
 
-    entities = list(table.query_entities(query_filter=f"RowKey eq '{dish_id}'"))
-    if not entities:
+    # area pins the partition; without it the lookup table tells us where the row lives
+    area = body.get("area") or lookup.find_area(table, TABLE_NAME, dish_id)
+    if not area:
         return func.HttpResponse(
             json.dumps({"error": "Dish not found"}),
             headers=JSON_HEADERS,
             status_code=404,
         )
 
-    entity = entities[0]
-
-    # Mapping from JSON fields to table columns
-    mapping = {
-        "area": "PartitionKey",
-        "name": "Name",
-        "description": "Description",
-        "price": "Price",
-        "restaurantId": "RestaurantID",
-        "imageURL": "ImageURL",
-        "isAvailable": "IsAvailable",
-        "prepTime": "PrepTime",
-    }
+    entity = build_changes(body, area)
+    # the dish may be leaving another restaurant's menu
+    previous_restaurant = get_restaurant_id(table, area, dish_id) if "restaurantId" in body else None
 
-    for json_field, table_field in mapping.items():
-        if json_field in body:
-            entity[table_field] = body[json_field]
+    try:
+        table.update_entity(entity=entity, mode="merge")
+    except ResourceNotFoundError:
+        return func.HttpResponse(
+            json.dumps({"error": "Dish not found"}),
+            headers=JSON_HEADERS,
+            status_code=404,
+        )
 
-    table.update_entity(entity=entity, mode="merge")
+    cache.invalidate_areas(CATALOG_CACHE, area)
+    dish_index.forget(dish_id)
+    search_index.update_dish(entity)
+    if "restaurantId" in body:
+        for restaurant_id in sorted({previous_restaurant, entity["RestaurantID"]} - {None, ""}):
+            catalog.safe_refresh(catalog.refresh_restaurant, area, restaurant_id)
+    else:
+        catalog.safe_refresh(catalog.refresh_dish, area, dish_id)
 
     return func.HttpResponse(
         json.dumps({"message": f"Dish {dish_id} updated"}),
@@ -238,7 +317,8 @@ def handle_delete(req: func.HttpRequest) -> func.HttpResponse:
     
     Expected JSON body:
     {
-      "dishId": "D021"
+      "dishId": "D021",
+      "area": "East"        (optional, skips the lookup)
     }
     """
     table = get_table_client()
@@ -260,22 +340,176 @@ def handle_delete(req: func.HttpRequest) -> func.HttpResponse:
             status_code=400,
         )
     
-    # find the entity first to get partition key
-    entities = list(table.query_entities(query_filter=f"RowKey eq '{dish_id}'"))
-    if not entities:
+    # find the partition key: from the body, else from the lookup table
+    area = body.get("area") or lookup.find_area(table, TABLE_NAME, dish_id)
+    if not area:
         return func.HttpResponse(
             json.dumps({"error": "Dish not found"}),
             headers=JSON_HEADERS,
             status_code=404,
         )
     
-    entity = entities[0]
-    
+    # delete_entity does not fail for a missing row, so read it first;
+    # the read also names the one menu the snapshot has to drop it from
+    try:
+        dish = table.get_entity(partition_key=area, row_key=dish_id, select=["RestaurantID"])
+    except ResourceNotFoundError:
+        if not body.get("area"):
+            # the lookup row outlived the dish
+            lookup.forget(TABLE_NAME, dish_id)
+        return func.HttpResponse(
+            json.dumps({"error": "Dish not found"}),
+            headers=JSON_HEADERS,
+            status_code=404,
+        )
+
     # delete the entity (need partition key and row key)
-    table.delete_entity(partition_key=entity["PartitionKey"], row_key=entity["RowKey"])
+    table.delete_entity(partition_key=area, row_key=dish_id)
+    lookup.forget(TABLE_NAME, dish_id)
+    dish_index.forget(dish_id)
+    search_index.remove_dish(dish_id)
+    cache.invalidate_areas(CATALOG_CACHE, area)
+    if dish.get("RestaurantID"):
+        catalog.safe_refresh(catalog.refresh_restaurant, area, dish["RestaurantID"])
     
     return func.HttpResponse(
         json.dumps({"message": f"Dish {dish_id} deleted"}),
         headers=JSON_HEADERS,
         status_code=200,
     )
+
+
+def get_restaurant_id(table, area, dish_id):
+    """RestaurantID of a stored dish, or None if it does not exist."""
+    try:
+        return table.get_entity(partition_key=area, row_key=dish_id, select=["RestaurantID"]).get("RestaurantID")
+    except ResourceNotFoundError:
+        return None
+
+
+def build_entity(body):
+    """Full MenuTable entity for a POST body, or an error message."""
+    area = body.get("area")
+    dish_id = body.get("dishId")
+
+    if not area or not dish_id:
+        return "area and dishId are required"
+
+    return {
+        "PartitionKey": area,
+        "RowKey": dish_id,
+        "DishID": dish_id,
+        "Name": body.get("name", ""),
+        "Description": body.get("description", ""),
+        "Price": body.get("price", 0),
+        "RestaurantID": body.get("restaurantId", ""),
+        "ImageURL": body.get("imageURL", ""),
+        "IsAvailable": body.get("isAvailable", True),
+        "PrepTime": body.get("prepTime", 0),
+    }
+
+
+def build_changes(body, area):
+    """Merge entity with the columns present in a PUT body."""
+    entity = {"PartitionKey": area, "RowKey": body["dishId"]}
+    for json_field, table_field in UPDATE_MAPPING.items():
+        if json_field in body:
+            entity[table_field] = body[json_field]
+    return entity
+
+
+def upsert_operation(item):
+    entity = build_entity(item)
+    if isinstance(entity, str):
+        return entity
+    return ("upsert", entity)
+
+
+def merge_operation(item):
+    if not item.get("dishId"):
+        return "dishId is required"
+    if not item.get("area"):
+        return "Dish not found"
+    return ("update", build_changes(item, item["area"]), {"mode": "merge"})
+
+
+def handle_bulk_post(table, items) -> func.HttpResponse:
+    """
+    Add many meals at once, e.g. a restaurant's whole menu.
+
+    Body is a JSON array of POST bodies. Dishes are written in one
+    transaction per area (100 dishes each), areas in parallel.
+
+    Response (207 if any item failed):
+    {
+      "succeeded": 59,
+      "failed": 1,
+      "results": [{"index": 0, "id": "D021", "ok": true}, ...]
+    }
+    """
+    error = bulk.check_size(items)
+    if error:
+        return func.HttpResponse(
+            json.dumps({"error": error}),
+            headers=JSON_HEADERS,
+            status_code=400,
+        )
+
+    # dishes that existed before may have moved to another restaurant
+    dish_ids = [item.get("dishId") for item in items if isinstance(item, dict) and item.get("dishId")]
+    known = lookup.resolve_many(TABLE_NAME, dish_ids)
+
+    results, written = bulk.write(table, items, "dishId", upsert_operation)
+
+    entities = [operation[1] for operation in written]
+    if entities:
+        lookup.remember_many(TABLE_NAME, [(e["RowKey"], e["PartitionKey"]) for e in entities])
+        cache.invalidate_areas(CATALOG_CACHE, *{e["PartitionKey"] for e in entities})
+        for entity in entities:
+            dish_index.remember(entity)
+            search_index.add_dish(entity)
+        # one area rebuild is two queries; new dishes only touch their restaurants
+        rebuilt = sorted({e["PartitionKey"] for e in entities if e["RowKey"] in known})
+        for area in rebuilt:
+            catalog.safe_refresh(catalog.refresh_area, area)
+        for area, restaurant_id in sorted({(e["PartitionKey"], e["RestaurantID"]) for e in entities}):
+            if restaurant_id and area not in rebuilt:
+                catalog.safe_refresh(catalog.refresh_restaurant, area, restaurant_id)
+
+    body, status_code = bulk.summary(results)
+    return func.HttpResponse(json.dumps(body), headers=JSON_HEADERS, status_code=status_code)
+
+
+def handle_bulk_put(table, items) -> func.HttpResponse:
+    """
+    Edit many meals at once.
+
+    Body is a JSON array of PUT bodies. Items without area are located
+    through the lookup table in a few batched queries. Same response
+    shape as handle_bulk_post; unknown dishes fail with "Dish not found".
+    """
+    error = bulk.check_size(items)
+    if error:
+        return func.HttpResponse(
+            json.dumps({"error": error}),
+            headers=JSON_HEADERS,
+            status_code=400,
+        )
+
+    items = bulk.locate_areas(table, TABLE_NAME, items, "dishId")
+    results, written = bulk.write(
+        table, items, "dishId", merge_operation, not_found="Dish not found"
+    )
+
+    for operation in written:
+        dish_index.forget(operation[1]["RowKey"])
+        search_index.update_dish(operation[1])
+
+    areas = sorted({operation[1]["PartitionKey"] for operation in written})
+    if areas:
+        cache.invalidate_areas(CATALOG_CACHE, *areas)
+        for area in areas:
+            catalog.safe_refresh(catalog.refresh_area, area)
+
+    body, status_code = bulk.summary(results)
+    return func.HttpResponse(json.dumps(body), headers=JSON_HEADERS, status_code=status_code)
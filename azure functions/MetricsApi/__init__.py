@@ -0,0 +1,90 @@
+import logging
+import json
+
+import azure.functions as func
+
+from shared_code import (
+    aio_storage,
+    dish_index,
+    fanout,
+    idempotency,
+    metrics,
+    publisher,
+    search_index,
+    startup,
+    storage,
+)
+
+JSON_HEADERS = {
+    "Content-Type": "application/json",
+    "Access-Control-Allow-Origin": "*",
+    "Cache-Control": "no-store",
+}
+
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info("MetricsApi HTTP trigger called")
+    method = req.method.upper()
+
+    try:
+        if method == "GET":
+            return handle_get(req)
+        else:
+            return func.HttpResponse(
+                json.dumps({"error": "Method not allowed"}),
+                headers=JSON_HEADERS,
+                status_code=405,
+            )
+    except Exception as e:
+        logging.exception("Error in MetricsApi")
+        return func.HttpResponse(
+            json.dumps({"error": str(e)}),
+            headers=JSON_HEADERS,
+            status_code=500,
+        )
+
+
+def handle_get(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Timings and cache / pool counters of the worker that answers.
+
+    Every worker process keeps its own numbers, so with several workers
+    each call shows one of them (see "pid").
+
+    Response:
+    {
+      "pid": 4242,
+      "uptime_seconds": 812.4,
+      "window_minutes": 5,
+      "functions": {
+        "RestaurantApi": {
+          "GET": {
+            "phases": {"query": {"count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "buckets"}, ...},
+            "counters": {"entities": 1200, "bytes": 345678}
+          }
+        }
+      },
+      "stats": {"storage_pool": {...}, "publisher": {...}, ...},
+      "startup": {"imports": {...}, "functions": {...}, "warmup": {...}}
+    }
+
+    p50/p95/p99 are the upper bound of the histogram bucket the
+    percentile falls in. "startup" is the cold start profile of the
+    worker (see shared_code/startup.py).
+    """
+    snapshot = metrics.snapshot()
+    snapshot["stats"].update({
+        "storage_pool": storage.get_pool_stats(),
+        "aio_storage_pool": aio_storage.get_pool_stats(),
+        "publisher": publisher.get_stats(),
+        "dish_index": dish_index.get_stats(),
+        "search_index": search_index.get_stats(),
+        "idempotency_cache": idempotency.get_stats(),
+        "area_cache": fanout.get_cache_stats(),
+    })
+    snapshot["startup"] = startup.snapshot()
+    return func.HttpResponse(
+        json.dumps(snapshot),
+        headers=JSON_HEADERS,
+        status_code=200,
+    )
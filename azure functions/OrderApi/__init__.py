@@ -1,12 +1,30 @@
+import asyncio
 import logging
-import os
 import json
+import os
 from datetime import datetime
 
-from azure.data.tables import TableServiceClient
-from azure.storage.queue import QueueClient
+from azure.core.exceptions import ResourceNotFoundError
 import azure.functions as func
 
+from shared_code import (
+    aio_storage,
+    customer_orders,
+    fanout,
+    idempotency,
+    lookup,
+    metrics,
+    odata,
+    paging,
+    pending_orders,
+    projection,
+    publisher,
+    quotes,
+    responses,
+    storage,
+)
+from shared_code.entities import ORDER as MAPPER, ORDER_FIELDS as FIELDS, order_to_json as entity_to_json
+
 JSON_HEADERS = {
     "Content-Type": "application/json",
     "Access-Control-Allow-Origin": "*",
@@ -15,24 +33,13 @@ JSON_HEADERS = {
 TABLE_NAME = "OrderTable"
 QUEUE_NAME = "invalid-orders-queue"
 
+# POST runs on the aio clients with its storage writes in parallel;
+# ASYNC_STORAGE=0 falls back to the sync handler on a worker thread
+ASYNC_STORAGE = os.environ.get("ASYNC_STORAGE", "1") == "1"
+
 
 def get_table_client():
-    connection_string = os.environ.get("AzureWebJobsStorage")
-    if not connection_string:
-        raise RuntimeError("Missing AzureWebJobsStorage setting")
-    service = TableServiceClient.from_connection_string(conn_str=connection_string)
-    return service.get_table_client(table_name=TABLE_NAME)
-
-
-def get_queue_client():
-    """Create a Queue client for storing invalid orders"""
-    connection_string = os.environ.get("AzureWebJobsStorage")
-    if not connection_string:
-        raise RuntimeError("Missing AzureWebJobsStorage setting")
-    return QueueClient.from_connection_string(
-        conn_str=connection_string,
-        queue_name=QUEUE_NAME
-    )
+    return storage.get_table_client(TABLE_NAME)
 
 
 def validate_order(body):
@@ -92,6 +99,28 @@ def validate_order(body):
     return is_valid, errors
 
 
+def validate_dishes(body):
+    """
+    Check that every dish in the cart exists and is available.
+
+    All dish ids are resolved in one pass over the cached dish index
+    (misses cost one batched query, not one read per dish).
+    Returns a list of error messages, empty when the cart is fine.
+    """
+    errors = []
+    dishes = body.get("dishesOrdered")
+    if not quotes.cart_lines(dishes):
+        errors.append("'dishesOrdered' has no valid dish ids")
+        return errors
+
+    result = quotes.quote(body.get("area"), dishes)
+    if result["unknownDishes"]:
+        errors.append(f"Unknown dishes: {', '.join(result['unknownDishes'])}")
+    if result["unavailableDishes"]:
+        errors.append(f"Dishes not available: {', '.join(result['unavailableDishes'])}")
+    return errors
+
+
 def send_to_invalid_queue(body, errors, request_info=None):
     """
     Send invalid order to Azure Queue Storage
@@ -100,42 +129,44 @@ def send_to_invalid_queue(body, errors, request_info=None):
         body: The invalid order data
         errors: List of validation error messages
         request_info: Additional request metadata (optional)
+
+    Only buffers the message: a background thread sends it (see
+    shared_code/publisher.py), so the 400 goes out right away.
     """
     try:
-        queue_client = get_queue_client()
-        
-        # Prepare message with all relevant info
-        invalid_order_message = {
-            "timestamp": datetime.utcnow().isoformat(),
-            "validationErrors": errors,
-            "originalRequest": body,
-            "requestInfo": request_info or {}
-        }
-        
-        # Convert to JSON string
-        message_content = json.dumps(invalid_order_message)
-        
-        # Send to queue
-        queue_client.send_message(message_content)
-        
-        logging.info(f"Invalid order sent to queue: {errors}")
-        
+        if publisher.get_publisher(QUEUE_NAME).publish(invalid_order_message(body, errors, request_info)):
+            logging.info(f"Invalid order queued for sending: {errors}")
+
     except Exception as e:
         logging.error(f"Failed to send message to queue: {str(e)}")
         # Don't raise - we still want to return error to user even if queue fails
 
 
-def main(req: func.HttpRequest) -> func.HttpResponse:
+def invalid_order_message(body, errors, request_info=None):
+    """Queue message (JSON string) describing a rejected order."""
+    return json.dumps({
+        "timestamp": datetime.utcnow().isoformat(),
+        "validationErrors": errors,
+        "originalRequest": body,
+        "requestInfo": request_info or {}
+    })
+
+
+@metrics.instrument("OrderApi")
+async def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info("OrderApi HTTP trigger called")
     method = req.method.upper()
 
     try:
+        # sync handlers run on a thread so they never block the event loop
         if method == "GET":
-            return handle_get(req)
+            return await asyncio.to_thread(handle_get, req)
+        elif method == "POST" and req.params.get("action") == "quote":
+            return await asyncio.to_thread(handle_quote, req)
         elif method == "POST":
-            return handle_post(req)
+            return await handle_post_once(req)
         elif method == "PUT":
-            return handle_put(req)
+            return await asyncio.to_thread(handle_put, req)
         else:
             return func.HttpResponse(
                 json.dumps({"error": "Method not allowed"}),
@@ -151,60 +182,193 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         )
 
 
+async def post_order(req):
+    if ASYNC_STORAGE:
+        return await handle_post_async(req)
+    return await asyncio.to_thread(handle_post, req)
+
+
+async def handle_post_once(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    POST with an optional Idempotency-Key header.
+
+    The first request with a key runs normally and its response is
+    stored; retries with the same key and body get that response back
+    (Idempotent-Replayed: true) without validating or writing again.
+    5xx responses are not stored, so the retry runs for real.
+    """
+    key = req.headers.get(idempotency.HEADER)
+    if key is None:
+        return await post_order(req)
+
+    error = idempotency.check_key(key)
+    if error:
+        return func.HttpResponse(
+            json.dumps({"error": error}),
+            headers=JSON_HEADERS,
+            status_code=400,
+        )
+
+    claim = await asyncio.to_thread(idempotency.claim, "OrderApi", key, req.get_body())
+    if claim.conflict:
+        return func.HttpResponse(
+            json.dumps({"error": claim.conflict}),
+            headers=JSON_HEADERS,
+            status_code=claim.status_code,
+        )
+    if claim.replay:
+        status_code, body = claim.replay
+        headers = dict(JSON_HEADERS)
+        headers["Idempotent-Replayed"] = "true"
+        headers["Access-Control-Expose-Headers"] = "Idempotent-Replayed"
+        return func.HttpResponse(body, headers=headers, status_code=status_code)
+
+    try:
+        response = await post_order(req)
+    except Exception:
+        await asyncio.to_thread(idempotency.release, claim)
+        raise
+
+    if response.status_code >= 500:
+        await asyncio.to_thread(idempotency.release, claim)
+    else:
+        await asyncio.to_thread(idempotency.complete, claim, response.status_code, response.get_body())
+    return response
+
+
+def history_to_json(e):
+    return entity_to_json(customer_orders.to_order_entity(e))
+
+
 def handle_get(req: func.HttpRequest) -> func.HttpResponse:
     """
     Show orders.
 
     Query parameters:
-      - customerId -> list all orders for that customer
+      - customerId -> list all orders for that customer, newest first
       - orderId    -> get one order
       - area       -> optional filter by PartitionKey
+      - limit -> max results per response, next page token in X-Continuation-Token
+      - continuationToken -> token from a previous response
+      - fields -> comma separated JSON fields to return, e.g. area,name
     """
     table = get_table_client()
 
+    try:
+        limit, token = paging.parse_paging(req)
+        fields, select = projection.parse_fields(req, FIELDS)
+    except ValueError as e:
+        return func.HttpResponse(
+            json.dumps({"error": str(e)}),
+            headers=JSON_HEADERS,
+            status_code=400,
+        )
+
     customer_id = req.params.get("customerId")
     order_id = req.params.get("orderId")
     area = req.params.get("area")
 
+    if customer_id and not order_id:
+        # order history: single-partition range query on the customer index
+        customer_orders.ensure_backfilled(table, customer_id)
+        pages = customer_orders.query_pages(
+            customer_id,
+            area=area,
+            limit=limit,
+            continuation_token=token,
+            select=select,
+        )
+        body, next_token = paging.write_json_pages(
+            pages,
+            projection.project(history_to_json, fields),
+            limit=limit,
+        )
+        return responses.cached_get_response(
+            req,
+            body,
+            paging.page_headers(JSON_HEADERS, next_token),
+        )
+
     filters = []
 
     if area:
-        filters.append(f"PartitionKey eq '{area}'")
+        filters.append(odata.eq("PartitionKey", area))
 
     if customer_id:
-        filters.append(f"CustomerID eq '{customer_id}'")
+        filters.append(odata.eq("CustomerID", customer_id))
 
     if order_id:
-        filters.append(f"RowKey eq '{order_id}'")
+        filters.append(odata.eq("RowKey", order_id))
+
+    filter_expr = odata.all_of(*filters)
+
+    if order_id and not area:
+        # the lookup table names the partition: one point query instead of one per area
+        id_area = lookup.find_area(table, TABLE_NAME, order_id)
+        pages = [] if id_area is None else paging.query_pages(
+            table,
+            query_filter=odata.all_of(odata.eq("PartitionKey", id_area), filter_expr),
+            limit=limit,
+            continuation_token=token,
+            select=select,
+        )
+    elif area or limit or token:
+        pages = paging.query_pages(
+            table,
+            query_filter=filter_expr,
+            limit=limit,
+            continuation_token=token,
+            select=select,
+        )
+    else:
+        # full listing: every area partition at once instead of one long scan
+        pages = fanout.query_pages(table, query_filter=filter_expr, ordered=True, select=select)
+    body, next_token = paging.write_json_pages(
+        pages,
+        projection.project(MAPPER, fields),
+        limit=limit,
+    )
 
-    filter_expr = " and ".join(filters)
+    return responses.cached_get_response(
+        req,
+        body,
+        paging.page_headers(JSON_HEADERS, next_token),
+    )
 
-    if filter_expr:
-        entities = table.query_entities(query_filter=filter_expr)
-    else:
-        entities = table.list_entities()
 
-    result = []
-    for e in entities:
-        # DishesOrdered is probably stored as a string like "[D001, D002]"
-        dishes_raw = e.get("DishesOrdered")
-        try:
-            # try to parse JSON if stored that way
-            dishes = json.loads(dishes_raw) if isinstance(dishes_raw, str) else dishes_raw
-        except Exception:
-            dishes = dishes_raw
-
-        result.append({
-            "area": e["PartitionKey"],
-            "orderId": e.get("OrderID") or e["RowKey"],
-            "customerId": e.get("CustomerID"),
-            "dishesOrdered": dishes,
-            "estimatedTime": e.get("EstimatedTime"),
-            "estimatedArrival": e.get("EstimatedArrival"),
-            "totalCost": e.get("TotalCost"),
-            "status": e.get("Status"),
-        })
+def handle_quote(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Price and time a cart without placing the order (POST ?action=quote).
+
+    Expected JSON body:
+    {
+      "area": "North",                 (the customer's area)
+      "dishesOrdered": [{"dishId": "D007", "quantity": 2}, "D021"]
+    }
+
+    Response: see quotes.quote, plus totalCost formatted as the order
+    POST stores it under "totalCostText".
+    """
+    try:
+        body = req.get_json()
+    except ValueError:
+        return func.HttpResponse(
+            json.dumps({"error": "Invalid JSON body"}),
+            headers=JSON_HEADERS,
+            status_code=400,
+        )
 
+    area = body.get("area")
+    dishes = body.get("dishesOrdered")
+    if not area or not isinstance(dishes, list):
+        return func.HttpResponse(
+            json.dumps({"error": "area and a dishesOrdered list are required"}),
+            headers=JSON_HEADERS,
+            status_code=400,
+        )
+
+    result = quotes.quote(area, dishes)
+    result["totalCostText"] = quotes.format_cost(result["totalCost"])
     return func.HttpResponse(
         json.dumps(result),
         headers=JSON_HEADERS,
@@ -212,38 +376,53 @@ def handle_get(req: func.HttpRequest) -> func.HttpResponse:
     )
 
 
-def handle_post(req: func.HttpRequest) -> func.HttpResponse:
+def apply_quote(body):
     """
-    Add a new order.
-    
-    NOW WITH VALIDATION: Invalid orders are sent to Azure Queue Storage.
+    Replace the client's estimatedTime / totalCost with the server's numbers.
 
-    Expected JSON body, example:
-    {
-      "area": "North",
-      "orderId": "O002",
-      "customerId": "C001",
-      "dishesOrdered": ["D007", "D021"],
-      "estimatedTime": 35,
-      "estimatedArrival": "2025-11-26T11:30:00",
-      "totalCost": "19.80€",
-      "status": "Pending"
-    }
+    Keeps the client values when the cart has dishes the menu doesn't
+    know, or the dish index can't be read, rather than losing the order.
     """
-    table = get_table_client()
+    try:
+        result = quotes.quote(body.get("area"), body.get("dishesOrdered"))
+    except Exception as e:
+        logging.error(f"Could not quote order {body.get('orderId')}: {e}")
+        return body
+
+    if not result["items"] or result["unknownDishes"]:
+        logging.warning(
+            f"Order {body.get('orderId')} has unknown dishes {result['unknownDishes']}, "
+            "keeping client estimatedTime / totalCost"
+        )
+        return body
+
+    return dict(
+        body,
+        estimatedTime=result["estimatedTime"],
+        totalCost=quotes.format_cost(result["totalCost"]),
+    )
+
 
+def read_order(req):
+    """
+    Parse and validate an order POST.
+
+    Returns (body, None) for a valid order. For an invalid one returns
+    (queue_args, response): the send_to_invalid_queue arguments and the
+    400 response for the client.
+    """
     # Parse request body
     try:
         body = req.get_json()
     except ValueError:
         # Invalid JSON - send to queue
         error_msg = "Invalid JSON body"
-        send_to_invalid_queue(
-            body=None,
-            errors=[error_msg],
-            request_info={"raw_body": req.get_body().decode('utf-8', errors='replace')}
-        )
-        return func.HttpResponse(
+        queue_args = {
+            "body": None,
+            "errors": [error_msg],
+            "request_info": {"raw_body": req.get_body().decode('utf-8', errors='replace')},
+        }
+        return queue_args, func.HttpResponse(
             json.dumps({
                 "error": error_msg,
                 "message": "Invalid request logged to queue"
@@ -254,20 +433,20 @@ def handle_post(req: func.HttpRequest) -> func.HttpResponse:
 
     # VALIDATE THE ORDER
     is_valid, validation_errors = validate_order(body)
-    
+    if is_valid:
+        validation_errors = validate_dishes(body)
+        is_valid = not validation_errors
+
     if not is_valid:
-        # Send invalid order to queue
-        send_to_invalid_queue(
-            body=body,
-            errors=validation_errors,
-            request_info={
+        queue_args = {
+            "body": body,
+            "errors": validation_errors,
+            "request_info": {
                 "url": req.url,
                 "method": req.method
-            }
-        )
-        
-        # Return error response to user
-        return func.HttpResponse(
+            },
+        }
+        return queue_args, func.HttpResponse(
             json.dumps({
                 "error": "Order validation failed",
                 "validationErrors": validation_errors,
@@ -277,18 +456,37 @@ def handle_post(req: func.HttpRequest) -> func.HttpResponse:
             status_code=400,
         )
 
-    # Order is valid - proceed with normal processing
+    return body, None
+
+
+def build_order(body, ref):
+    """
+    OrderTable entity for a valid POST body.
+
+    ref is the order's lookup row ({} for a new order). Returns
+    (entity, moved_from): moved_from is the customer whose history row
+    has to be dropped because the order now belongs to someone else.
+    """
     area = body.get("area")
     order_id = body.get("orderId")
     customer_id = body.get("customerId")
     dishes = body.get("dishesOrdered", [])
-    
+
     # Store list as JSON string if needed
     if isinstance(dishes, list):
         dishes_value = json.dumps(dishes)
     else:
         dishes_value = str(dishes)
 
+    # keep a single history row per order, even if the same orderId is posted again
+    moved_from = None
+    if ref.get("HistoryKey"):
+        history_key = ref["HistoryKey"]
+        if ref.get("CustomerID") and ref["CustomerID"] != customer_id:
+            moved_from = ref["CustomerID"]
+    else:
+        history_key = customer_orders.history_key(order_id)
+
     entity = {
         "PartitionKey": area,
         "RowKey": order_id,
@@ -299,28 +497,156 @@ def handle_post(req: func.HttpRequest) -> func.HttpResponse:
         "EstimatedArrival": body.get("estimatedArrival", ""),
         "TotalCost": body.get("totalCost", ""),
         "Status": body.get("status", "Pending"),
+        "HistoryKey": history_key,
     }
+    return entity, moved_from
 
-    table.upsert_entity(entity=entity)
 
+def order_created(entity):
     return func.HttpResponse(
         json.dumps({
-            "message": f"Order {order_id} created successfully for customer {customer_id} in area {area}",
-            "orderId": order_id
+            "message": (
+                f"Order {entity['RowKey']} created successfully for customer "
+                f"{entity['CustomerID']} in area {entity['PartitionKey']}"
+            ),
+            "orderId": entity["RowKey"]
         }),
         headers=JSON_HEADERS,
         status_code=200,
     )
 
 
+def handle_post(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Add a new order.
+    
+    NOW WITH VALIDATION: Invalid orders are sent to Azure Queue Storage.
+    estimatedTime and totalCost are recomputed from the menu (see apply_quote).
+
+    Expected JSON body, example:
+    {
+      "area": "North",
+      "orderId": "O002",
+      "customerId": "C001",
+      "dishesOrdered": ["D007", "D021"],
+      "estimatedTime": 35,
+      "estimatedArrival": "2025-11-26T11:30:00",
+      "totalCost": "19.80€",
+      "status": "Pending"
+    }
+    """
+    table = get_table_client()
+
+    body, invalid = read_order(req)
+    if invalid is not None:
+        send_to_invalid_queue(**body)
+        return invalid
+
+    body = apply_quote(body)
+    order_id = body.get("orderId")
+    ref = lookup.resolve(TABLE_NAME, order_id) or {}
+    entity, moved_from = build_order(body, ref)
+    history_key = entity["HistoryKey"]
+
+    if moved_from:
+        customer_orders.remove(moved_from, history_key)
+    table.upsert_entity(entity=entity)
+    customer_orders.record(entity, history_key)
+
+    # pending orders go into the due-time index read by OrderStatusUpdater
+    due_bucket = ""
+    if pending_orders.is_pending(entity["Status"]):
+        due_bucket = pending_orders.schedule(entity)
+    if ref.get("DueBucket") and ref["DueBucket"] != due_bucket:
+        pending_orders.unschedule(ref["DueBucket"], order_id)
+
+    lookup.remember(
+        TABLE_NAME,
+        order_id,
+        entity["PartitionKey"],
+        HistoryKey=history_key,
+        CustomerID=entity["CustomerID"],
+        DueBucket=due_bucket,
+    )
+
+    return order_created(entity)
+
+
+async def handle_post_async(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    handle_post on the aio clients.
+
+    After the lookup read, the order row, its history row, the pending
+    index and the lookup row are written concurrently instead of one
+    round trip after the other. All writes are upserts (or deletes that
+    ignore missing rows), so a client retrying a failed POST converges.
+    """
+    # validation may read MenuTable on a dish index miss, keep it off the loop
+    body, invalid = await asyncio.to_thread(read_order, req)
+    if invalid is not None:
+        send_to_invalid_queue(**body)
+        return invalid
+
+    # the dish index lives in memory; only its first load touches storage
+    body = await asyncio.to_thread(apply_quote, body)
+
+    orders, history, pending, lookups = await asyncio.gather(
+        aio_storage.get_table_client(TABLE_NAME),
+        aio_storage.get_table_client(customer_orders.TABLE_NAME, create=True),
+        aio_storage.get_table_client(pending_orders.TABLE_NAME, create=True),
+        aio_storage.get_table_client(lookup.TABLE_NAME, create=True),
+    )
+
+    order_id = body.get("orderId")
+    try:
+        ref = await lookups.get_entity(partition_key=TABLE_NAME, row_key=order_id)
+    except ResourceNotFoundError:
+        ref = {}
+    entity, moved_from = build_order(body, ref)
+    history_key = entity["HistoryKey"]
+
+    writes = [
+        orders.upsert_entity(entity=entity),
+        history.upsert_entity(entity=customer_orders.build_entity(entity, history_key)),
+    ]
+    if moved_from:
+        writes.append(history.delete_entity(partition_key=moved_from, row_key=history_key))
+
+    # pending orders go into the due-time index read by OrderStatusUpdater
+    due_bucket = ""
+    if pending_orders.is_pending(entity["Status"]):
+        due_row = pending_orders.build_entity(entity)
+        due_bucket = due_row["PartitionKey"]
+        writes.append(pending.upsert_entity(entity=due_row))
+    if ref.get("DueBucket") and ref["DueBucket"] != due_bucket:
+        writes.append(pending.delete_entity(partition_key=ref["DueBucket"], row_key=order_id))
+
+    writes.append(lookups.upsert_entity(
+        entity=lookup.build_entity(
+            TABLE_NAME,
+            order_id,
+            entity["PartitionKey"],
+            HistoryKey=history_key,
+            CustomerID=entity["CustomerID"],
+            DueBucket=due_bucket,
+        ),
+        mode="merge",
+    ))
+
+    await asyncio.gather(*writes)
+    return order_created(entity)
+
+
 def handle_put(req: func.HttpRequest) -> func.HttpResponse:
     """
     Edit an existing order.
 
     Body must contain orderId.
     You can update any of:
-      area, customerId, dishesOrdered, estimatedTime,
+      customerId, dishesOrdered, estimatedTime,
       estimatedArrival, totalCost, status
+    area is optional and only used to find the row (it is the PartitionKey,
+    so it cannot be changed here).
     """
     table = get_table_client()
 
@@ -341,18 +667,19 @@ def handle_put(req: func.HttpRequest) -> func.HttpResponse:
             status_code=400,
         )
 
-    entities = list(table.query_entities(query_filter=f"RowKey eq '{order_id}'"))
-    if not entities:
+    # the lookup row also carries the order's customer history key
+    ref = lookup.resolve(TABLE_NAME, order_id) or {}
+    area = body.get("area") or ref.get("Area") or lookup.find_area(table, TABLE_NAME, order_id)
+    if not area:
         return func.HttpResponse(
             json.dumps({"error": "Order not found"}),
             headers=JSON_HEADERS,
             status_code=404,
         )
 
-    entity = entities[0]
+    entity = {"PartitionKey": area, "RowKey": order_id}
 
     mapping = {
-        "area": "PartitionKey",
         "customerId": "CustomerID",
         "estimatedTime": "EstimatedTime",
         "estimatedArrival": "EstimatedArrival",
@@ -371,7 +698,43 @@ def handle_put(req: func.HttpRequest) -> func.HttpResponse:
         else:
             entity["DishesOrdered"] = str(dishes)
 
-    table.update_entity(entity=entity, mode="merge")
+    try:
+        table.update_entity(entity=entity, mode="merge")
+    except ResourceNotFoundError:
+        return func.HttpResponse(
+            json.dumps({"error": "Order not found"}),
+            headers=JSON_HEADERS,
+            status_code=404,
+        )
+
+    if ref.get("HistoryKey") and ref.get("CustomerID"):
+        new_customer_id = entity.get("CustomerID")
+        customer_orders.update(
+            ref["CustomerID"],
+            ref["HistoryKey"],
+            entity,
+            new_customer_id=new_customer_id,
+        )
+        if new_customer_id and new_customer_id != ref["CustomerID"]:
+            lookup.remember(TABLE_NAME, order_id, area, CustomerID=new_customer_id)
+
+    due_bucket = ref.get("DueBucket")
+    if due_bucket and ("status" in body or "estimatedTime" in body):
+        # lookup rows from before the updater cleared DueBucket can name a
+        # bucket the order was delivered from
+        if not pending_orders.is_scheduled(due_bucket, order_id):
+            due_bucket = ""
+    if "status" in body and not pending_orders.is_pending(body["status"]):
+        pending_orders.unschedule(due_bucket, order_id)
+        due_bucket = ""
+    elif "estimatedTime" in body and due_bucket:
+        due_bucket = pending_orders.reschedule(due_bucket, order_id, body["estimatedTime"]) or ""
+    elif "status" in body and not due_bucket:
+        # moved back to pending: due EstimatedTime minutes from now
+        current = table.get_entity(partition_key=area, row_key=order_id)
+        due_bucket = pending_orders.schedule(current)
+    if due_bucket != ref.get("DueBucket"):
+        lookup.remember(TABLE_NAME, order_id, area, DueBucket=due_bucket)
 
     return func.HttpResponse(
         json.dumps({"message": f"Order {order_id} updated"}),
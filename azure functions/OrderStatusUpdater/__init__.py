@@ -1,21 +1,36 @@
 import datetime
 import logging
-import os
 
+from azure.core import MatchConditions
+from azure.data.tables import TableErrorCode
 import azure.functions as func
-from azure.data.tables import TableServiceClient
+
+from shared_code import (
+    batch,
+    customer_orders,
+    idempotency,
+    lookup,
+    metrics,
+    odata,
+    pending_orders,
+    storage,
+)
 
 TABLE_NAME = "OrderTable"
 
+# Table Storage allows at most 15 comparisons in one filter
+_IDS_PER_QUERY = 14
+
+# expired idempotency keys are purged at most this often
+PURGE_INTERVAL = datetime.timedelta(hours=1)
+_last_purge = None
+
 
 def get_table_client():
-    connection_string = os.environ.get("AzureWebJobsStorage")
-    if not connection_string:
-        raise RuntimeError("Missing AzureWebJobsStorage setting")
-    service = TableServiceClient.from_connection_string(conn_str=connection_string)
-    return service.get_table_client(table_name=TABLE_NAME)
+    return storage.get_table_client(TABLE_NAME)
 
 
+@metrics.instrument("OrderStatusUpdater")
 def main(mytimer: func.TimerRequest) -> None:
     logging.info("OrderStatusUpdater started")
 
@@ -30,61 +45,152 @@ def main(mytimer: func.TimerRequest) -> None:
     now_utc = datetime.datetime.now(datetime.timezone.utc)
     updated = 0
 
-    # get all orders
+    # pending orders from before the due-time index existed (no-op after the first run)
     try:
-        entities = table.list_entities()
+        pending_orders.ensure_backfilled(table)
     except Exception as e:
-        logging.error(f"Failed to list entities: {e}")
+        logging.error(f"Failed to backfill pending orders: {e}")
         return
 
-    for entity in entities:
-        try:
-            # 1) only handle orders that are pending
-            raw_status = entity.get("Status") or entity.get("status") or ""
-            if str(raw_status).lower() != "pending":
-                continue
-
-            # 2) need a valid Timestamp
-            ts = entity.get("Timestamp")
-            if not isinstance(ts, datetime.datetime):
-                logging.warning(f"Order {entity.get('RowKey')} missing Timestamp")
-                continue
-
-            # normalize timestamp to aware UTC
-            if ts.tzinfo is None:
-                ts = ts.replace(tzinfo=datetime.timezone.utc)
-            else:
-                ts = ts.astimezone(datetime.timezone.utc)
-
-            # 3) get per-order estimated time in minutes
-            est_raw = entity.get("EstimatedTime") or entity.get("estimatedTime")
-            if est_raw is None:
-                logging.warning(f"Order {entity.get('RowKey')} missing EstimatedTime")
-                continue
-
-            try:
-                est_minutes = int(est_raw)
-            except (TypeError, ValueError):
-                logging.warning(
-                    f"Order {entity.get('RowKey')} has invalid EstimatedTime={est_raw}"
-                )
-                continue
-
-            expected_delivery = ts + datetime.timedelta(minutes=est_minutes)
-
-            # 4) only mark delivered when its estimated time has passed
-            if now_utc < expected_delivery:
-                continue
-
-            update_entity = {
-                "PartitionKey": entity["PartitionKey"],
-                "RowKey": entity["RowKey"],
-                "Status": "delivered",
-            }
-            table.update_entity(entity=update_entity, mode="merge")
-            updated += 1
+    # only the buckets that are already due, not the whole order history
+    try:
+        due = list(pending_orders.due_entries(now_utc))
+    except Exception as e:
+        logging.error(f"Failed to read due orders: {e}")
+        return
 
-        except Exception as e:
-            logging.error(f"Error processing order {entity.get('RowKey')}: {e}")
+    # one entry per order, even if a half-finished reschedule left two index rows
+    orders = {}
+    for row in due:
+        orders.setdefault((row["Area"], row["RowKey"]), row)
 
-    logging.info(f"OrderStatusUpdater finished. Updated {updated} orders.")
+    # the index can be stale (half-finished PUT, backfill), so only orders
+    # that are still pending are updated, and only if they haven't changed since
+    try:
+        etags = pending_etags(table, orders)
+    except Exception as e:
+        logging.error(f"Failed to read order statuses: {e}")
+        return
+
+    finished = []   # drop from the index
+    stale = []      # dropped without touching the order or its history
+    for key, row in orders.items():
+        if key not in etags:
+            logging.warning(f"Order {row['RowKey']} is gone or no longer pending")
+            stale.append(row)
+
+    # 1) mark orders delivered: one transaction per 100 orders of an area,
+    #    areas in parallel
+    due_orders = [row for key, row in orders.items() if key in etags]
+    order_ops = [
+        (
+            "update",
+            {"PartitionKey": row["Area"], "RowKey": row["RowKey"], "Status": "delivered"},
+            {"mode": "merge", "etag": etags[(row["Area"], row["RowKey"])], "match_condition": MatchConditions.IfNotModified},
+        )
+        for row in due_orders
+    ]
+    order_results = batch.submit_grouped(table, order_ops)
+
+    for row, result in zip(due_orders, order_results):
+        if result["ok"]:
+            updated += 1
+            finished.append(row)
+        elif result.get("code") == TableErrorCode.RESOURCE_NOT_FOUND:
+            logging.warning(f"Order {row['RowKey']} no longer exists")
+            stale.append(row)
+        else:
+            # stays in the index, retried on the next tick (status re-read then)
+            logging.error(f"Error processing order {row['RowKey']}: {result['error']}")
+
+    # 2) copy the new status into the customers' order history; index rows
+    #    written before the order's history was backfilled have no HistoryKey,
+    #    the lookup row has it
+    try:
+        refs = lookup.resolve_many(TABLE_NAME, [row["RowKey"] for row in finished + stale])
+    except Exception as e:
+        logging.error(f"Failed to read order lookups: {e}")
+        refs = {}
+    history_ops = []
+    for row in finished:
+        ref = refs.get(row["RowKey"], {})
+        customer_id = row.get("CustomerID") or ref.get("CustomerID")
+        key = row.get("HistoryKey") or ref.get("HistoryKey")
+        if customer_id and key:
+            history_ops.append(
+                ("update", {"PartitionKey": customer_id, "RowKey": key, "Status": "delivered"}, {"mode": "merge"})
+            )
+    if history_ops:
+        batch.submit_grouped(customer_orders.get_table_client(), history_ops)
+
+    # 3) drop delivered orders from the due-time index (every row, duplicates included)
+    delivered = {(row["Area"], row["RowKey"]) for row in finished + stale}
+    index_ops = [
+        ("delete", {"PartitionKey": row["PartitionKey"], "RowKey": row["RowKey"]})
+        for row in due
+        if (row["Area"], row["RowKey"]) in delivered
+    ]
+    if index_ops:
+        batch.submit_grouped(pending_orders.get_table_client(), index_ops)
+
+    # 4) clear DueBucket in their lookup rows, so a PUT back to pending
+    #    schedules them again; only where it still names a bucket dropped
+    #    above and the row is unchanged since it was read
+    dropped = {}
+    for row in due:
+        if (row["Area"], row["RowKey"]) in delivered:
+            dropped.setdefault(row["RowKey"], set()).add(row["PartitionKey"])
+    lookup_ops = [
+        (
+            "update",
+            {"PartitionKey": TABLE_NAME, "RowKey": order_id, "DueBucket": ""},
+            {"mode": "merge", "etag": refs[order_id].metadata["etag"], "match_condition": MatchConditions.IfNotModified},
+        )
+        for order_id, buckets in dropped.items()
+        if order_id in refs and refs[order_id].get("DueBucket") in buckets
+    ]
+    if lookup_ops:
+        batch.submit_grouped(lookup.get_table_client(), lookup_ops)
+
+    purge_idempotency_keys(now_utc)
+    metrics.count("delivered", updated)
+
+    logging.info(f"OrderStatusUpdater finished. Updated {updated} of {len(orders)} due orders.")
+    logging.info(f"Storage pool stats: {storage.get_pool_stats()}")
+
+
+def pending_etags(table, orders):
+    """
+    ETags of the orders (keys (area, orderId)) that are still pending,
+    as {(area, orderId): etag}. Status is matched like it always was:
+    Status or status, any case. One query per 14 orders of an area.
+    """
+    by_area = {}
+    for area, order_id in orders:
+        by_area.setdefault(area, []).append(order_id)
+
+    etags = {}
+    for area, order_ids in by_area.items():
+        for chunk in batch.chunks(order_ids, _IDS_PER_QUERY - 1):
+            id_filter = odata.any_of(*(odata.eq("RowKey", order_id) for order_id in chunk))
+            for entity in table.query_entities(
+                query_filter=odata.all_of(odata.eq("PartitionKey", area), id_filter),
+                select=["PartitionKey", "RowKey", "Status", "status"],
+            ):
+                if pending_orders.is_pending(entity.get("Status") or entity.get("status")):
+                    etags[(area, entity["RowKey"])] = entity.metadata["etag"]
+    return etags
+
+
+def purge_idempotency_keys(now_utc):
+    """Drop expired OrderApi Idempotency-Key rows, once per PURGE_INTERVAL."""
+    global _last_purge
+    if _last_purge is not None and now_utc - _last_purge < PURGE_INTERVAL:
+        return
+    try:
+        purged = idempotency.purge_expired(now_utc)
+        _last_purge = now_utc
+        if purged:
+            logging.info(f"Purged {purged} expired idempotency keys")
+    except Exception as e:
+        logging.error(f"Failed to purge idempotency keys: {e}")
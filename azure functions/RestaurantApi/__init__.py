@@ -1,10 +1,25 @@
 import logging
-import os
 import json
 
-from azure.data.tables import TableServiceClient
+from azure.core.exceptions import ResourceNotFoundError
 import azure.functions as func
 
+from shared_code import (
+    bulk,
+    cache,
+    catalog,
+    fanout,
+    lookup,
+    metrics,
+    odata,
+    paging,
+    projection,
+    responses,
+    search_index,
+    storage,
+)
+from shared_code.entities import RESTAURANT as MAPPER, RESTAURANT_FIELDS as FIELDS
+
 JSON_HEADERS = {
     "Content-Type": "application/json",
     "Access-Control-Allow-Origin": "*",
@@ -12,15 +27,25 @@ JSON_HEADERS = {
 
 TABLE_NAME = "RestaurantTable"
 
+# per-worker cache of GET results, invalidated by this worker's writes
+CATALOG_CACHE = cache.catalog_cache()
+metrics.register_stats("RestaurantApi.catalog_cache", CATALOG_CACHE.stats)
+
+# JSON fields a PUT may change -> table columns
+UPDATE_MAPPING = {
+    "name": "Name",
+    "description": "Description",
+    "address": "Address",
+    "phone": "Phone",
+    "imageURL": "ImageURL",
+}
+
 
 def get_table_client():
-    connection_string = os.environ.get("AzureWebJobsStorage")
-    if not connection_string:
-        raise RuntimeError("Missing AzureWebJobsStorage setting")
-    service = TableServiceClient.from_connection_string(conn_str=connection_string)
-    return service.get_table_client(table_name=TABLE_NAME)
+    return storage.get_table_client(TABLE_NAME)
 
 
+@metrics.instrument("RestaurantApi")
 def main(req: func.HttpRequest) -> func.HttpResponse:
     logging.info("RestaurantApi HTTP trigger called")
     method = req.method.upper()
@@ -54,43 +79,86 @@ def handle_get(req: func.HttpRequest) -> func.HttpResponse:
     Query parameters:
       - area          -> matches PartitionKey
       - restaurantId  -> matches RowKey / RestaurantID
+      - limit -> max results per response, next page token in X-Continuation-Token
+      - continuationToken -> token from a previous response
+      - fields -> comma separated JSON fields to return, e.g. area,name
     """
     table = get_table_client()
 
+    try:
+        limit, token = paging.parse_paging(req)
+        fields, select = projection.parse_fields(req, FIELDS)
+    except ValueError as e:
+        return func.HttpResponse(
+            json.dumps({"error": str(e)}),
+            headers=JSON_HEADERS,
+            status_code=400,
+        )
+
     area = req.params.get("area")
     restaurant_id = req.params.get("restaurantId")
 
     filters = []
 
     if area:
-        filters.append(f"PartitionKey eq '{area}'")
+        filters.append(odata.eq("PartitionKey", area))
 
     if restaurant_id:
-        filters.append(f"RowKey eq '{restaurant_id}'")
+        filters.append(odata.eq("RowKey", restaurant_id))
 
-    filter_expr = " and ".join(filters)
+    filter_expr = odata.all_of(*filters)
 
-    if filter_expr:
-        entities = table.query_entities(query_filter=filter_expr)
-    else:
-        entities = table.list_entities()
-
-    result = []
-    for e in entities:
-        result.append({
-            "area": e["PartitionKey"],
-            "restaurantId": e["RowKey"],
-            "address": e.get("Address"),
-            "description": e.get("Description"),
-            "imageURL": e.get("ImageURL"),
-            "name": e.get("Name"),
-            "phone": e.get("Phone"),
-        })
+    cache_key = (
+        area or None,
+        filter_expr,
+        tuple(fields or ()),
+        limit,
+        req.params.get("continuationToken"),
+    )
+    cached = CATALOG_CACHE.get(cache_key)
+    if cached is not None:
+        body, next_token, etag = cached
+        return responses.cached_get_response(
+            req,
+            body,
+            dict(paging.page_headers(JSON_HEADERS, next_token), **{"X-Cache": "HIT"}),
+            etag=etag,
+        )
 
-    return func.HttpResponse(
-        json.dumps(result),
-        headers=JSON_HEADERS,
-        status_code=200,
+    if restaurant_id and not area:
+        # the lookup table names the partition: one point query instead of one per area
+        id_area = lookup.find_area(table, TABLE_NAME, restaurant_id)
+        pages = [] if id_area is None else paging.query_pages(
+            table,
+            query_filter=odata.all_of(odata.eq("PartitionKey", id_area), filter_expr),
+            limit=limit,
+            continuation_token=token,
+            select=select,
+        )
+    elif area or limit or token:
+        pages = paging.query_pages(
+            table,
+            query_filter=filter_expr,
+            limit=limit,
+            continuation_token=token,
+            select=select,
+        )
+    else:
+        # full listing: every area partition at once instead of one long scan
+        pages = fanout.query_pages(table, query_filter=filter_expr, ordered=True, select=select)
+    body, next_token = paging.write_json_pages(
+        pages,
+        projection.project(MAPPER, fields),
+        limit=limit,
+    )
+    etag = responses.make_etag(body)
+    CATALOG_CACHE.set(cache_key, (body, next_token, etag))
+
+    return responses.cached_get_response(
+        req,
+        body,
+        dict(paging.page_headers(JSON_HEADERS, next_token), **{"X-Cache": "MISS"}),
+        etag=etag,
     )
 
 
@@ -108,6 +176,8 @@ def handle_post(req: func.HttpRequest) -> func.HttpResponse:
       "phone": "600 000 000",
       "imageURL": "img/some-image"
     }
+
+    A JSON array of such objects adds them all in one go, see handle_bulk_post.
     """
     table = get_table_client()
 
@@ -120,28 +190,24 @@ def handle_post(req: func.HttpRequest) -> func.HttpResponse:
             status_code=400,
         )
 
-    area = body.get("area")
-    restaurant_id = body.get("restaurantId")
+    if isinstance(body, list):
+        return handle_bulk_post(table, body)
 
-    if not area or not restaurant_id:
+    entity = build_entity(body)
+    if isinstance(entity, str):
         return func.HttpResponse(
-            json.dumps({"error": "area and restaurantId are required"}),
+            json.dumps({"error": entity}),
             headers=JSON_HEADERS,
             status_code=400,
         )
-
-    entity = {
-        "PartitionKey": area,
-        "RowKey": restaurant_id,
-        "RestaurantID": restaurant_id,
-        "Name": body.get("name", ""),
-        "Description": body.get("description", ""),
-        "Address": body.get("address", ""),
-        "Phone": body.get("phone", ""),
-        "ImageURL": body.get("imageURL", ""),
-    }
+    area = entity["PartitionKey"]
+    restaurant_id = entity["RowKey"]
 
     table.upsert_entity(entity=entity)
+    cache.invalidate_areas(CATALOG_CACHE, area)
+    lookup.remember(TABLE_NAME, restaurant_id, area)
+    search_index.update_restaurant(entity)
+    catalog.safe_refresh(catalog.refresh_restaurant, area, restaurant_id)
 
     return func.HttpResponse(
         json.dumps({"message": f"Restaurant {restaurant_id} created or updated in area {area}"}),
@@ -155,8 +221,11 @@ def handle_put(req: func.HttpRequest) -> func.HttpResponse:
     Edit an existing restaurant.
 
     Body must contain restaurantId.
-    Any of [area, name, description, address, phone, imageURL] that are present
-    will be updated.
+    Any of [name, description, address, phone, imageURL] that are present
+    will be updated. area is optional and only used to find the row
+    (it is the PartitionKey, so it cannot be changed here).
+
+    A JSON array of such objects edits them all in one go, see handle_bulk_put.
     """
     table = get_table_client()
 
@@ -169,6 +238,9 @@ def handle_put(req: func.HttpRequest) -> func.HttpResponse:
             status_code=400,
         )
 
+    if isinstance(body, list):
+        return handle_bulk_put(table, body)
+
     restaurant_id = body.get("restaurantId")
     if not restaurant_id:
         return func.HttpResponse(
@@ -177,33 +249,149 @@ def handle_put(req: func.HttpRequest) -> func.HttpResponse:
             status_code=400,
         )
 
-    entities = list(table.query_entities(query_filter=f"RowKey eq '{restaurant_id}'"))
-    if not entities:
+    # area pins the partition; without it the lookup table tells us where the row lives
+    area = body.get("area") or lookup.find_area(table, TABLE_NAME, restaurant_id)
+    if not area:
         return func.HttpResponse(
             json.dumps({"error": "Restaurant not found"}),
             headers=JSON_HEADERS,
             status_code=404,
         )
 
-    entity = entities[0]
-
-    mapping = {
-        "area": "PartitionKey",
-        "name": "Name",
-        "description": "Description",
-        "address": "Address",
-        "phone": "Phone",
-        "imageURL": "ImageURL",
-    }
+    entity = build_changes(body, area)
 
-    for json_field, table_field in mapping.items():
-        if json_field in body:
-            entity[table_field] = body[json_field]
+    try:
+        table.update_entity(entity=entity, mode="merge")
+    except ResourceNotFoundError:
+        return func.HttpResponse(
+            json.dumps({"error": "Restaurant not found"}),
+            headers=JSON_HEADERS,
+            status_code=404,
+        )
 
-    table.update_entity(entity=entity, mode="merge")
+    cache.invalidate_areas(CATALOG_CACHE, area)
+    search_index.update_restaurant(entity)
+    catalog.safe_refresh(catalog.refresh_restaurant, area, restaurant_id)
 
     return func.HttpResponse(
         json.dumps({"message": f"Restaurant {restaurant_id} updated"}),
         headers=JSON_HEADERS,
         status_code=200,
     )
+
+
+def build_entity(body):
+    """Full RestaurantTable entity for a POST body, or an error message."""
+    area = body.get("area")
+    restaurant_id = body.get("restaurantId")
+
+    if not area or not restaurant_id:
+        return "area and restaurantId are required"
+
+    return {
+        "PartitionKey": area,
+        "RowKey": restaurant_id,
+        "RestaurantID": restaurant_id,
+        "Name": body.get("name", ""),
+        "Description": body.get("description", ""),
+        "Address": body.get("address", ""),
+        "Phone": body.get("phone", ""),
+        "ImageURL": body.get("imageURL", ""),
+    }
+
+
+def build_changes(body, area):
+    """Merge entity with the columns present in a PUT body."""
+    entity = {"PartitionKey": area, "RowKey": body["restaurantId"]}
+    for json_field, table_field in UPDATE_MAPPING.items():
+        if json_field in body:
+            entity[table_field] = body[json_field]
+    return entity
+
+
+def upsert_operation(item):
+    entity = build_entity(item)
+    if isinstance(entity, str):
+        return entity
+    return ("upsert", entity)
+
+
+def merge_operation(item):
+    if not item.get("restaurantId"):
+        return "restaurantId is required"
+    if not item.get("area"):
+        return "Restaurant not found"
+    return ("update", build_changes(item, item["area"]), {"mode": "merge"})
+
+
+def handle_bulk_post(table, items) -> func.HttpResponse:
+    """
+    Add many restaurants at once.
+
+    Body is a JSON array of POST bodies. Restaurants are written in one
+    transaction per area (100 restaurants each), areas in parallel.
+
+    Response (207 if any item failed):
+    {
+      "succeeded": 9,
+      "failed": 1,
+      "results": [{"index": 0, "id": "R021", "ok": true}, ...]
+    }
+    """
+    error = bulk.check_size(items)
+    if error:
+        return func.HttpResponse(
+            json.dumps({"error": error}),
+            headers=JSON_HEADERS,
+            status_code=400,
+        )
+
+    results, written = bulk.write(table, items, "restaurantId", upsert_operation)
+
+    entities = [operation[1] for operation in written]
+    if entities:
+        lookup.remember_many(TABLE_NAME, [(e["RowKey"], e["PartitionKey"]) for e in entities])
+        for entity in entities:
+            search_index.update_restaurant(entity)
+        _refresh_areas({e["PartitionKey"] for e in entities})
+
+    body, status_code = bulk.summary(results)
+    return func.HttpResponse(json.dumps(body), headers=JSON_HEADERS, status_code=status_code)
+
+
+def handle_bulk_put(table, items) -> func.HttpResponse:
+    """
+    Edit many restaurants at once.
+
+    Body is a JSON array of PUT bodies. Items without area are located
+    through the lookup table in a few batched queries. Same response
+    shape as handle_bulk_post; unknown restaurants fail with
+    "Restaurant not found".
+    """
+    error = bulk.check_size(items)
+    if error:
+        return func.HttpResponse(
+            json.dumps({"error": error}),
+            headers=JSON_HEADERS,
+            status_code=400,
+        )
+
+    items = bulk.locate_areas(table, TABLE_NAME, items, "restaurantId")
+    results, written = bulk.write(
+        table, items, "restaurantId", merge_operation, not_found="Restaurant not found"
+    )
+    for operation in written:
+        search_index.update_restaurant(operation[1])
+    _refresh_areas({operation[1]["PartitionKey"] for operation in written})
+
+    body, status_code = bulk.summary(results)
+    return func.HttpResponse(json.dumps(body), headers=JSON_HEADERS, status_code=status_code)
+
+
+def _refresh_areas(areas):
+    # one area rebuild is two queries, cheaper than a rebuild per restaurant
+    if not areas:
+        return
+    cache.invalidate_areas(CATALOG_CACHE, *areas)
+    for area in sorted(areas):
+        catalog.safe_refresh(catalog.refresh_area, area)
@@ -0,0 +1,59 @@
+import asyncio
+import json
+import logging
+
+import azure.functions as func
+
+from shared_code import startup
+
+# The one HTTP function behind /api/restaurantapi, /api/customerapi,
+# /api/menuapi, /api/orderapi, /api/catalogapi and /api/searchapi.
+#
+# The API folders are plain handler packages now (no function.json): the
+# route picks one and its main() gets the request. All of them run in the
+# same function, so a worker that is warm for one endpoint is warm for
+# every endpoint: one client pool, dish index and set of catalog caches,
+# and one unit to cold start instead of six.
+#
+# Handler packages are imported on their first request. Sync mains run in
+# a worker thread so they don't block the event loop the async ones
+# (OrderApi) run on.
+
+JSON_HEADERS = {
+    "Content-Type": "application/json",
+    "Access-Control-Allow-Origin": "*",
+}
+
+# route (lower case) -> handler package
+ROUTES = {
+    "restaurantapi": "RestaurantApi",
+    "customerapi": "CustomerApi",
+    "menuapi": "MenuApi",
+    "orderapi": "OrderApi",
+    "catalogapi": "CatalogApi",
+    "searchapi": "SearchApi",
+}
+
+
+def get_handler(api):
+    """main() of the handler package for a route, or None."""
+    package = ROUTES.get((api or "").lower())
+    if package is None:
+        return None
+    return startup.deferred_import(package).main
+
+
+async def main(req: func.HttpRequest) -> func.HttpResponse:
+    api = req.route_params.get("api")
+    handler = get_handler(api)
+    if handler is None:
+        logging.warning(f"Router: no handler for {api}")
+        return func.HttpResponse(
+            json.dumps({"error": f"Unknown API {api}"}),
+            headers=JSON_HEADERS,
+            status_code=404,
+        )
+
+    if asyncio.iscoroutinefunction(handler):
+        return await handler(req)
+    return await asyncio.to_thread(handler, req)
@@ -0,0 +1,110 @@
+import logging
+import json
+
+import azure.functions as func
+
+from shared_code import metrics, responses, search_index, serialization
+
+JSON_HEADERS = {
+    "Content-Type": "application/json",
+    "Access-Control-Allow-Origin": "*",
+}
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_QUERY_LENGTH = 200
+
+
+@metrics.instrument("SearchApi")
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info("SearchApi HTTP trigger called")
+    method = req.method.upper()
+
+    try:
+        if method == "GET":
+            return handle_get(req)
+        else:
+            return func.HttpResponse(
+                json.dumps({"error": "Method not allowed"}),
+                headers=JSON_HEADERS,
+                status_code=405,
+            )
+    except Exception as e:
+        logging.exception("Error in SearchApi")
+        return func.HttpResponse(
+            json.dumps({"error": str(e)}),
+            headers=JSON_HEADERS,
+            status_code=500,
+        )
+
+
+def _error(message):
+    return func.HttpResponse(
+        json.dumps({"error": message}),
+        headers=JSON_HEADERS,
+        status_code=400,
+    )
+
+
+def handle_get(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Search dishes by name, description and restaurant name.
+
+    Query parameters:
+      - q            -> required, the words to search for; every word
+                        matches as a prefix ("chick burg")
+      - area         -> only dishes in this area
+      - restaurantId -> only dishes of this restaurant
+      - available    -> true: only dishes that are available
+      - limit        -> max results, default 20, at most 100
+      - suggest      -> true: autocomplete the last word of q instead
+
+    Response:
+    {
+      "query": "chick burg",
+      "total": 3,
+      "truncated": false,
+      "results": [{ ...dish, "restaurantName": "...", "score": 8.5 }]
+    }
+
+    truncated is true when a short word matched too many different words
+    to expand them all (see search_index.MAX_EXPANSIONS): the most common
+    ones are searched and total is a lower bound.
+
+    With suggest=true:
+    {
+      "query": "chick",
+      "suggestions": [{"text": "chicken", "count": 12}]
+    }
+    """
+    query = (req.params.get("q") or "").strip()
+    if not query:
+        return _error("q is required")
+    if len(query) > MAX_QUERY_LENGTH:
+        return _error(f"q must be at most {MAX_QUERY_LENGTH} characters")
+
+    try:
+        limit = int(req.params.get("limit") or DEFAULT_LIMIT)
+    except ValueError:
+        return _error("limit must be a whole number")
+    if not 1 <= limit <= MAX_LIMIT:
+        return _error(f"limit must be between 1 and {MAX_LIMIT}")
+
+    area = req.params.get("area") or None
+    available_only = (req.params.get("available") or "").lower() == "true"
+
+    if (req.params.get("suggest") or "").lower() == "true":
+        suggestions = search_index.suggest(query, area=area, available_only=available_only, limit=limit)
+        body = serialization.dumps({"query": query, "suggestions": suggestions})
+    else:
+        total, results, truncated = search_index.search(
+            query,
+            area=area,
+            restaurant_id=req.params.get("restaurantId") or None,
+            available_only=available_only,
+            limit=limit,
+        )
+        metrics.count("entities", len(results))
+        body = serialization.dumps({"query": query, "total": total, "truncated": truncated, "results": results})
+
+    return responses.cached_get_response(req, body, JSON_HEADERS)
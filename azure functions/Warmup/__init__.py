@@ -0,0 +1,82 @@
+import logging
+import time
+
+import azure.functions as func
+
+from shared_code import (
+    catalog,
+    customer_orders,
+    fanout,
+    idempotency,
+    lookup,
+    pending_orders,
+    search_index,
+    startup,
+    storage,
+)
+
+# Runs when the platform adds an instance (Premium and Dedicated plans),
+# before the instance gets any traffic:
+#
+#   imports   the SDKs that are otherwise imported by the first request
+#   clients   the pooled table and queue clients (and the index tables)
+#   catalog   per-area catalog snapshot rows, and the RestaurantApi /
+#             MenuApi listing caches with the full listings the frontend
+#             loads first
+#   search    the SearchApi index
+#
+# Every step is timed; the durations show up under "startup" in MetricsApi.
+# A failing step is logged and skipped, warmup itself never fails.
+
+SOURCE_TABLES = ("RestaurantTable", "CustomerTable", "MenuTable", "OrderTable")
+QUEUES = ("invalid-orders-queue",)
+PRIMED_LISTINGS = ("RestaurantApi", "MenuApi")
+
+
+def main(warmupContext: func.Context) -> None:
+    logging.info("Warmup trigger called")
+    steps = {}
+    for name, step in (
+        ("imports", warm_imports),
+        ("clients", warm_clients),
+        ("catalog", warm_catalog),
+        ("search", search_index.ensure_loaded),
+    ):
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logging.exception(f"Warmup step {name} failed")
+        steps[f"{name}_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    startup.record_warmup(steps)
+    logging.info(f"Warmup done: {steps}")
+
+
+def warm_imports():
+    if storage.BACKEND == "sqlite":
+        costs = startup.warm_imports(("shared_code.sqlite_tables",))
+    else:
+        costs = startup.warm_imports()
+    logging.info(f"Warmup imports: {costs}")
+
+
+def warm_clients():
+    for table_name in SOURCE_TABLES:
+        storage.get_table_client(table_name)
+    # index tables are created on first use
+    for module in (catalog, customer_orders, idempotency, lookup, pending_orders):
+        module.get_table_client()
+    for queue_name in QUEUES:
+        storage.get_queue_client(queue_name)
+
+
+def warm_catalog():
+    restaurants = storage.get_table_client(catalog.RESTAURANT_TABLE)
+    for area in fanout.get_areas(restaurants):
+        catalog.get_snapshot(area)
+
+    for name in PRIMED_LISTINGS:
+        req = func.HttpRequest(method="GET", url=f"/api/{name}", params={}, body=b"")
+        # the same module object the Router dispatches to, so the cache is the live one
+        response = startup.deferred_import(name).handle_get(req)
+        logging.info(f"Warmup primed the {name} listing: {response.status_code}")
@@ -0,0 +1,202 @@
+"""
+In-memory stand-in for Table Storage and Queue Storage, for benchmarks.
+
+    from fake_storage import FakeStorage
+
+    fake = FakeStorage(latency_ms=5, jitter_ms=2).install()
+    # storage.get_table_client / get_queue_client (and the aio_storage
+    # twins) now hand out fake clients
+    fake.table("RestaurantTable").seed(entities)
+
+The tables are the SQLite engine of STORAGE_BACKEND=sqlite
+(shared_code/sqlite_tables.py) on a private :memory: database. Paging,
+$filter, $select, etag checks and transactions are therefore the code
+the sqlite backend runs, not a second implementation of them.
+
+Every round trip sleeps for latency_ms plus up to jitter_ms. A round trip
+is one entity operation, one page of a query or one transaction. Handler
+timings therefore include a realistic wait on storage. It is
+time.sleep for the sync clients and asyncio.sleep for the aio ones.
+"""
+import asyncio
+import random
+import threading
+import time
+
+from shared_code import sqlite_tables
+
+
+class _Latency:
+    def __init__(self, latency_ms, jitter_ms, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._random = random.Random(seed)
+
+    def seconds(self):
+        if not self.latency_ms and not self.jitter_ms:
+            return 0.0
+        return (self.latency_ms + self._random.uniform(0, self.jitter_ms)) / 1000.0
+
+    def wait(self):
+        delay = self.seconds()
+        if delay:
+            time.sleep(delay)
+
+    async def wait_async(self):
+        delay = self.seconds()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+_NO_LATENCY = _Latency(0, 0)
+
+
+# --- tables ---------------------------------------------------------------------
+
+
+class FakeTable:
+    """Seeding and counting for one table, without latency."""
+
+    def __init__(self, client):
+        self._client = client
+        self.name = client.table_name
+
+    def __len__(self):
+        return self._client._db.execute(f'SELECT COUNT(*) FROM "{self.name}"')[0][0]
+
+    def seed(self, entities):
+        """Bulk load in one SQLite transaction."""
+        with self._client._db.connection() as conn:
+            conn.execute("BEGIN")
+            for entity in entities:
+                self._client._upsert(conn, entity, mode="replace")
+            conn.commit()
+
+
+class FakeTableClient(sqlite_tables.TableClient):
+    """sqlite_tables.TableClient that waits before every round trip."""
+
+    def __init__(self, database, table_name, latency):
+        super().__init__(database, table_name)
+        self._latency = latency
+
+    def _write(self, operation, *args, **kwargs):
+        self._latency.wait()
+        return super()._write(operation, *args, **kwargs)
+
+    def _page(self, query, start, page_size, select):
+        self._latency.wait()
+        return super()._page(query, start, page_size, select)
+
+    def get_entity(self, partition_key, row_key, *, select=None, **kwargs):
+        self._latency.wait()
+        return super().get_entity(partition_key, row_key, select=select)
+
+    def submit_transaction(self, operations, **kwargs):
+        self._latency.wait()
+        return super().submit_transaction(operations)
+
+
+class AsyncFakeTableClient(sqlite_tables.AsyncTableClient):
+    """aio client: asyncio.sleep, then the SQLite call in the event loop thread."""
+
+    def __init__(self, client, latency):
+        super().__init__(client)
+        self._latency = latency
+
+    async def _call(self, function, *args, **kwargs):
+        await self._latency.wait_async()
+        return function(*args, **kwargs)
+
+
+# --- queues ---------------------------------------------------------------------
+
+
+class FakeQueueClient(sqlite_tables.QueueClient):
+    def __init__(self, database, queue_name, latency):
+        super().__init__(database, queue_name)
+        self._latency = latency
+
+    def send_message(self, content, **kwargs):
+        self._latency.wait()
+        return super().send_message(content)
+
+
+class AsyncFakeQueueClient(sqlite_tables.AsyncQueueClient):
+    def __init__(self, client, latency):
+        super().__init__(client)
+        self._latency = latency
+
+    async def _call(self, function, *args, **kwargs):
+        await self._latency.wait_async()
+        return function(*args, **kwargs)
+
+
+# --- wiring ---------------------------------------------------------------------
+
+
+class FakeStorage:
+    """A :memory: SQLite database plus the hooks into shared_code.storage / aio_storage."""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, seed=None):
+        self.latency = _Latency(latency_ms, jitter_ms, seed)
+        self.database = sqlite_tables.Database(sqlite_tables.MEMORY)
+        self._tables = {}
+        self._lock = threading.Lock()
+        self._originals = None
+
+    def _client(self, table_name, latency):
+        with self._lock:
+            if table_name not in self._tables:
+                self._tables[table_name] = FakeTable(sqlite_tables.TableClient(self.database, table_name))
+        return FakeTableClient(self.database, table_name, latency)
+
+    def table(self, name):
+        self._client(name, self.latency)
+        return self._tables[name]
+
+    def tables(self):
+        with self._lock:
+            return dict(self._tables)
+
+    def get_table_client(self, table_name, create=False):
+        return self._client(table_name, self.latency)
+
+    def get_queue_client(self, queue_name):
+        return FakeQueueClient(self.database, queue_name, self.latency)
+
+    async def get_async_table_client(self, table_name, create=False):
+        # the waiting happens in AsyncFakeTableClient, not in the sync client
+        return AsyncFakeTableClient(self._client(table_name, _NO_LATENCY), self.latency)
+
+    async def get_async_queue_client(self, queue_name):
+        return AsyncFakeQueueClient(sqlite_tables.QueueClient(self.database, queue_name), self.latency)
+
+    def install(self):
+        """Route shared_code.storage and shared_code.aio_storage to this fake."""
+        from shared_code import aio_storage, storage
+
+        self._originals = (
+            storage.get_table_client,
+            storage.get_queue_client,
+            aio_storage.get_table_client,
+            aio_storage.get_queue_client,
+        )
+        storage.get_table_client = self.get_table_client
+        storage.get_queue_client = self.get_queue_client
+        aio_storage.get_table_client = self.get_async_table_client
+        aio_storage.get_queue_client = self.get_async_queue_client
+        return self
+
+    def uninstall(self):
+        if self._originals is None:
+            return
+        from shared_code import aio_storage, storage
+
+        (
+            storage.get_table_client,
+            storage.get_queue_client,
+            aio_storage.get_table_client,
+            aio_storage.get_queue_client,
+        ) = self._originals
+        self._originals = None
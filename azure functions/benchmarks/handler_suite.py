@@ -0,0 +1,593 @@
+"""
+Offline benchmark of every handler, on the in-memory storage fake.
+
+Seeds fake tables (benchmarks/fake_storage.py) with the demo dataset
+scaled up --scale times. One unit is 30 restaurants, 10 per area over
+North / East / West, with 2 dishes each, plus 1 customer per area and
+their orders. The suite then calls every handle_* and
+OrderStatusUpdater.main, and reports throughput and p50 / p95 / p99
+latency. No storage account or Azurite is needed:
+
+    cd "azure functions"
+    python benchmarks/handler_suite.py                  # scale 500, ~120k entities
+    python benchmarks/handler_suite.py --latency-ms 5 --jitter-ms 3 --concurrency 8
+    python benchmarks/handler_suite.py --only MenuApi --requests 500
+
+To compare two revisions, save a run and diff the next one against it:
+
+    python benchmarks/handler_suite.py --json before.json
+    python benchmarks/handler_suite.py --baseline before.json
+
+Storage latency defaults to 0, so the numbers are the Python cost of the
+handlers. Set --latency-ms to see how round trips add up. Repeated GETs
+are mostly served from the per-worker catalog cache; run with
+CATALOG_CACHE_TTL=0 to measure the query path instead.
+"""
+import argparse
+import asyncio
+import datetime
+import inspect
+import json
+import logging
+import math
+import os
+import random
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import azure.functions as func
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_storage import FakeStorage  # noqa: E402
+
+AREAS = ("North", "East", "West")
+RESTAURANTS_PER_AREA = 10
+DISHES_PER_RESTAURANT = 2
+CUSTOMERS_PER_AREA = 1
+
+# handlers that read or rewrite a whole table / area run this fraction of --requests
+HEAVY = 0.05
+
+
+def request(method, params=None, body=None, headers=None):
+    return func.HttpRequest(
+        method=method,
+        url="http://localhost/api/bench",
+        params=params or {},
+        headers=dict(headers or {}, **({"Content-Type": "application/json"} if body is not None else {})),
+        body=json.dumps(body).encode("utf-8") if body is not None else b"",
+    )
+
+
+class Dataset:
+    """Ids of what was seeded, by area, and counters for new ids."""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.restaurants = {area: [] for area in AREAS}
+        self.dishes = {area: [] for area in AREAS}
+        self.customers = {area: [] for area in AREAS}
+        self.unavailable = set()
+        self.orders = []
+        self.created_dishes = []
+        self._next = {}
+
+    def new_id(self, prefix):
+        # ids the seed never uses, so POSTs always create
+        self._next[prefix] = self._next.get(prefix, 0) + 1
+        return f"{prefix}N{self._next[prefix]:07d}"
+
+    def area(self):
+        return self.rng.choice(AREAS)
+
+    def restaurant(self):
+        area = self.area()
+        return area, self.rng.choice(self.restaurants[area])
+
+    def dish(self, area=None):
+        area = area or self.area()
+        return area, self.rng.choice(self.dishes[area])
+
+    def customer(self):
+        area = self.area()
+        return area, self.rng.choice(self.customers[area])
+
+    def cart(self, area):
+        # mostly dishes from the customer's own area, like the app
+        lines = []
+        for _ in range(self.rng.randint(1, 4)):
+            dish_area = area if self.rng.random() < 0.8 else self.area()
+            _, dish_id = self.dish(dish_area)
+            while dish_id in self.unavailable:
+                _, dish_id = self.dish(dish_area)
+            lines.append({"dishId": dish_id, "quantity": self.rng.randint(1, 3), "area": dish_area})
+        return lines
+
+
+def order_rows(order_api, body, placed_at, customer_orders, lookup, pending_orders):
+    """OrderTable row plus its history, lookup and (if pending) due-time index rows."""
+    entity, _ = order_api.build_order(body, {})
+    entity["HistoryKey"] = customer_orders.history_key(entity["RowKey"], placed_at)
+    due_bucket = ""
+    pending = None
+    if pending_orders.is_pending(entity["Status"]):
+        pending = pending_orders.build_entity(entity, placed_at=placed_at)
+        due_bucket = pending["PartitionKey"]
+    return (
+        entity,
+        customer_orders.build_entity(entity, entity["HistoryKey"]),
+        lookup.build_entity(
+            order_api.TABLE_NAME,
+            entity["RowKey"],
+            entity["PartitionKey"],
+            HistoryKey=entity["HistoryKey"],
+            CustomerID=entity["CustomerID"],
+            DueBucket=due_bucket,
+        ),
+        pending,
+    )
+
+
+def seed(fake, data, scale, orders_per_customer):
+    import OrderApi
+    from shared_code import catalog, customer_orders, lookup, pending_orders
+
+    restaurants, dishes, customers, lookups = [], [], [], []
+    orders, history, pending = [], [], []
+    rng = data.rng
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    restaurant_no = dish_no = customer_no = 0
+    for _ in range(scale):
+        for area in AREAS:
+            for _ in range(RESTAURANTS_PER_AREA):
+                restaurant_no += 1
+                restaurant_id = f"R{restaurant_no:06d}"
+                restaurants.append({
+                    "PartitionKey": area,
+                    "RowKey": restaurant_id,
+                    "Name": f"Restaurant {restaurant_no}",
+                    "Description": "Home cooking, fresh every day",
+                    "Address": f"{restaurant_no} Main Street, {area}",
+                    "Phone": f"+30 210 {restaurant_no:07d}",
+                    "ImageURL": f"https://example.com/restaurants/{restaurant_id}.jpg",
+                })
+                data.restaurants[area].append(restaurant_id)
+                lookups.append(lookup.build_entity("RestaurantTable", restaurant_id, area))
+
+                for _ in range(DISHES_PER_RESTAURANT):
+                    dish_no += 1
+                    dish_id = f"D{dish_no:06d}"
+                    dishes.append({
+                        "PartitionKey": area,
+                        "RowKey": dish_id,
+                        "RestaurantID": restaurant_id,
+                        "Name": f"Dish {dish_no}",
+                        "Description": "Chef's choice",
+                        "Price": round(rng.uniform(4, 25), 2),
+                        "PrepTime": rng.randint(10, 40),
+                        "IsAvailable": rng.random() > 0.05,
+                        "ImageURL": f"https://example.com/dishes/{dish_id}.jpg",
+                    })
+                    data.dishes[area].append(dish_id)
+                    if not dishes[-1]["IsAvailable"]:
+                        data.unavailable.add(dish_id)
+                    lookups.append(lookup.build_entity("MenuTable", dish_id, area))
+
+            for _ in range(CUSTOMERS_PER_AREA):
+                customer_no += 1
+                customer_id = f"C{customer_no:06d}"
+                customers.append({
+                    "PartitionKey": area,
+                    "RowKey": customer_id,
+                    "Name": f"Customer{customer_no}",
+                    "LastName": "Bench",
+                    "Address": f"{customer_no} Side Street, {area}",
+                    "Phone": f"+30 690 {customer_no:07d}",
+                })
+                data.customers[area].append(customer_id)
+                lookups.append(lookup.build_entity("CustomerTable", customer_id, area))
+
+    fake.table("RestaurantTable").seed(restaurants)
+    fake.table("MenuTable").seed(dishes)
+    fake.table("CustomerTable").seed(customers)
+
+    order_no = 0
+    for area in AREAS:
+        for customer_id in data.customers[area]:
+            for _ in range(orders_per_customer):
+                order_no += 1
+                placed_at = now - datetime.timedelta(minutes=rng.randint(0, 60 * 24 * 30))
+                # a few recent ones still pending, due well after the benchmark
+                status = "pending" if rng.random() < 0.1 else "delivered"
+                if status == "pending":
+                    placed_at = now + datetime.timedelta(days=1)
+                body = {
+                    "area": area,
+                    "orderId": f"O{order_no:07d}",
+                    "customerId": customer_id,
+                    "dishesOrdered": data.cart(area),
+                    "estimatedTime": rng.randint(20, 60),
+                    "totalCost": f"{rng.uniform(5, 80):.2f}€",
+                    "status": status,
+                }
+                order, history_row, lookup_row, pending_row = order_rows(
+                    OrderApi, body, placed_at, customer_orders, lookup, pending_orders
+                )
+                orders.append(order)
+                history.append(history_row)
+                lookups.append(lookup_row)
+                if pending_row:
+                    pending.append(pending_row)
+                data.orders.append(order["RowKey"])
+
+    # backfill markers, so reads measure the steady state
+    history.extend(
+        {"PartitionKey": customer_id, "RowKey": customer_orders.BACKFILL_MARKER}
+        for ids in data.customers.values() for customer_id in ids
+    )
+    pending.append({"PartitionKey": pending_orders.META_PARTITION, "RowKey": pending_orders.BACKFILL_MARKER})
+
+    fake.table(OrderApi.TABLE_NAME).seed(orders)
+    fake.table(customer_orders.TABLE_NAME).seed(history)
+    fake.table(pending_orders.TABLE_NAME).seed(pending)
+    fake.table(lookup.TABLE_NAME).seed(lookups)
+
+    for area in AREAS:
+        catalog.refresh_area(area)
+
+
+def seed_due_orders(fake, data, count):
+    """Pending orders whose due time has passed, for one OrderStatusUpdater run."""
+    import OrderApi
+    from shared_code import customer_orders, lookup, pending_orders
+
+    placed_at = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=2)
+    rows = ([], [], [], [])
+    for _ in range(count):
+        area, customer_id = data.customer()
+        body = {
+            "area": area,
+            "orderId": data.new_id("O"),
+            "customerId": customer_id,
+            "dishesOrdered": data.cart(area),
+            "estimatedTime": 30,
+            "totalCost": "10.00€",
+            "status": "pending",
+        }
+        for out, row in zip(rows, order_rows(OrderApi, body, placed_at, customer_orders, lookup, pending_orders)):
+            out.append(row)
+
+    for table_name, table_rows in zip(
+        (OrderApi.TABLE_NAME, customer_orders.TABLE_NAME, lookup.TABLE_NAME, pending_orders.TABLE_NAME),
+        rows,
+    ):
+        fake.table(table_name).seed(table_rows)
+
+
+class Scenario:
+    """
+    One handler under load.
+
+    make(data) returns the positional arguments of one call. setup(data)
+    runs before every call, untimed. weight scales --requests.
+    """
+
+    def __init__(self, name, target, make, weight=1.0, setup=None, sequential=False):
+        self.name = name
+        self.target = target
+        self.make = make
+        self.weight = weight
+        self.setup = setup
+        self.sequential = sequential or setup is not None
+
+
+def build_scenarios(fake, data, due_orders):
+    import CatalogApi
+    import CustomerApi
+    import MenuApi
+    import MetricsApi
+    import OrderApi
+    import OrderStatusUpdater
+    import RestaurantApi
+    import SearchApi
+
+    rng = data.rng
+
+    def new_restaurant():
+        area = data.area()
+        restaurant_id = data.new_id("R")
+        data.restaurants[area].append(restaurant_id)
+        return {"area": area, "restaurantId": restaurant_id, "name": "Bench", "description": "New",
+                "address": "1 Bench Road", "phone": "+30 210 0000000"}
+
+    def new_customer():
+        area = data.area()
+        customer_id = data.new_id("C")
+        data.customers[area].append(customer_id)
+        return {"area": area, "customerId": customer_id, "name": "Bench", "lastName": "Mark",
+                "address": "2 Bench Road", "phone": "+30 690 0000000"}
+
+    def new_dish():
+        area, restaurant_id = data.restaurant()
+        dish_id = data.new_id("D")
+        data.created_dishes.append((area, dish_id))
+        return {"area": area, "dishId": dish_id, "restaurantId": restaurant_id, "name": "Bench dish",
+                "price": round(rng.uniform(4, 25), 2), "prepTime": rng.randint(10, 40), "isAvailable": True}
+
+    def new_order():
+        area, customer_id = data.customer()
+        order_id = data.new_id("O")
+        data.orders.append(order_id)
+        return {"area": area, "orderId": order_id, "customerId": customer_id,
+                "dishesOrdered": data.cart(area), "estimatedTime": 30, "totalCost": "10.00€",
+                "status": "delivered"}
+
+    def created_dish():
+        if not data.created_dishes:
+            body = new_dish()
+            MenuApi.handle_post(request("POST", body=body))
+        area, dish_id = data.created_dishes.pop()
+        return {"area": area, "dishId": dish_id}
+
+    def restaurant_update():
+        _, restaurant_id = data.restaurant()
+        return {"restaurantId": restaurant_id, "description": f"Updated {uuid.uuid4().hex[:6]}"}
+
+    def customer_update():
+        _, customer_id = data.customer()
+        return {"customerId": customer_id, "phone": f"+30 690 {rng.randint(0, 9999999):07d}"}
+
+    def dish_update():
+        _, dish_id = data.dish()
+        return {"dishId": dish_id, "price": round(rng.uniform(4, 25), 2)}
+
+    def idempotent_order():
+        body = new_order()
+        return request("POST", body=body, headers={"Idempotency-Key": body["orderId"]})
+
+    return [
+        Scenario("CatalogApi.handle_get", CatalogApi.handle_get,
+                 lambda: (request("GET", {"area": data.area()}),)),
+
+        Scenario("RestaurantApi.handle_get id", RestaurantApi.handle_get,
+                 lambda: (request("GET", {"restaurantId": data.restaurant()[1]}),)),
+        Scenario("RestaurantApi.handle_get area page", RestaurantApi.handle_get,
+                 lambda: (request("GET", {"area": data.area(), "limit": "100"}),)),
+        Scenario("RestaurantApi.handle_get all", RestaurantApi.handle_get,
+                 lambda: (request("GET"),), weight=HEAVY),
+        Scenario("RestaurantApi.handle_post", RestaurantApi.handle_post,
+                 lambda: (request("POST", body=new_restaurant()),)),
+        Scenario("RestaurantApi.handle_put", RestaurantApi.handle_put,
+                 lambda: (request("PUT", body=restaurant_update()),)),
+        Scenario("RestaurantApi.handle_bulk_post", RestaurantApi.handle_bulk_post,
+                 lambda: (RestaurantApi.get_table_client(), [new_restaurant() for _ in range(50)]), weight=HEAVY),
+        Scenario("RestaurantApi.handle_bulk_put", RestaurantApi.handle_bulk_put,
+                 lambda: (RestaurantApi.get_table_client(), [restaurant_update() for _ in range(50)]), weight=HEAVY),
+
+        Scenario("CustomerApi.handle_get id", CustomerApi.handle_get,
+                 lambda: (request("GET", {"customerId": data.customer()[1]}),)),
+        Scenario("CustomerApi.handle_get area page", CustomerApi.handle_get,
+                 lambda: (request("GET", {"area": data.area(), "limit": "100"}),)),
+        Scenario("CustomerApi.handle_get all", CustomerApi.handle_get,
+                 lambda: (request("GET"),), weight=HEAVY),
+        Scenario("CustomerApi.handle_post", CustomerApi.handle_post,
+                 lambda: (request("POST", body=new_customer()),)),
+        Scenario("CustomerApi.handle_put", CustomerApi.handle_put,
+                 lambda: (request("PUT", body=customer_update()),)),
+        Scenario("CustomerApi.handle_bulk_post", CustomerApi.handle_bulk_post,
+                 lambda: (CustomerApi.get_table_client(), [new_customer() for _ in range(50)]), weight=HEAVY),
+        Scenario("CustomerApi.handle_bulk_put", CustomerApi.handle_bulk_put,
+                 lambda: (CustomerApi.get_table_client(), [customer_update() for _ in range(50)]), weight=HEAVY),
+
+        Scenario("MenuApi.handle_get id", MenuApi.handle_get,
+                 lambda: (request("GET", {"dishId": data.dish()[1]}),)),
+        Scenario("MenuApi.handle_get restaurant", MenuApi.handle_get,
+                 lambda: (request("GET", {"restaurantId": data.restaurant()[1]}),)),
+        Scenario("MenuApi.handle_get max_price page", MenuApi.handle_get,
+                 lambda: (request("GET", {"area": data.area(), "max_price": "10", "limit": "100"}),)),
+        Scenario("MenuApi.handle_get all", MenuApi.handle_get,
+                 lambda: (request("GET"),), weight=HEAVY),
+        Scenario("MenuApi.handle_post", MenuApi.handle_post,
+                 lambda: (request("POST", body=new_dish()),)),
+        Scenario("MenuApi.handle_put", MenuApi.handle_put,
+                 lambda: (request("PUT", body=dish_update()),)),
+        Scenario("MenuApi.handle_delete", MenuApi.handle_delete,
+                 lambda: (request("DELETE", body=created_dish()),), weight=HEAVY),
+        Scenario("MenuApi.handle_bulk_post", MenuApi.handle_bulk_post,
+                 lambda: (MenuApi.get_table_client(), [new_dish() for _ in range(50)]), weight=HEAVY),
+        Scenario("MenuApi.handle_bulk_put", MenuApi.handle_bulk_put,
+                 lambda: (MenuApi.get_table_client(), [dish_update() for _ in range(50)]), weight=HEAVY),
+
+        Scenario("SearchApi.handle_get", SearchApi.handle_get,
+                 lambda: (request("GET", {"q": f"dish {rng.randint(1, 99)}"}),)),
+        Scenario("SearchApi.handle_get area available", SearchApi.handle_get,
+                 lambda: (request("GET", {"q": "chef dish", "area": data.area(), "available": "true"}),)),
+        Scenario("SearchApi.handle_get suggest", SearchApi.handle_get,
+                 lambda: (request("GET", {"q": f"restaurant {rng.randint(1, 9)}", "suggest": "true"}),)),
+
+        Scenario("OrderApi.handle_get id", OrderApi.handle_get,
+                 lambda: (request("GET", {"orderId": rng.choice(data.orders)}),)),
+        Scenario("OrderApi.handle_get customer", OrderApi.handle_get,
+                 lambda: (request("GET", {"customerId": data.customer()[1]}),)),
+        Scenario("OrderApi.handle_quote", OrderApi.handle_quote,
+                 lambda: (request("POST", {"action": "quote"}, body={"area": data.area(), "dishesOrdered": data.cart(data.area())}),)),
+        Scenario("OrderApi.handle_post", OrderApi.handle_post,
+                 lambda: (request("POST", body=new_order()),)),
+        Scenario("OrderApi.handle_post_async", OrderApi.handle_post_async,
+                 lambda: (request("POST", body=new_order()),)),
+        Scenario("OrderApi.handle_post_once", OrderApi.handle_post_once,
+                 lambda: (idempotent_order(),)),
+        Scenario("OrderApi.handle_put", OrderApi.handle_put,
+                 lambda: (request("PUT", body={"orderId": rng.choice(data.orders), "estimatedTime": rng.randint(20, 60)}),)),
+
+        Scenario("MetricsApi.handle_get", MetricsApi.handle_get,
+                 lambda: (request("GET"),)),
+
+        Scenario("OrderStatusUpdater.main", OrderStatusUpdater.main,
+                 lambda: (None,), weight=HEAVY,
+                 setup=lambda: seed_due_orders(fake, data, due_orders)),
+    ]
+
+
+def call(scenario, args):
+    """Run one sync call. Returns (ok, seconds)."""
+    start = time.perf_counter()
+    try:
+        response = scenario.target(*args)
+        ok = response is None or response.status_code < 400
+    except Exception:
+        logging.exception(f"{scenario.name} raised")
+        ok = False
+    return ok, time.perf_counter() - start
+
+
+async def call_async(scenario, args):
+    start = time.perf_counter()
+    try:
+        response = await scenario.target(*args)
+        ok = response.status_code < 400
+    except Exception:
+        logging.exception(f"{scenario.name} raised")
+        ok = False
+    return ok, time.perf_counter() - start
+
+
+def run_sync(scenario, count, concurrency):
+    if scenario.sequential or concurrency == 1:
+        results = []
+        for _ in range(count):
+            if scenario.setup:
+                scenario.setup()
+            results.append(call(scenario, scenario.make()))
+        # setup is not part of the handler's time
+        return results, sum(seconds for _, seconds in results)
+
+    calls = [scenario.make() for _ in range(count)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda args: call(scenario, args), calls))
+    return results, time.perf_counter() - started
+
+
+async def run_async(scenario, count, concurrency):
+    limit = asyncio.Semaphore(concurrency)
+    calls = [scenario.make() for _ in range(count)]
+
+    async def one(args):
+        async with limit:
+            return await call_async(scenario, args)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(args) for args in calls))
+    return results, time.perf_counter() - started
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(results, seconds):
+    latencies = sorted(latency for _, latency in results)
+    return {
+        "requests": len(results),
+        "errors": sum(1 for ok, _ in results if not ok),
+        "per_second": round(len(results) / seconds, 1) if seconds else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+def change(now, before):
+    if not before:
+        return ""
+    return f"{(now - before) / before * 100:+6.1f}%"
+
+
+def report(results, baseline=None):
+    header = f"{'handler':<38} {'n':>5} {'err':>4} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    if baseline:
+        header += f" {'p50 vs base':>12} {'p99 vs base':>12}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        line = (
+            f"{name:<38} {r['requests']:>5} {r['errors']:>4} {r['per_second']:>9.1f} "
+            f"{r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f}"
+        )
+        before = (baseline or {}).get(name)
+        if baseline:
+            line += f" {change(r['p50_ms'], before and before['p50_ms']):>12} {change(r['p99_ms'], before and before['p99_ms']):>12}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=500, help="copies of the 30 restaurant dataset")
+    parser.add_argument("--orders-per-customer", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=200, help="calls per handler (heavy ones run fewer)")
+    parser.add_argument("--concurrency", type=int, default=1, help="calls in flight (threads, or tasks for async handlers)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="storage round trip latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="extra random latency, 0..jitter")
+    parser.add_argument("--due-orders", type=int, default=200, help="due orders per OrderStatusUpdater run")
+    parser.add_argument("--only", help="run handlers whose name contains this text")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="results file of an earlier run to compare with")
+    parser.add_argument("--verbose", action="store_true", help="show the handlers' logging")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR)
+
+    fake = FakeStorage(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, seed=args.seed).install()
+    data = Dataset(random.Random(args.seed))
+
+    started = time.perf_counter()
+    seed(fake, data, args.scale, args.orders_per_customer)
+    entities = sum(len(table) for table in fake.tables().values())
+    print(f"Seeded {entities} entities in {len(fake.tables())} tables in {time.perf_counter() - started:.1f} s")
+    print(f"latency {args.latency_ms} ms + 0..{args.jitter_ms} ms, concurrency {args.concurrency}\n")
+
+    scenarios = build_scenarios(fake, data, args.due_orders)
+    if args.only:
+        scenarios = [s for s in scenarios if args.only.lower() in s.name.lower()]
+
+    results = {}
+    for scenario in scenarios:
+        count = max(1, int(args.requests * scenario.weight))
+        is_async = inspect.iscoroutinefunction(scenario.target)
+
+        # one untimed call first: dish index load, client set up, first area discovery
+        if scenario.setup:
+            scenario.setup()
+        if is_async:
+            asyncio.run(call_async(scenario, scenario.make()))
+            outcome = asyncio.run(run_async(scenario, count, args.concurrency))
+        else:
+            call(scenario, scenario.make())
+            outcome = run_sync(scenario, count, args.concurrency)
+        results[scenario.name] = summarize(*outcome)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    report(results, baseline)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "entities": entities, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Per-instance throughput of OrderApi POST: sync handler vs async (aio) mode.
+
+Runs the handlers in process against the storage account in
+AzureWebJobsStorage (use Azurite, it writes the seed dataset and BENCH-* orders):
+
+    cd "azure functions"
+    export AzureWebJobsStorage="UseDevelopmentStorage=true"
+    python benchmarks/order_post_throughput.py --orders 500 --concurrency 32
+
+sync  -> handle_post on a thread pool the size of the Python worker's
+         default (PYTHON_THREADPOOL_THREAD_COUNT), like the old sync main
+async -> main() on one event loop, at most --concurrency requests in flight
+
+Restaurants, dishes and customers are first written with the seed of
+handler_suite.py (--scale copies of its dataset), so every order carries
+dishes that exist and passes validation. The run stops if a first order
+is not accepted, rather than timing the rejection path.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import azure.functions as func
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import OrderApi  # noqa: E402
+import handler_suite  # noqa: E402
+from shared_code import batch, storage  # noqa: E402
+
+
+class SeedTable:
+    """handler_suite.seed writes through fake.table(name).seed(entities); this writes to storage."""
+
+    def __init__(self, table_name):
+        self.table_name = table_name
+
+    def seed(self, entities):
+        operations = [("upsert", entity, {"mode": "replace"}) for entity in entities]
+        results = batch.submit_grouped(storage.get_table_client(self.table_name, create=True), operations)
+        failed = [result["error"] for result in results if not result["ok"]]
+        if failed:
+            raise RuntimeError(f"Seeding {self.table_name} failed: {failed[0]}")
+
+
+class SeedStorage:
+    def table(self, table_name):
+        return SeedTable(table_name)
+
+
+def make_request(data, order_id, status):
+    area, customer_id = data.customer()
+    body = {
+        "area": area,
+        "orderId": order_id,
+        "customerId": customer_id,
+        "dishesOrdered": data.cart(area),
+        "status": status,
+    }
+    return func.HttpRequest(
+        method="POST",
+        url="http://localhost/api/orderapi",
+        headers={"Content-Type": "application/json"},
+        body=json.dumps(body).encode("utf-8"),
+    )
+
+
+def timed_sync(req):
+    start = time.perf_counter()
+    resp = OrderApi.handle_post(req)
+    return resp.status_code, time.perf_counter() - start
+
+
+def run_sync(requests, threads):
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(timed_sync, requests))
+        return results, time.perf_counter() - start
+
+
+def check_accepted(resp):
+    if resp.status_code != 200:
+        raise SystemExit(f"First order was not accepted ({resp.status_code}): {resp.get_body().decode('utf-8')}")
+
+
+async def run_async(data, requests, concurrency):
+    limit = asyncio.Semaphore(concurrency)
+
+    async def timed(req):
+        async with limit:
+            start = time.perf_counter()
+            resp = await OrderApi.main(req)
+            return resp.status_code, time.perf_counter() - start
+
+    # first request builds the aio client pool, keep it out of the numbers
+    check_accepted(await OrderApi.main(make_request(data, f"BENCH-warmup-{uuid.uuid4().hex[:8]}", "Delivered")))
+    start = time.perf_counter()
+    results = await asyncio.gather(*(timed(req) for req in requests))
+    return results, time.perf_counter() - start
+
+
+def report(mode, results, seconds):
+    latencies = sorted(latency for _, latency in results)
+    errors = sum(1 for status, _ in results if status != 200)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0]
+    print(
+        f"{mode:>5}: {len(results) / seconds:8.1f} orders/s | "
+        f"p50 {statistics.median(latencies) * 1000:7.1f} ms | "
+        f"p95 {p95 * 1000:7.1f} ms | errors {errors}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32, help="in-flight requests in async mode")
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=int(os.environ.get("PYTHON_THREADPOOL_THREAD_COUNT", min(32, (os.cpu_count() or 1) + 4))),
+        help="worker threads in sync mode",
+    )
+    parser.add_argument("--status", default="Pending", help="Pending also writes the due-time index")
+    parser.add_argument("--scale", type=int, default=1, help="copies of the handler_suite dataset to seed")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    data = handler_suite.Dataset(random.Random(args.seed))
+    handler_suite.seed(SeedStorage(), data, args.scale, orders_per_customer=0)
+
+    run = uuid.uuid4().hex[:8]
+
+    check_accepted(OrderApi.handle_post(make_request(data, f"BENCH-{run}-warmup", "Delivered")))
+    sync_requests = [make_request(data, f"BENCH-{run}-s{i}", args.status) for i in range(args.orders)]
+    report("sync", *run_sync(sync_requests, args.threads))
+
+    OrderApi.ASYNC_STORAGE = True
+    async_requests = [make_request(data, f"BENCH-{run}-a{i}", args.status) for i in range(args.orders)]
+    report("async", *asyncio.run(run_async(data, async_requests, args.concurrency)))
+
+
+if __name__ == "__main__":
+    main()
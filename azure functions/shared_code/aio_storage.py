@@ -0,0 +1,159 @@
+import asyncio
+import logging
+
+from shared_code import metrics, startup, storage
+
+# Async twin of storage.py for `async def main` handlers.
+#
+# One aiohttp session (keep-alive connection pool) and one service client
+# per worker, shared by every request. aiohttp sessions belong to the event
+# loop that created them, so the pool is rebuilt if the loop ever changes;
+# the old clients and session are closed then, on the new loop.
+# With STORAGE_BACKEND=sqlite the pool holds async wrappers around the
+# sync SQLite clients instead. aiohttp and the aio SDKs are imported with
+# the first client, like in storage.py.
+
+_lock = None
+_loop = None
+_session = None
+_transport = None
+_service = None
+_tables = {}
+_created = set()
+_queues = {}
+_stats = {"hits": 0, "misses": 0}
+
+
+async def _reset_for_loop(loop):
+    global _lock, _loop, _session, _transport, _service
+    old_clients = list(_tables.values()) + list(_queues.values()) + [_service]
+    old_session = _session
+
+    # reset before the first await, so other requests on the new loop see it
+    _loop = loop
+    _lock = asyncio.Lock()
+    _session = None
+    _transport = None
+    _service = None
+    _tables.clear()
+    _created.clear()
+    _queues.clear()
+
+    await _close(old_clients, old_session)
+
+
+async def _close(clients, session):
+    """Close the previous loop's clients and aiohttp session (connectors leak otherwise)."""
+    for client in clients:
+        close = getattr(client, "close", None)  # the SQLite wrappers hold nothing to close
+        if close is None:
+            continue
+        try:
+            await close()
+        except Exception as e:
+            logging.warning(f"Closing an old async storage client failed: {e}")
+    if session is not None:
+        try:
+            await session.close()
+        except Exception as e:
+            logging.warning(f"Closing the old aiohttp session failed: {e}")
+
+
+def _get_transport():
+    """Shared aiohttp transport. Caller must hold _lock."""
+    global _session, _transport
+    if _transport is None:
+        aiohttp = startup.deferred_import("aiohttp")
+        transport = startup.deferred_import("azure.core.pipeline.transport")
+        connector = aiohttp.TCPConnector(limit=storage.POOL_MAXSIZE)
+        _session = aiohttp.ClientSession(connector=connector)
+        _transport = transport.AioHttpTransport(session=_session, session_owner=False)
+    return _transport
+
+
+def _get_service():
+    """Shared async TableServiceClient. Caller must hold _lock."""
+    global _service
+    if _service is None:
+        tables = startup.deferred_import("azure.data.tables.aio")
+        _service = tables.TableServiceClient.from_connection_string(
+            conn_str=storage.get_connection_string(),
+            transport=_get_transport(),
+        )
+    return _service
+
+
+@metrics.timed("client")
+async def get_table_client(table_name, create=False):
+    """Pooled async TableClient, same contract as storage.get_table_client."""
+    loop = asyncio.get_running_loop()
+    if loop is not _loop:
+        await _reset_for_loop(loop)
+
+    client = _tables.get(table_name)
+    if client is not None and (not create or table_name in _created):
+        _stats["hits"] += 1
+        return client
+
+    async with _lock:
+        if create and table_name not in _created:
+            if storage.BACKEND != "sqlite":
+                await _get_service().create_table_if_not_exists(table_name=table_name)
+            _created.add(table_name)
+        client = _tables.get(table_name)
+        if client is None:
+            _stats["misses"] += 1
+            if storage.BACKEND == "sqlite":
+                sqlite_tables = startup.deferred_import("shared_code.sqlite_tables")
+                client = sqlite_tables.AsyncTableClient(sqlite_tables.get_table_client(table_name))
+            else:
+                client = _get_service().get_table_client(table_name=table_name)
+            _tables[table_name] = client
+            logging.info(f"Async storage pool miss: created table client for {table_name}")
+        else:
+            _stats["hits"] += 1
+    return client
+
+
+@metrics.timed("client")
+async def get_queue_client(queue_name):
+    """Pooled async QueueClient for queue_name."""
+    loop = asyncio.get_running_loop()
+    if loop is not _loop:
+        await _reset_for_loop(loop)
+
+    client = _queues.get(queue_name)
+    if client is not None:
+        _stats["hits"] += 1
+        return client
+
+    async with _lock:
+        client = _queues.get(queue_name)
+        if client is None:
+            _stats["misses"] += 1
+            if storage.BACKEND == "sqlite":
+                sqlite_tables = startup.deferred_import("shared_code.sqlite_tables")
+                client = sqlite_tables.AsyncQueueClient(sqlite_tables.get_queue_client(queue_name))
+            else:
+                queues = startup.deferred_import("azure.storage.queue.aio")
+                client = queues.QueueClient.from_connection_string(
+                    conn_str=storage.get_connection_string(),
+                    queue_name=queue_name,
+                    transport=_get_transport(),
+                )
+            _queues[queue_name] = client
+            logging.info(f"Async storage pool miss: created queue client for {queue_name}")
+        else:
+            _stats["hits"] += 1
+    return client
+
+
+def get_pool_stats():
+    """Hit / miss counters for the async client pool of this worker."""
+    return {
+        "backend": storage.BACKEND,
+        "hits": _stats["hits"],
+        "misses": _stats["misses"],
+        "tables": sorted(_tables),
+        "queues": sorted(_queues),
+    }
@@ -0,0 +1,140 @@
+import logging
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from azure.core.exceptions import AzureError, HttpResponseError
+from azure.data.tables import TableErrorCode, TableTransactionError
+
+# Entity group transactions: at most 100 operations, all in one partition.
+MAX_BATCH_SIZE = 100
+MAX_WORKERS = int(os.environ.get("BATCH_MAX_WORKERS", "4"))
+MAX_RETRIES = int(os.environ.get("BATCH_MAX_RETRIES", "2"))
+RETRY_BACKOFF_SECONDS = 0.2
+
+# errors that name one operation of the transaction (its index is in the
+# message); anything else, e.g. a too large payload or a partition
+# mismatch, is reported with index 0 and concerns the whole transaction
+PER_ENTITY_ERRORS = {
+    str(code.value)
+    for code in (
+        TableErrorCode.ENTITY_ALREADY_EXISTS,
+        TableErrorCode.RESOURCE_NOT_FOUND,
+        TableErrorCode.ENTITY_NOT_FOUND,
+        TableErrorCode.UPDATE_CONDITION_NOT_SATISFIED,
+        TableErrorCode.ENTITY_TOO_LARGE,
+        TableErrorCode.PROPERTY_VALUE_TOO_LARGE,
+        TableErrorCode.PROPERTIES_NEED_VALUE,
+        TableErrorCode.PROPERTY_NAME_INVALID,
+        TableErrorCode.PROPERTY_NAME_TOO_LONG,
+        TableErrorCode.DUPLICATE_PROPERTIES_SPECIFIED,
+        TableErrorCode.TOO_MANY_PROPERTIES,
+        TableErrorCode.INVALID_VALUE_TYPE,
+        TableErrorCode.OUT_OF_RANGE_INPUT,
+        TableErrorCode.INVALID_DUPLICATE_ROW,
+    )
+}
+
+
+def chunks(items, size=MAX_BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _error_code(error):
+    code = getattr(error, "error_code", None)
+    return str(getattr(code, "value", code) or "")
+
+
+def _transient(error):
+    """Transport errors, timeouts, throttling and 5xx; not other 4xx responses."""
+    if isinstance(error, HttpResponseError):
+        status = error.status_code or 0
+        return status in (408, 429) or status >= 500
+    return True
+
+
+def _submit_chunk(table, indexed_ops, results, timings):
+    """
+    Commit one chunk of (index, operation) pairs from a single partition.
+
+    A transaction is all or nothing. When one operation is rejected
+    (PER_ENTITY_ERRORS) it is marked failed and the rest of the chunk is
+    resubmitted without it. Transient errors retry the whole chunk with
+    backoff; any other error fails the whole chunk.
+    """
+    pending = list(indexed_ops)
+    attempt = 0
+
+    while pending:
+        start = time.perf_counter()
+        try:
+            table.submit_transaction([op for _, op in pending])
+        except TableTransactionError as e:
+            timings.append((len(pending), time.perf_counter() - start, False))
+            if _error_code(e) in PER_ENTITY_ERRORS:
+                bad = min(max(e.index, 0), len(pending) - 1)
+                index, _ = pending.pop(bad)
+                results[index] = {"ok": False, "error": e.message or str(e), "code": e.error_code}
+                continue
+            error = e
+        except AzureError as e:
+            timings.append((len(pending), time.perf_counter() - start, False))
+            error = e
+        else:
+            timings.append((len(pending), time.perf_counter() - start, True))
+            for index, _ in pending:
+                results[index] = {"ok": True}
+            return
+
+        attempt += 1
+        if not _transient(error) or attempt > MAX_RETRIES:
+            for index, _ in pending:
+                results[index] = {"ok": False, "error": str(error), "code": getattr(error, "error_code", None)}
+            return
+        time.sleep(RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1)))
+
+
+def _submit_partition(table, indexed_ops, results, timings):
+    for chunk in chunks(indexed_ops):
+        _submit_chunk(table, chunk, results, timings)
+
+
+def submit_grouped(table, operations, max_workers=MAX_WORKERS):
+    """
+    Commit operations grouped by PartitionKey in transactions of up to 100.
+
+    operations are submit_transaction tuples, e.g.
+        ("update", {"PartitionKey": ..., "RowKey": ..., ...}, {"mode": "merge"})
+
+    Partitions run concurrently on a bounded thread pool.
+    Returns one {"ok": bool, "error": str, "code": TableErrorCode} dict per
+    operation, in order ("error" and "code" only on failure).
+    """
+    results = [None] * len(operations)
+    partitions = OrderedDict()
+    for index, op in enumerate(operations):
+        partitions.setdefault(op[1]["PartitionKey"], []).append((index, op))
+
+    timings = []
+    workers = max(1, min(max_workers, len(partitions)))
+    if workers == 1:
+        for indexed_ops in partitions.values():
+            _submit_partition(table, indexed_ops, results, timings)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_submit_partition, table, indexed_ops, results, timings)
+                for indexed_ops in partitions.values()
+            ]
+            for future in futures:
+                future.result()
+
+    for size, seconds, ok in timings:
+        logging.info(
+            f"Batch on {table.table_name}: {size} ops in {seconds * 1000:.1f} ms"
+            + ("" if ok else " (failed)")
+        )
+
+    return results
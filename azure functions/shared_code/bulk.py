@@ -0,0 +1,112 @@
+import os
+
+from azure.data.tables import TableErrorCode
+
+from shared_code import batch, lookup
+
+# Array bodies on POST / PUT: many entities in one request.
+#
+# Items are turned into submit_transaction operations, grouped by
+# PartitionKey and committed 100 at a time (see batch.submit_grouped),
+# so loading a 60 dish menu is one transaction instead of 60 requests.
+# Every item gets its own result; one bad item never fails the others.
+
+MAX_ITEMS = int(os.environ.get("BULK_MAX_ITEMS", "1000"))
+
+
+def check_size(items):
+    """User facing error message when a bulk body is too big or empty, else None."""
+    if not items:
+        return "Empty list"
+    if len(items) > MAX_ITEMS:
+        return f"At most {MAX_ITEMS} items per request, got {len(items)}"
+    return None
+
+
+def locate_areas(table, source_table, items, id_field):
+    """
+    Fill in "area" on items that don't have one, from the lookup table.
+
+    Known ids are resolved with a few batched lookup queries; ids written
+    before the lookup existed fall back to lookup.find_area one by one.
+    """
+    missing = [
+        item[id_field] for item in items
+        if isinstance(item, dict) and item.get(id_field) and not item.get("area")
+    ]
+    if not missing:
+        return items
+
+    areas = {entity_id: row["Area"] for entity_id, row in lookup.resolve_many(source_table, missing).items()}
+    located = []
+    for item in items:
+        if isinstance(item, dict) and item.get(id_field) and not item.get("area"):
+            entity_id = item[id_field]
+            if entity_id not in areas:
+                areas[entity_id] = lookup.find_area(table, source_table, entity_id)
+            if areas[entity_id]:
+                item = dict(item, area=areas[entity_id])
+        located.append(item)
+    return located
+
+
+def write(table, items, id_field, to_operation, not_found="Not found"):
+    """
+    Validate items and commit them in grouped transactions.
+
+    - to_operation(item) -> submit_transaction tuple, or an error message
+    - id_field -> JSON field holding the item's id (RowKey)
+    - not_found -> error reported for merges of rows that don't exist
+
+    Returns (results, written): one {"index", "id", "ok", ...} dict per
+    item in order, and the operations that were committed.
+    """
+    results = [None] * len(items)
+    operations = []
+    positions = []
+    seen = set()
+
+    for index, item in enumerate(items):
+        entity_id = item.get(id_field) if isinstance(item, dict) else None
+        result = {"index": index, "id": entity_id}
+        results[index] = result
+
+        if not isinstance(item, dict):
+            result.update(ok=False, error="Item must be a JSON object")
+            continue
+
+        operation = to_operation(item)
+        if isinstance(operation, str):
+            result.update(ok=False, error=operation)
+            continue
+
+        # a transaction may not touch the same row twice
+        key = (operation[1]["PartitionKey"], operation[1]["RowKey"])
+        if key in seen:
+            result.update(ok=False, error=f"Duplicate {id_field} {entity_id} in request")
+            continue
+        seen.add(key)
+
+        operations.append(operation)
+        positions.append(index)
+
+    written = []
+    for index, operation, outcome in zip(positions, operations, batch.submit_grouped(table, operations)):
+        if outcome.get("code") == TableErrorCode.resource_not_found:
+            outcome = dict(outcome, error=not_found)
+        results[index].update(outcome)
+        if outcome["ok"]:
+            written.append(operation)
+
+    return results, written
+
+
+def summary(results):
+    """Response body and status code: 200 if every item went in, else 207."""
+    failed = sum(1 for result in results if not result["ok"])
+    body = {
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "results": results,
+    }
+    return body, 207 if failed else 200
@@ -0,0 +1,87 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Small in-process LRU cache with a per-entry time to live.
+
+    Lives in module globals, so it is shared by every request that the
+    same worker process serves. Thread safe.
+    """
+
+    def __init__(self, maxsize=256, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached value or None."""
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < now:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, predicate):
+        """Drop every entry whose key matches predicate(key). Returns the count."""
+        with self._lock:
+            stale = [key for key in self._data if predicate(key)]
+            for key in stale:
+                del self._data[key]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# Catalog (restaurants, menus) changes rarely; cache GET results for a while.
+CATALOG_TTL_SECONDS = float(os.environ.get("CATALOG_CACHE_TTL", "60"))
+CATALOG_MAXSIZE = int(os.environ.get("CATALOG_CACHE_SIZE", "256"))
+
+
+def catalog_cache():
+    return TTLCache(maxsize=CATALOG_MAXSIZE, ttl=CATALOG_TTL_SECONDS)
+
+
+def invalidate_areas(cache, *areas):
+    """
+    Drop cached results that may contain rows of the given areas.
+
+    Keys are tuples that start with the area filter; None means the
+    result was not restricted to one area, so it is always dropped.
+    """
+    areas = set(areas)
+    return cache.invalidate(lambda key: key[0] is None or key[0] in areas)
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import logging
+import time
+
+from azure.core.exceptions import ResourceNotFoundError
+
+from shared_code import fanout, odata, serialization, storage
+from shared_code.entities import dish_to_json, restaurant_to_json
+
+# Denormalized per-area catalog: each restaurant with its menu nested.
+#
+#   PartitionKey = area
+#   RowKey       = RestaurantID
+#   Restaurant   = restaurant JSON
+#   Menu_0..n    = menu JSON array, split in chunks (string columns max 64 KB)
+#   MenuParts    = number of Menu_* columns
+#   Version      = microsecond timestamp of the last rebuild of this row,
+#                  zero padded string (Int64 columns come back wrapped)
+#
+# RestaurantApi / MenuApi writes rebuild only the affected restaurant's
+# row. Every rebuild then rewrites the area's "~built" marker row with a
+# new Version, and the version of the area is a hash of the marker's
+# (Version, ETag). A request that already has the current version costs
+# one point read; the ETag makes the version change with every rewrite,
+# independent of clock skew between instances.
+#
+# The marker is written by refresh_area first, so an area without
+# restaurants is not rebuilt on every read. refresh_restaurant only
+# updates an existing marker and never marks a half-built area as built.
+
+TABLE_NAME = "CatalogSnapshotTable"
+RESTAURANT_TABLE = "RestaurantTable"
+MENU_TABLE = "MenuTable"
+
+BUILT_MARKER = "~built"
+
+# 64 KB per string column = 32K UTF-16 characters, keep some headroom
+_CHUNK_CHARS = 30000
+
+
+def get_table_client():
+    return storage.get_table_client(TABLE_NAME, create=True)
+
+
+def _new_version():
+    return f"{time.time_ns() // 1000:017d}"
+
+
+def _marker(area):
+    return {"PartitionKey": area, "RowKey": BUILT_MARKER, "Version": _new_version()}
+
+
+def _build_row(restaurant, dishes, version):
+    menu = json.dumps([dish_to_json(d) for d in dishes])
+    chunks = [menu[i:i + _CHUNK_CHARS] for i in range(0, len(menu), _CHUNK_CHARS)] or ["[]"]
+    row = {
+        "PartitionKey": restaurant["PartitionKey"],
+        "RowKey": restaurant["RowKey"],
+        "Restaurant": json.dumps(restaurant_to_json(restaurant)),
+        "MenuParts": len(chunks),
+        "Version": version,
+    }
+    for i, chunk in enumerate(chunks):
+        row[f"Menu_{i}"] = chunk
+    return row
+
+
+def _read_row(row):
+    """The restaurant JSON with "menu" nested, as a serialization.Fragment when possible."""
+    parts = int(row.get("MenuParts") or 0)
+    menu = "".join(row.get(f"Menu_{i}", "") for i in range(parts)) or "[]"
+    if serialization.FRAGMENTS:
+        # both columns hold JSON already: splice the menu into the restaurant
+        # object instead of parsing and re-encoding them on every read
+        restaurant = row["Restaurant"].rstrip()
+        separator = "," if restaurant[:-1].rstrip() != "{" else ""
+        return serialization.Fragment(f'{restaurant[:-1]}{separator}"menu":{menu}}}')
+    restaurant = json.loads(row["Restaurant"])
+    restaurant["menu"] = json.loads(menu)
+    return restaurant
+
+
+def refresh_restaurant(area, restaurant_id):
+    """Rebuild the snapshot row of one restaurant from its source tables."""
+    restaurants = storage.get_table_client(RESTAURANT_TABLE)
+    menus = storage.get_table_client(MENU_TABLE)
+    snapshot = get_table_client()
+
+    try:
+        restaurant = restaurants.get_entity(partition_key=area, row_key=restaurant_id)
+    except ResourceNotFoundError:
+        snapshot.delete_entity(partition_key=area, row_key=restaurant_id)
+    else:
+        dishes = menus.query_entities(
+            query_filter=odata.all_of(odata.eq("PartitionKey", area), odata.eq("RestaurantID", restaurant_id))
+        )
+        snapshot.upsert_entity(entity=_build_row(restaurant, dishes, _new_version()), mode="replace")
+
+    try:
+        snapshot.update_entity(entity=_marker(area), mode="replace")
+    except ResourceNotFoundError:
+        # area not built yet: the first get_snapshot builds all of it
+        pass
+
+
+def refresh_dish(area, dish_id):
+    """Rebuild the snapshot row of the restaurant a dish belongs to."""
+    menus = storage.get_table_client(MENU_TABLE)
+    dish = menus.get_entity(partition_key=area, row_key=dish_id, select=["RestaurantID"])
+    if dish.get("RestaurantID"):
+        refresh_restaurant(area, dish["RestaurantID"])
+
+
+def refresh_area(area):
+    """Rebuild every snapshot row of an area (first use, or dishes moving between restaurants)."""
+    restaurants = storage.get_table_client(RESTAURANT_TABLE)
+    menus = storage.get_table_client(MENU_TABLE)
+    snapshot = get_table_client()
+
+    dishes_by_restaurant = {}
+    for dish in menus.query_entities(query_filter=odata.eq("PartitionKey", area)):
+        dishes_by_restaurant.setdefault(dish.get("RestaurantID"), []).append(dish)
+
+    version = _new_version()
+    seen = {BUILT_MARKER}
+    for restaurant in restaurants.query_entities(query_filter=odata.eq("PartitionKey", area)):
+        dishes = dishes_by_restaurant.get(restaurant["RowKey"], [])
+        snapshot.upsert_entity(entity=_build_row(restaurant, dishes, version), mode="replace")
+        seen.add(restaurant["RowKey"])
+
+    for row in snapshot.query_entities(query_filter=odata.eq("PartitionKey", area), select=["RowKey"]):
+        if row["RowKey"] not in seen:
+            snapshot.delete_entity(partition_key=area, row_key=row["RowKey"])
+    snapshot.upsert_entity(entity=_marker(area), mode="replace")
+
+    logging.info(f"Rebuilt catalog snapshot for {area}: {len(seen) - 1} restaurants")
+
+
+def safe_refresh(refresh, *args):
+    """Snapshot upkeep must never fail the write that triggered it."""
+    try:
+        refresh(*args)
+    except Exception as e:
+        logging.error(f"Catalog snapshot refresh {refresh.__name__}{args} failed: {e}")
+
+
+def _area_version(marker):
+    """Hash of the marker row's (Version, ETag)."""
+    digest = hashlib.blake2b(digest_size=12)
+    etag = (getattr(marker, "metadata", None) or {}).get("etag") or ""
+    digest.update(f"{marker.get('Version') or ''}\0{etag}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+# version of an area that has no snapshot and no restaurants
+EMPTY_VERSION = hashlib.blake2b(b"", digest_size=12).hexdigest()
+
+
+def get_version(area):
+    """The current version of an area (see _area_version), or None if it was never built."""
+    try:
+        return _area_version(get_table_client().get_entity(partition_key=area, row_key=BUILT_MARKER))
+    except ResourceNotFoundError:
+        return None
+
+
+def get_snapshot(area):
+    """
+    Return (version, restaurants) for an area, restaurants with "menu" nested.
+    The restaurants are meant for serialization.dumps (see _read_row).
+
+    Builds the area on first use; areas RestaurantTable doesn't know are
+    answered empty without a rebuild.
+    """
+    # version first: rows rewritten in between make the next request
+    # download them again instead of keeping a stale menu under a new version
+    version = get_version(area)
+    if version is None:
+        if area not in fanout.get_areas(storage.get_table_client(RESTAURANT_TABLE)):
+            return EMPTY_VERSION, []
+        refresh_area(area)
+        version = get_version(area)
+
+    rows = get_table_client().query_entities(
+        query_filter=odata.all_of(odata.eq("PartitionKey", area), odata.compare("RowKey", "ne", BUILT_MARKER))
+    )
+    return version, [_read_row(row) for row in rows]
@@ -0,0 +1,190 @@
+import datetime
+import logging
+
+from azure.core.exceptions import ResourceNotFoundError
+
+from shared_code import fanout, lookup, odata, paging, storage
+
+# Secondary index of orders by customer, newest first.
+#
+#   PartitionKey = CustomerID
+#   RowKey       = <reverse microsecond timestamp>_<OrderID>
+#   Area         = PartitionKey of the order in OrderTable
+#   + a copy of the order columns, so history reads never touch OrderTable
+#
+# A "~backfilled" row marks customers whose pre-index orders were copied in.
+# "~" sorts after every digit so it never shows up in a RowKey lt '~' range.
+
+TABLE_NAME = "CustomerOrderIndex"
+BACKFILL_MARKER = "~backfilled"
+ORDER_COLUMNS = (
+    "OrderID",
+    "DishesOrdered",
+    "EstimatedTime",
+    "EstimatedArrival",
+    "TotalCost",
+    "Status",
+)
+
+# OrderTable column -> column of the same value in this index
+_INDEX_COLUMNS = {
+    "PartitionKey": "Area",
+    "RowKey": "OrderID",
+    "CustomerID": "PartitionKey",
+}
+
+# microseconds since epoch stay below this until the year 2286
+_MAX_TICKS = 10 ** 16
+
+_backfilled = set()
+
+
+def get_table_client():
+    return storage.get_table_client(TABLE_NAME, create=True)
+
+
+def history_key(order_id, when=None):
+    """RowKey that sorts newer orders first."""
+    when = when or datetime.datetime.now(datetime.timezone.utc)
+    ticks = int(when.timestamp() * 1_000_000)
+    return f"{_MAX_TICKS - ticks:016d}_{order_id}"
+
+
+def build_entity(order_entity, key):
+    entity = {
+        "PartitionKey": order_entity["CustomerID"],
+        "RowKey": key,
+        "Area": order_entity["PartitionKey"],
+    }
+    for column in ORDER_COLUMNS:
+        if column in order_entity:
+            entity[column] = order_entity[column]
+    return entity
+
+
+def to_order_entity(entity):
+    """Turn an index row back into the shape of an OrderTable entity."""
+    order = {
+        "PartitionKey": entity["Area"],
+        "RowKey": entity.get("OrderID") or entity["RowKey"].split("_", 1)[-1],
+        "CustomerID": entity["PartitionKey"],
+    }
+    for column in ORDER_COLUMNS:
+        if column in entity:
+            order[column] = entity[column]
+    return order
+
+
+def record(order_entity, key):
+    get_table_client().upsert_entity(entity=build_entity(order_entity, key))
+
+
+def remove(customer_id, key):
+    get_table_client().delete_entity(partition_key=customer_id, row_key=key)
+
+
+def update(customer_id, key, changes, new_customer_id=None):
+    """
+    Apply order column changes to an index row.
+
+    When the order moved to another customer the row is re-created in the
+    new customer's partition under the same RowKey.
+    """
+    table = get_table_client()
+    columns = {c: v for c, v in changes.items() if c in ORDER_COLUMNS}
+
+    if new_customer_id and new_customer_id != customer_id:
+        try:
+            entity = dict(table.get_entity(partition_key=customer_id, row_key=key))
+        except ResourceNotFoundError:
+            return
+        entity.update(columns)
+        entity["PartitionKey"] = new_customer_id
+        table.upsert_entity(entity=entity)
+        table.delete_entity(partition_key=customer_id, row_key=key)
+        return
+
+    if not columns:
+        return
+    entity = {"PartitionKey": customer_id, "RowKey": key}
+    entity.update(columns)
+    try:
+        table.update_entity(entity=entity, mode="merge")
+    except ResourceNotFoundError:
+        logging.warning(f"Order history row {customer_id}/{key} missing")
+
+
+def ensure_backfilled(order_table, customer_id):
+    """
+    Copy a customer's orders from before the index existed, once.
+
+    Runs the old CustomerID scan a single time per customer; afterwards
+    the marker row short-circuits it (and this worker remembers it).
+    The new HistoryKey is written back to the order and its lookup row,
+    so OrderApi PUT and OrderStatusUpdater keep the history row current
+    and a re-run (marker lost) doesn't copy the order again.
+    """
+    if customer_id in _backfilled:
+        return
+
+    table = get_table_client()
+    try:
+        table.get_entity(partition_key=customer_id, row_key=BACKFILL_MARKER)
+        _backfilled.add(customer_id)
+        return
+    except ResourceNotFoundError:
+        pass
+
+    copied = 0
+    for order in fanout.query_entities(order_table, query_filter=odata.eq("CustomerID", customer_id)):
+        if order.get("HistoryKey"):
+            continue  # written after the index existed, already there
+        when = order.metadata.get("timestamp") if hasattr(order, "metadata") else None
+        key = history_key(order["RowKey"], when)
+        record(order, key)
+        try:
+            order_table.update_entity(
+                entity={"PartitionKey": order["PartitionKey"], "RowKey": order["RowKey"], "HistoryKey": key},
+                mode="merge",
+            )
+        except ResourceNotFoundError:
+            remove(customer_id, key)  # deleted meanwhile
+            continue
+        lookup.remember(order_table.table_name, order["RowKey"], order["PartitionKey"], CustomerID=customer_id, HistoryKey=key)
+        copied += 1
+
+    table.upsert_entity(entity={"PartitionKey": customer_id, "RowKey": BACKFILL_MARKER})
+    _backfilled.add(customer_id)
+    logging.info(f"Backfilled {copied} orders into history of {customer_id}")
+
+
+def index_select(order_columns):
+    """Translate an OrderTable $select into the columns of this index."""
+    if not order_columns:
+        return None
+    select = ["PartitionKey", "RowKey", "Area"]
+    for column in order_columns:
+        column = _INDEX_COLUMNS.get(column, column)
+        if column not in select:
+            select.append(column)
+    return select
+
+
+def query_pages(customer_id, area=None, limit=None, continuation_token=None, select=None):
+    """
+    Single-partition range query over a customer's orders, newest first.
+
+    select uses OrderTable column names.
+    """
+    query_filter = odata.all_of(
+        odata.eq("PartitionKey", customer_id),
+        odata.compare("RowKey", "lt", "~"),
+        odata.eq("Area", area) if area else "",
+    )
+    return paging.query_pages(
+        get_table_client(),
+        query_filter=query_filter,
+        limit=limit,
+        continuation_token=continuation_token,
+        select=index_select(select),
+    )
@@ -0,0 +1,162 @@
+import logging
+import os
+import threading
+import time
+
+from shared_code import batch, fanout, odata, storage
+
+# In-memory index of every dish, for pricing and timing carts.
+#
+#   dishId -> {"dishId", "name", "price", "prepTime", "restaurantId",
+#              "area", "isAvailable"}
+#
+# Loaded from MenuTable once per worker (all areas in parallel, only the
+# columns above) and reloaded after DISH_INDEX_TTL seconds. MenuApi
+# writes of this worker update it right away; other workers catch up on
+# their next reload. Dishes missing from the index are read from the
+# table in a few batched queries and added. Ids that turn out not to
+# exist are remembered until the next reload, so a flood of orders with
+# bogus dishes does not turn into a flood of MenuTable queries.
+
+MENU_TABLE = "MenuTable"
+TTL_SECONDS = float(os.environ.get("DISH_INDEX_TTL", "300"))
+
+COLUMNS = ["PartitionKey", "RowKey", "Name", "Price", "PrepTime", "RestaurantID", "IsAvailable"]
+
+# Table Storage allows at most 15 comparisons in one filter
+_IDS_PER_QUERY = 14
+# unknown ids remembered between reloads; past this the set starts over
+MAX_UNKNOWN = int(os.environ.get("DISH_INDEX_MAX_UNKNOWN", "10000"))
+
+_lock = threading.Lock()
+_dishes = {}
+_unknown = set()
+_loaded_at = None
+_stats = {"loads": 0, "fetched": 0, "unknown_hits": 0}
+
+
+def _number(value, cast):
+    try:
+        return cast(value or 0)
+    except (TypeError, ValueError):
+        return cast(0)
+
+
+def to_info(entity):
+    available = entity.get("IsAvailable")
+    return {
+        "dishId": entity["RowKey"],
+        "name": entity.get("Name") or "",
+        "price": _number(entity.get("Price"), float),
+        "prepTime": _number(entity.get("PrepTime"), int),
+        "restaurantId": entity.get("RestaurantID") or "",
+        "area": entity["PartitionKey"],
+        "isAvailable": True if available is None else bool(available),
+    }
+
+
+def _ensure_loaded():
+    global _dishes, _unknown, _loaded_at
+    if _loaded_at is not None and time.monotonic() - _loaded_at < TTL_SECONDS:
+        return
+
+    with _lock:
+        if _loaded_at is not None and time.monotonic() - _loaded_at < TTL_SECONDS:
+            return
+        start = time.perf_counter()
+        table = storage.get_table_client(MENU_TABLE)
+        dishes = {e["RowKey"]: to_info(e) for e in fanout.query_entities(table, select=COLUMNS)}
+        # readers don't take the lock: swap in the full dict in one step
+        _dishes = dishes
+        _unknown = set()
+        _loaded_at = time.monotonic()
+        _stats["loads"] += 1
+        logging.info(f"Loaded dish index: {len(dishes)} dishes in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+def _fetch(dish_ids, areas=None):
+    """
+    Read dishes that are not in the index straight from MenuTable.
+
+    Ids with a known area are read with one query per partition
+    (PartitionKey eq ... and (RowKey eq ... or ...)); the rest are looked
+    up in every area at once.
+    """
+    table = storage.get_table_client(MENU_TABLE)
+    areas = areas or {}
+    by_area = {}
+    for dish_id in dish_ids:
+        by_area.setdefault(areas.get(dish_id), []).append(dish_id)
+
+    found = {}
+    for area, ids in by_area.items():
+        for chunk in batch.chunks(ids, _IDS_PER_QUERY - 1):
+            id_filter = odata.any_of(*(odata.eq("RowKey", dish_id) for dish_id in chunk))
+            if area:
+                entities = table.query_entities(
+                    query_filter=odata.all_of(odata.eq("PartitionKey", area), id_filter),
+                    select=COLUMNS,
+                )
+            else:
+                entities = fanout.query_entities(table, query_filter=id_filter, select=COLUMNS)
+            for entity in entities:
+                found[entity["RowKey"]] = to_info(entity)
+
+    # a wrong area hint must not hide a dish that lives in another area
+    retry = [dish_id for dish_id in dish_ids if dish_id not in found and areas.get(dish_id)]
+    if retry:
+        found.update(_fetch(retry))
+
+    _stats["fetched"] += len(found)
+    return found
+
+
+def get_many(dish_ids, areas=None):
+    """
+    Dish info for each known id, as {dishId: info}.
+
+    One in-memory pass; ids the index does not know yet cost a few
+    batched table queries. areas ({dishId: area}, e.g. from the cart)
+    narrows those queries to one partition. Ids that do not exist are
+    left out, and not looked for again until the next reload.
+    """
+    _ensure_loaded()
+    dishes = _dishes
+    unknown = _unknown
+    dish_ids = list(dict.fromkeys(dish_ids))
+    found = {dish_id: dishes[dish_id] for dish_id in dish_ids if dish_id in dishes}
+    missing = [dish_id for dish_id in dish_ids if dish_id not in found and dish_id not in unknown]
+    _stats["unknown_hits"] += len(dish_ids) - len(found) - len(missing)
+    if missing:
+        fetched = _fetch(missing, areas)
+        dishes.update(fetched)
+        found.update(fetched)
+        not_found = [dish_id for dish_id in missing if dish_id not in fetched]
+        if len(unknown) + len(not_found) > MAX_UNKNOWN:
+            unknown.clear()
+        unknown.update(not_found)
+    return found
+
+
+def remember(entity):
+    """Put a dish written by this worker (full MenuTable entity) into the index."""
+    if _loaded_at is not None:
+        _dishes[entity["RowKey"]] = to_info(entity)
+        _unknown.discard(entity["RowKey"])
+
+
+def forget(dish_id):
+    """Drop a dish after a partial update or delete; re-read on next use."""
+    _dishes.pop(dish_id, None)
+    _unknown.discard(dish_id)
+
+
+def get_stats():
+    return {
+        "dishes": len(_dishes),
+        "unknown": len(_unknown),
+        "loads": _stats["loads"],
+        "fetched": _stats["fetched"],
+        "unknown_hits": _stats["unknown_hits"],
+        "age_seconds": None if _loaded_at is None else round(time.monotonic() - _loaded_at, 1),
+    }
@@ -0,0 +1,133 @@
+import functools
+import operator
+
+from shared_code import serialization
+
+# Table entity -> API JSON for every entity type.
+#
+# *_FIELDS maps each JSON field to the table column(s) it is read from;
+# it drives ?fields= projection. The Mapper built from it (RESTAURANT,
+# CUSTOMER, DISH, ORDER) turns an entity into the response dict; its
+# to_json is also exported as *_to_json.
+
+# distinct ?fields= combinations kept per entity type
+MAX_PROJECTIONS = 64
+
+
+def _reader(columns, convert=None):
+    """entity -> value of the first non-empty column, converted."""
+    getters = [operator.methodcaller("get", column) for column in columns]
+
+    def read(entity):
+        value = None
+        for getter in getters:
+            value = getter(entity)
+            if value:
+                break
+        return value if convert is None else convert(value)
+
+    return read
+
+
+class Mapper:
+    """
+    Entity -> dict function built from a field map.
+
+    A field read from one column without a converter is a plain
+    entity.get; the others get a reader (_reader) once per entity type.
+    Projections for ?fields= are built the same way and the last
+    MAX_PROJECTIONS of them are kept. converters maps a JSON field to a
+    function applied to the column value.
+    """
+    __slots__ = ("field_map", "converters", "to_json", "_items", "_projections")
+
+    def __init__(self, field_map, converters=None):
+        self.field_map = field_map
+        self.converters = converters or {}
+        # (name, column, None) or (name, None, reader)
+        self._items = {}
+        for name, columns in field_map.items():
+            if isinstance(columns, str):
+                columns = (columns,)
+            if len(columns) == 1 and name not in self.converters:
+                self._items[name] = (name, columns[0], None)
+            else:
+                self._items[name] = (name, None, _reader(columns, self.converters.get(name)))
+        self.to_json = self._mapper(tuple(field_map))
+        # per instance, so every entity type keeps its own MAX_PROJECTIONS
+        self._projections = functools.lru_cache(maxsize=MAX_PROJECTIONS)(self._mapper)
+
+    def _mapper(self, fields):
+        items = [self._items[name] for name in fields]
+
+        def to_json(entity):
+            get = entity.get
+            return {name: get(column) if read is None else read(entity) for name, column, read in items}
+
+        return to_json
+
+    def project(self, fields):
+        """Mapper function for the requested fields only (all fields when empty)."""
+        if not fields:
+            return self.to_json
+        return self._projections(tuple(fields))
+
+
+RESTAURANT_FIELDS = {
+    "area": "PartitionKey",
+    "restaurantId": "RowKey",
+    "address": "Address",
+    "description": "Description",
+    "imageURL": "ImageURL",
+    "name": "Name",
+    "phone": "Phone",
+}
+
+RESTAURANT = Mapper(RESTAURANT_FIELDS)
+restaurant_to_json = RESTAURANT.to_json
+
+
+CUSTOMER_FIELDS = {
+    "area": "PartitionKey",
+    "customerId": "RowKey",
+    "address": "Address",
+    "name": "Name",
+    "lastName": "LastName",
+    "phone": "Phone",
+}
+
+CUSTOMER = Mapper(CUSTOMER_FIELDS)
+customer_to_json = CUSTOMER.to_json
+
+
+DISH_FIELDS = {
+    "area": "PartitionKey",
+    "dishId": "RowKey",
+    "description": "Description",
+    "name": "Name",
+    "price": "Price",
+    "restaurantId": "RestaurantID",
+    "imageURL": "ImageURL",
+    "isAvailable": "IsAvailable",
+    "prepTime": "PrepTime",
+}
+
+DISH = Mapper(DISH_FIELDS)
+dish_to_json = DISH.to_json
+
+
+ORDER_FIELDS = {
+    "area": "PartitionKey",
+    "orderId": ("OrderID", "RowKey"),
+    "customerId": "CustomerID",
+    "dishesOrdered": "DishesOrdered",
+    "estimatedTime": "EstimatedTime",
+    "estimatedArrival": "EstimatedArrival",
+    "totalCost": "TotalCost",
+    "status": "Status",
+}
+
+# DishesOrdered is stored as a JSON array string; it goes out without
+# being parsed and re-encoded
+ORDER = Mapper(ORDER_FIELDS, {"dishesOrdered": serialization.json_array})
+order_to_json = ORDER.to_json
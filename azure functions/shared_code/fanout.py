@@ -0,0 +1,186 @@
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from shared_code import cache, odata
+
+# Scatter-gather reads over the area partitions of a table.
+#
+# A query without a PartitionKey condition is served by Table Storage as
+# one sequential scan, North then East then West. Here every area gets
+# its own query, run concurrently, and pages are handed back in whatever
+# order they arrive, so a full listing takes about as long as the
+# slowest area instead of the sum of all of them.
+#
+# Areas come from the AREAS setting ("North,East,West") or are discovered
+# per table and cached. The key ranges between the known areas are
+# queried as well, so rows of an area nobody knew about yet are still
+# returned (and trigger a rediscovery).
+#
+# The partition queries of all requests share one pool of MAX_WORKERS
+# threads. Each query reads at most PREFETCH_PAGES pages ahead of the
+# caller and then waits, so a listing holds a bounded number of pages no
+# matter how large the table is.
+
+AREAS = [a.strip() for a in os.environ.get("AREAS", "").split(",") if a.strip()]
+AREA_CACHE_TTL = float(os.environ.get("AREA_CACHE_TTL", "300"))
+MAX_WORKERS = int(os.environ.get("FANOUT_MAX_WORKERS", "8"))
+PREFETCH_PAGES = int(os.environ.get("FANOUT_PREFETCH_PAGES", "2"))
+
+_areas = cache.TTLCache(maxsize=64, ttl=AREA_CACHE_TTL)
+_pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="fanout")
+
+_DONE = object()
+# how often a worker blocked on a full queue checks whether the caller left
+_PUT_TIMEOUT = 0.1
+
+
+def discover_areas(table):
+    """
+    Distinct PartitionKeys of a table, without reading the whole table.
+
+    Skip scan: ask for the first key greater than the last one found,
+    one entity per round trip.
+    """
+    areas = []
+    while True:
+        if areas:
+            pager = table.query_entities(
+                query_filter=odata.compare("PartitionKey", "gt", areas[-1]),
+                results_per_page=1,
+                select=["PartitionKey"],
+            )
+        else:
+            pager = table.list_entities(results_per_page=1, select=["PartitionKey"])
+        entity = next(iter(pager), None)
+        if entity is None:
+            return areas
+        areas.append(entity["PartitionKey"])
+
+
+def get_areas(table):
+    """Known areas of a table: the AREAS setting, else discovered and cached."""
+    if AREAS:
+        return sorted(AREAS)
+    areas = _areas.get(table.table_name)
+    if areas is None:
+        areas = discover_areas(table)
+        _areas.set(table.table_name, areas)
+        logging.info(f"Discovered areas of {table.table_name}: {areas}")
+    return areas
+
+
+def partition_filters(areas):
+    """
+    One filter per known area plus one per key range around them, so the
+    filters together cover every possible PartitionKey exactly once.
+    Returns (filter, is_gap) pairs.
+    """
+    if not areas:
+        return [(None, True)]
+    filters = [(odata.compare("PartitionKey", "lt", areas[0]), True)]
+    for i, area in enumerate(areas):
+        filters.append((odata.eq("PartitionKey", area), False))
+        upper = odata.compare("PartitionKey", "lt", areas[i + 1]) if i + 1 < len(areas) else ""
+        filters.append((odata.all_of(odata.compare("PartitionKey", "gt", area), upper), True))
+    return filters
+
+
+def _put(out, item, stop):
+    """Queue item, waiting while out is full. False if the caller stopped reading."""
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=_PUT_TIMEOUT)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _read(table, index, partition_filter, query_filter, kwargs, out, stop):
+    """Push the pages of one partition query onto out. Returns the row count."""
+    if query_filter:
+        partition_filter = f"{partition_filter} and ({query_filter})" if partition_filter else query_filter
+    if partition_filter:
+        pager = table.query_entities(query_filter=partition_filter, **kwargs)
+    else:
+        pager = table.list_entities(**kwargs)
+
+    count = 0
+    for page in pager.by_page():
+        page = list(page)
+        if page:
+            count += len(page)
+            if not _put(out, (index, page), stop):
+                break
+    return count
+
+
+def _worker(table, index, partition_filter, is_gap, query_filter, kwargs, out, stop):
+    try:
+        count = _read(table, index, partition_filter, query_filter, kwargs, out, stop)
+        if is_gap and count and not AREAS:
+            # rows of an area we did not know about, look again next time
+            _areas.invalidate(lambda key: key == table.table_name)
+    except Exception as e:
+        _put(out, (index, e), stop)
+    finally:
+        _put(out, (index, _DONE), stop)
+
+
+def query_pages(table, query_filter=None, ordered=False, **kwargs):
+    """
+    Pages of entities matching query_filter from every area, read concurrently.
+
+    Drop-in for paging.query_pages when the whole result set is wanted
+    (no limit / continuation token). kwargs (select, ...) go to the SDK.
+
+    Pages come in arrival order. ordered=True still reads every area at
+    once but hands pages back in PartitionKey order: each area has its own
+    queue, read once the areas before it are done, so the result is
+    identical to a sequential scan (stable ETags).
+    """
+    filters = partition_filters(get_areas(table))
+    stop = threading.Event()
+    if ordered:
+        queues = [queue.Queue(maxsize=PREFETCH_PAGES) for _ in filters]
+    else:
+        queues = [queue.Queue(maxsize=PREFETCH_PAGES * len(filters))] * len(filters)
+    for index, (partition_filter, is_gap) in enumerate(filters):
+        _pool.submit(_worker, table, index, partition_filter, is_gap, query_filter, kwargs, queues[index], stop)
+
+    try:
+        if ordered:
+            for out in queues:
+                while True:
+                    _, item = out.get()
+                    if item is _DONE:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+        else:
+            done = 0
+            while done < len(filters):
+                _, item = queues[0].get()
+                if item is _DONE:
+                    done += 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+    finally:
+        # an error, or the caller stopped early: let the workers go
+        stop.set()
+
+
+def query_entities(table, query_filter=None, **kwargs):
+    """Entities of query_pages, one by one."""
+    for page in query_pages(table, query_filter=query_filter, **kwargs):
+        yield from page
+
+
+def get_cache_stats():
+    return _areas.stats()
@@ -0,0 +1,226 @@
+import datetime
+import hashlib
+import logging
+import os
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+
+from shared_code import batch, cache, storage
+
+# Idempotency-Key support: a retried request gets the first response back.
+#
+#   PartitionKey = <scope>_<first 2 hex chars of the key hash>
+#   RowKey       = blake2b hash of the key (any header value is a valid key)
+#   State        = "in_progress" while the first request runs, then "done"
+#   Fingerprint  = hash of the request body, a reused key with another body is refused
+#   Status, Body = the response to replay
+#   ExpiresAt    = end of the TTL, expired rows count as absent
+#
+# Finished responses are also kept in a per-worker LRU, so hot retries
+# don't even read the table. OrderStatusUpdater purges expired rows.
+
+HEADER = "Idempotency-Key"
+TABLE_NAME = "IdempotencyTable"
+TTL_SECONDS = float(os.environ.get("IDEMPOTENCY_TTL_HOURS", "24")) * 3600
+CACHE_SIZE = int(os.environ.get("IDEMPOTENCY_CACHE_SIZE", "1024"))
+# an in-progress marker older than this belongs to a crashed request
+IN_PROGRESS_TIMEOUT_SECONDS = float(os.environ.get("IDEMPOTENCY_IN_PROGRESS_TIMEOUT", "30"))
+MAX_KEY_LENGTH = 255
+# responses bigger than this are not stored (string columns max 64 KB)
+_MAX_BODY_CHARS = 30000
+
+_responses = cache.TTLCache(maxsize=CACHE_SIZE, ttl=TTL_SECONDS)
+
+
+class Claim:
+    """
+    Outcome of claim():
+
+    - replay      -> (status_code, body) of the original response, or None
+    - conflict    -> user facing message when the request must be refused
+    - status_code -> HTTP status for the conflict (409 / 422)
+
+    When neither is set the caller owns the key and must call complete()
+    or release() once the request is handled.
+    """
+
+    def __init__(self, partition_key, row_key, fingerprint, replay=None, conflict=None, status_code=None):
+        self.partition_key = partition_key
+        self.row_key = row_key
+        self.fingerprint = fingerprint
+        self.replay = replay
+        self.conflict = conflict
+        self.status_code = status_code
+
+
+def get_table_client():
+    return storage.get_table_client(TABLE_NAME, create=True)
+
+
+def _utc_now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _hash(value):
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    return hashlib.blake2b(value or b"", digest_size=16).hexdigest()
+
+
+def check_key(key):
+    """User facing error message for an unusable key, else None."""
+    if not key or not key.strip():
+        return f"{HEADER} must not be empty"
+    if len(key) > MAX_KEY_LENGTH:
+        return f"{HEADER} must be at most {MAX_KEY_LENGTH} characters"
+    return None
+
+
+def _expired(row, now):
+    expires_at = row.get("ExpiresAt")
+    return isinstance(expires_at, datetime.datetime) and expires_at < now
+
+
+def _stale(row, now):
+    started = row.get("StartedAt")
+    if not isinstance(started, datetime.datetime):
+        return True
+    return (now - started).total_seconds() > IN_PROGRESS_TIMEOUT_SECONDS
+
+
+def _marker(claim, now):
+    return {
+        "PartitionKey": claim.partition_key,
+        "RowKey": claim.row_key,
+        "State": "in_progress",
+        "Fingerprint": claim.fingerprint,
+        "StartedAt": now,
+        "ExpiresAt": now + datetime.timedelta(seconds=TTL_SECONDS),
+    }
+
+
+def claim(scope, key, request_body):
+    """
+    Claim key for a request, or find the response to replay.
+
+    The in-progress marker is written with create_entity, so of two
+    concurrent requests with the same key only one runs; the other gets
+    a 409 and can retry. A marker left behind by a crashed request is
+    taken over after IN_PROGRESS_TIMEOUT_SECONDS.
+    """
+    row_key = _hash(key)
+    outcome = Claim(f"{scope}_{row_key[:2]}", row_key, _hash(request_body))
+    cache_key = (outcome.partition_key, outcome.row_key)
+
+    cached = _responses.get(cache_key)
+    if cached is not None:
+        fingerprint, status_code, body = cached
+        if fingerprint != outcome.fingerprint:
+            outcome.conflict = f"{HEADER} was already used for a different request"
+            outcome.status_code = 422
+        else:
+            outcome.replay = (status_code, body)
+        return outcome
+
+    table = get_table_client()
+    now = _utc_now()
+    try:
+        table.create_entity(entity=_marker(outcome, now))
+        return outcome
+    except ResourceExistsError:
+        pass
+
+    try:
+        row = table.get_entity(partition_key=outcome.partition_key, row_key=outcome.row_key)
+    except ResourceNotFoundError:
+        # finished and released in between, try once more
+        return _take_over(table, outcome, None, now)
+
+    if _expired(row, now):
+        return _take_over(table, outcome, row, now)
+    if row.get("Fingerprint") != outcome.fingerprint:
+        outcome.conflict = f"{HEADER} was already used for a different request"
+        outcome.status_code = 422
+        return outcome
+    if row.get("State") == "done":
+        outcome.replay = (int(row.get("Status") or 200), row.get("Body") or "")
+        _responses.set(cache_key, (outcome.fingerprint, outcome.replay[0], outcome.replay[1]))
+        return outcome
+    if _stale(row, now):
+        return _take_over(table, outcome, row, now)
+
+    outcome.conflict = f"A request with this {HEADER} is still being processed"
+    outcome.status_code = 409
+    return outcome
+
+
+def _take_over(table, claim, row, now):
+    """Replace an expired / abandoned row, unless someone else got there first."""
+    try:
+        if row is None:
+            table.create_entity(entity=_marker(claim, now))
+        else:
+            table.update_entity(
+                entity=_marker(claim, now),
+                mode="replace",
+                etag=row.metadata["etag"],
+                match_condition=MatchConditions.IfNotModified,
+            )
+        return claim
+    except (ResourceExistsError, ResourceModifiedError, ResourceNotFoundError):
+        claim.conflict = f"A request with this {HEADER} is still being processed"
+        claim.status_code = 409
+        return claim
+
+
+def complete(claim, status_code, body):
+    """Store the response of a claimed key for replays."""
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", errors="replace")
+    _responses.set((claim.partition_key, claim.row_key), (claim.fingerprint, status_code, body))
+
+    if len(body) > _MAX_BODY_CHARS:
+        logging.warning(f"Response for idempotency key {claim.row_key} too big to store")
+        release(claim)
+        return
+
+    now = _utc_now()
+    get_table_client().upsert_entity(
+        entity={
+            "PartitionKey": claim.partition_key,
+            "RowKey": claim.row_key,
+            "State": "done",
+            "Fingerprint": claim.fingerprint,
+            "Status": status_code,
+            "Body": body,
+            "StartedAt": now,
+            "ExpiresAt": now + datetime.timedelta(seconds=TTL_SECONDS),
+        },
+        mode="replace",
+    )
+
+
+def release(claim):
+    """Drop the marker of a request that failed, so a retry runs again."""
+    get_table_client().delete_entity(partition_key=claim.partition_key, row_key=claim.row_key)
+
+
+def purge_expired(now=None):
+    """Delete expired rows. Returns how many were deleted."""
+    now = now or _utc_now()
+    table = get_table_client()
+    rows = table.query_entities(
+        query_filter="ExpiresAt lt @now",
+        parameters={"now": now},
+        select=["PartitionKey", "RowKey"],
+    )
+    operations = [("delete", {"PartitionKey": r["PartitionKey"], "RowKey": r["RowKey"]}) for r in rows]
+    if not operations:
+        return 0
+    results = batch.submit_grouped(table, operations)
+    return sum(1 for result in results if result["ok"])
+
+
+def get_stats():
+    return _responses.stats()
@@ -0,0 +1,114 @@
+import logging
+import os
+
+from azure.core.exceptions import ResourceNotFoundError
+
+from shared_code import batch, cache, fanout, odata, storage
+
+# id -> area lookup shared by all entity tables.
+#
+#   PartitionKey = source table name (RestaurantTable, MenuTable, ...)
+#   RowKey       = entity id (restaurantId, dishId, ...)
+#   Area         = PartitionKey of the entity in the source table
+#
+# POST handlers write here after every upsert so PUT / DELETE can go
+# straight to the entity instead of scanning the source table by RowKey.
+
+TABLE_NAME = "IdLookupTable"
+
+# Table Storage allows at most 15 comparisons in one filter
+_IDS_PER_QUERY = 14
+
+# ids the RowKey scan of find_area did not find, per worker. Requests for
+# unknown ids then cost one point read instead of a scan of every area.
+MISS_TTL_SECONDS = float(os.environ.get("LOOKUP_MISS_TTL", "30"))
+_misses = cache.TTLCache(maxsize=1024, ttl=MISS_TTL_SECONDS)
+
+
+def get_table_client():
+    return storage.get_table_client(TABLE_NAME, create=True)
+
+
+def build_entity(source_table, entity_id, area, **extra):
+    entity = {
+        "PartitionKey": source_table,
+        "RowKey": entity_id,
+        "Area": area,
+    }
+    entity.update(extra)
+    return entity
+
+
+def remember(source_table, entity_id, area, **extra):
+    """Record (or move) the area of an entity. Extra columns are merged in."""
+    get_table_client().upsert_entity(
+        entity=build_entity(source_table, entity_id, area, **extra),
+        mode="merge",
+    )
+
+
+def remember_many(source_table, entries):
+    """Batched remember() for a list of (entity_id, area) pairs."""
+    operations = [
+        ("upsert", build_entity(source_table, entity_id, area), {"mode": "merge"})
+        for entity_id, area in entries
+    ]
+    for result in batch.submit_grouped(get_table_client(), operations):
+        if not result["ok"]:
+            logging.warning(f"Lookup upsert for {source_table} failed: {result['error']}")
+
+
+def forget(source_table, entity_id):
+    get_table_client().delete_entity(partition_key=source_table, row_key=entity_id)
+
+
+def resolve(source_table, entity_id):
+    """Point read of the lookup row, or None if the id was never recorded."""
+    try:
+        return get_table_client().get_entity(partition_key=source_table, row_key=entity_id)
+    except ResourceNotFoundError:
+        return None
+
+
+def resolve_many(source_table, entity_ids):
+    """Lookup rows for many ids at once, as {entity_id: row}. Unknown ids are left out."""
+    table = get_table_client()
+    found = {}
+    for ids in batch.chunks(list(dict.fromkeys(entity_ids)), _IDS_PER_QUERY):
+        id_filter = odata.any_of(*(odata.eq("RowKey", entity_id) for entity_id in ids))
+        for row in table.query_entities(
+            query_filter=odata.all_of(odata.eq("PartitionKey", source_table), id_filter)
+        ):
+            found[row["RowKey"]] = row
+    return found
+
+
+def find_area(table, source_table, entity_id):
+    """
+    Return the area (PartitionKey) of entity_id in table, or None.
+
+    Uses the lookup table first. Rows written before the lookup existed
+    are found with a one-off RowKey scan (all areas in parallel) and
+    backfilled into the lookup. Ids the scan does not find are not scanned
+    for again for MISS_TTL_SECONDS; a POST in the meantime records them in
+    the lookup, which is always read first.
+    """
+    found = resolve(source_table, entity_id)
+    if found:
+        return found["Area"]
+    if _misses.get((source_table, entity_id)):
+        return None
+
+    entities = list(fanout.query_entities(
+        table,
+        query_filter=odata.eq("RowKey", entity_id),
+        select=["PartitionKey"],
+    ))
+    if not entities:
+        _misses.set((source_table, entity_id), True)
+        return None
+
+    area = entities[0]["PartitionKey"]
+    logging.info(f"Backfilling lookup for {source_table}/{entity_id}")
+    remember(source_table, entity_id, area)
+    return area
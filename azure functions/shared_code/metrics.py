@@ -0,0 +1,252 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from shared_code import startup
+
+# Per-request phase timings and per-worker rolling histograms.
+#
+# @instrument("RestaurantApi") around a main() starts a timing record for
+# the request. Code anywhere below adds to it:
+#
+#   with metrics.phase("query"): ...     time spent in a phase (summed)
+#   metrics.count("entities", n)          counters
+#
+# When main returns, the phases go out as a Server-Timing header
+# (visible in the browser dev tools) and into histograms per function,
+# method and phase. The histograms keep one slot per minute for the last
+# METRICS_WINDOW_MINUTES minutes; MetricsApi serves them.
+#
+# Phases used so far: client (storage client acquisition), query
+# (waiting for storage pages), materialize (entity -> dict), serialize
+# (JSON encoding), compress, total. The first call of a function in a
+# worker also counts cold_start = 1 (see startup.py).
+
+WINDOW_MINUTES = int(os.environ.get("METRICS_WINDOW_MINUTES", "5"))
+
+# histogram bucket upper bounds, milliseconds
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, float("inf"))
+
+_current = contextvars.ContextVar("request_timings", default=None)
+
+_lock = threading.Lock()
+_slots = {}         # minute -> {(function, method, phase): [bucket counts..., count, sum]}
+_counters = {}      # minute -> {(function, method, counter): total}
+_stats_sources = {}
+_started = time.time()
+
+
+class RequestTimings:
+    def __init__(self, function, method):
+        self.function = function
+        self.method = method
+        self.phases = {}
+        self.counts = {}
+        self.start = time.perf_counter()
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def server_timing(self):
+        parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.phases.items()]
+        parts += [f'{name};desc="{value}"' for name, value in self.counts.items()]
+        return ", ".join(parts)
+
+
+@contextmanager
+def phase(name):
+    """Add the time spent in the block to the current request's phase."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def timed(name):
+    """Decorator version of phase(), for plain and async functions."""
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with phase(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, value):
+    timings = _current.get()
+    if timings is not None:
+        timings.counts[name] = timings.counts.get(name, 0) + value
+
+
+def _bucket(ms):
+    for i, bound in enumerate(BUCKETS_MS):
+        if ms <= bound:
+            return i
+    return len(BUCKETS_MS) - 1
+
+
+def _record(timings):
+    minute = int(time.time() // 60)
+    with _lock:
+        slot = _slots.setdefault(minute, {})
+        for name, seconds in timings.phases.items():
+            ms = seconds * 1000
+            key = (timings.function, timings.method, name)
+            hist = slot.get(key)
+            if hist is None:
+                hist = slot[key] = [0] * (len(BUCKETS_MS) + 2)
+            hist[_bucket(ms)] += 1
+            hist[-2] += 1
+            hist[-1] += ms
+        counters = _counters.setdefault(minute, {})
+        for name, value in timings.counts.items():
+            key = (timings.function, timings.method, name)
+            counters[key] = counters.get(key, 0) + value
+
+        # forget minutes that left the window
+        oldest = minute - WINDOW_MINUTES + 1
+        for table in (_slots, _counters):
+            for old in [m for m in table if m < oldest]:
+                del table[old]
+
+
+def _finish(timings, response):
+    timings.add("total", time.perf_counter() - timings.start)
+    if startup.first_call(timings.function, timings.phases["total"]):
+        timings.counts["cold_start"] = 1
+    if response is not None and hasattr(response, "headers"):
+        body = response.get_body()
+        timings.counts["bytes"] = len(body) if body else 0
+        response.headers["Server-Timing"] = timings.server_timing()
+        response.headers["Timing-Allow-Origin"] = "*"
+        expose = response.headers.get("Access-Control-Expose-Headers")
+        response.headers["Access-Control-Expose-Headers"] = (
+            f"{expose}, Server-Timing" if expose else "Server-Timing"
+        )
+    try:
+        _record(timings)
+    except Exception as e:
+        logging.error(f"Failed to record metrics: {e}")
+
+
+def instrument(function):
+    """
+    Decorator for a function's main(). Works for sync and async mains and
+    for triggers without an HTTP response (timer).
+    """
+    def decorator(fn):
+        startup.loaded(function)
+
+        def start(args):
+            req = args[0] if args else None
+            method = getattr(req, "method", None) or "TIMER"
+            return RequestTimings(function, method.upper())
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                timings = start(args)
+                token = _current.set(timings)
+                try:
+                    response = await fn(*args, **kwargs)
+                finally:
+                    _current.reset(token)
+                _finish(timings, response)
+                return response
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            timings = start(args)
+            token = _current.set(timings)
+            try:
+                response = fn(*args, **kwargs)
+            finally:
+                _current.reset(token)
+            _finish(timings, response)
+            return response
+        return wrapper
+
+    return decorator
+
+
+def register_stats(name, source):
+    """Expose source() (e.g. a cache's stats) on the metrics endpoint."""
+    _stats_sources[name] = source
+
+
+def _percentile(hist, fraction):
+    target = hist[-2] * fraction
+    seen = 0
+    for i, bound in enumerate(BUCKETS_MS):
+        seen += hist[i]
+        if seen >= target:
+            return bound if bound != float("inf") else None
+    return None
+
+
+def snapshot():
+    """Histograms merged over the window, plus registered stats."""
+    with _lock:
+        merged = {}
+        for slot in _slots.values():
+            for key, hist in slot.items():
+                total = merged.setdefault(key, [0] * len(hist))
+                for i, value in enumerate(hist):
+                    total[i] += value
+        counters = {}
+        for slot in _counters.values():
+            for key, value in slot.items():
+                counters[key] = counters.get(key, 0) + value
+
+    functions = {}
+    for (function, method, name), hist in sorted(merged.items()):
+        entry = functions.setdefault(function, {}).setdefault(method, {"phases": {}, "counters": {}})
+        entry["phases"][name] = {
+            "count": hist[-2],
+            "mean_ms": round(hist[-1] / hist[-2], 2) if hist[-2] else None,
+            # upper bound of the bucket the percentile falls in
+            "p50_ms": _percentile(hist, 0.50),
+            "p95_ms": _percentile(hist, 0.95),
+            "p99_ms": _percentile(hist, 0.99),
+            "buckets": {
+                ("inf" if bound == float("inf") else str(bound)): hist[i]
+                for i, bound in enumerate(BUCKETS_MS) if hist[i]
+            },
+        }
+    for (function, method, name), value in sorted(counters.items()):
+        entry = functions.setdefault(function, {}).setdefault(method, {"phases": {}, "counters": {}})
+        entry["counters"][name] = value
+
+    stats = {}
+    for name, source in list(_stats_sources.items()):
+        try:
+            stats[name] = source()
+        except Exception as e:
+            stats[name] = {"error": str(e)}
+
+    return {
+        "pid": os.getpid(),
+        "uptime_seconds": round(time.time() - _started, 1),
+        "window_minutes": WINDOW_MINUTES,
+        "functions": functions,
+        "stats": stats,
+    }
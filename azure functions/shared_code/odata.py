@@ -0,0 +1,232 @@
+import datetime
+import re
+
+# OData $filter expressions: building them safely and reading them back.
+#
+# Handlers build filters with eq() / compare() / all_of() / any_of() instead
+# of pasting request values into f-strings, so a quote in a value can't
+# change the query. parse() turns a filter into a small tree:
+#
+#   ("cmp", op, ("property", name), ("value", v))
+#   ("and", left, right) / ("or", left, right) / ("not", node)
+#
+# which backends that are not Table Storage (the SQLite engine, the
+# benchmark fake) translate or evaluate. Only the subset Table Storage
+# supports is understood: eq ne lt le gt ge, and or not, parentheses,
+# string / number / bool / datetime / guid literals and @parameters.
+
+COMPARISONS = ("eq", "ne", "lt", "le", "gt", "ge")
+
+_TOKEN = re.compile(
+    r"\s*(?:"
+    r"(?P<open>\()|(?P<close>\))"
+    r"|'(?P<string>(?:[^']|'')*)'"
+    r"|datetime'(?P<datetime>[^']*)'"
+    r"|guid'(?P<guid>[^']*)'"
+    r"|(?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)[LlDdMm]?"
+    r"|@(?P<param>[A-Za-z_][A-Za-z0-9_]*)"
+    r"|(?P<word>[A-Za-z_][A-Za-z0-9_]*)"
+    r")"
+)
+
+_KEYWORDS = {"and", "or", "not"} | set(COMPARISONS)
+
+# 'North' eq PartitionKey -> PartitionKey eq 'North'
+_MIRRORED = {"lt": "gt", "le": "ge", "gt": "lt", "ge": "le"}
+
+
+def as_utc(value):
+    if value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(datetime.timezone.utc)
+
+
+def literal(value):
+    """OData literal for a Python value."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, datetime.datetime):
+        return "datetime'" + as_utc(value).strftime("%Y-%m-%dT%H:%M:%S.%fZ") + "'"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def compare(column, op, value):
+    if op not in COMPARISONS:
+        raise ValueError(f"Unknown comparison {op}")
+    return f"{column} {op} {literal(value)}"
+
+
+def eq(column, value):
+    return compare(column, "eq", value)
+
+
+def all_of(*filters):
+    """Filters joined with and; empty ones are skipped."""
+    return " and ".join(f"({f})" if " or " in f else f for f in filters if f)
+
+
+def any_of(*filters):
+    """Filters joined with or, in parentheses so it can be and-ed."""
+    filters = [f for f in filters if f]
+    if not filters:
+        return ""
+    if len(filters) == 1:
+        return filters[0]
+    return "(" + " or ".join(filters) + ")"
+
+
+def _parse_datetime(value):
+    return as_utc(datetime.datetime.fromisoformat(value.replace("Z", "+00:00")))
+
+
+def _tokenize(expression, parameters):
+    tokens = []
+    pos = 0
+    expression = expression.strip()
+    while pos < len(expression):
+        match = _TOKEN.match(expression, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f"Invalid filter at: {expression[pos:]!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind in ("open", "close"):
+            tokens.append((kind, None))
+        elif kind == "string":
+            tokens.append(("value", text.replace("''", "'")))
+        elif kind == "datetime":
+            tokens.append(("value", _parse_datetime(text)))
+        elif kind == "guid":
+            tokens.append(("value", text))
+        elif kind == "number":
+            is_float = any(c in text for c in ".eE")
+            tokens.append(("value", float(text) if is_float else int(text)))
+        elif kind == "param":
+            if text not in parameters:
+                raise ValueError(f"Missing filter parameter @{text}")
+            value = parameters[text]
+            if isinstance(value, datetime.datetime):
+                value = as_utc(value)
+            tokens.append(("value", value))
+        elif text in ("true", "false"):
+            tokens.append(("value", text == "true"))
+        elif text in _KEYWORDS:
+            tokens.append((text, None))
+        else:
+            tokens.append(("property", text))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def next(self):
+        if self.pos >= len(self.tokens):
+            raise ValueError("Unexpected end of filter")
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def parse(self):
+        node = self.or_()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"Unexpected token in filter: {self.tokens[self.pos]}")
+        return node
+
+    def or_(self):
+        node = self.and_()
+        while self.peek() == "or":
+            self.next()
+            node = ("or", node, self.and_())
+        return node
+
+    def and_(self):
+        node = self.unary()
+        while self.peek() == "and":
+            self.next()
+            node = ("and", node, self.unary())
+        return node
+
+    def unary(self):
+        if self.peek() == "not":
+            self.next()
+            return ("not", self.unary())
+        if self.peek() == "open":
+            self.next()
+            node = self.or_()
+            if self.next()[0] != "close":
+                raise ValueError("Missing ) in filter")
+            return node
+        left = self.operand()
+        op = self.next()[0]
+        if op not in COMPARISONS:
+            raise ValueError(f"Expected a comparison, got {op}")
+        right = self.operand()
+        if left[0] == "value" and right[0] == "property":
+            left, right = right, left
+            op = _MIRRORED.get(op, op)
+        return ("cmp", op, left, right)
+
+    def operand(self):
+        kind, value = self.next()
+        if kind not in ("value", "property"):
+            raise ValueError(f"Expected a property or value, got {kind}")
+        return (kind, value)
+
+
+def parse(expression, parameters=None):
+    """Filter string -> tree (see the top of this module). Raises ValueError."""
+    return _Parser(_tokenize(expression, parameters or {})).parse()
+
+
+_OPERATORS = {
+    "eq": lambda a, b: a == b,
+    "ne": lambda a, b: a != b,
+    "lt": lambda a, b: a < b,
+    "le": lambda a, b: a <= b,
+    "gt": lambda a, b: a > b,
+    "ge": lambda a, b: a >= b,
+}
+
+
+def compare_values(op, a, b):
+    """One comparison with Table Storage semantics: missing or mismatched types never match."""
+    if a is None or b is None:
+        return False
+    if isinstance(a, bool) != isinstance(b, bool):
+        return False
+    if isinstance(a, str) != isinstance(b, str):
+        return False
+    try:
+        return _OPERATORS[op](a, b)
+    except TypeError:
+        return False
+
+
+def predicate(node):
+    """Compile a tree into a function entity -> bool."""
+    kind = node[0]
+    if kind == "or":
+        left, right = predicate(node[1]), predicate(node[2])
+        return lambda e: left(e) or right(e)
+    if kind == "and":
+        left, right = predicate(node[1]), predicate(node[2])
+        return lambda e: left(e) and right(e)
+    if kind == "not":
+        inner = predicate(node[1])
+        return lambda e: not inner(e)
+
+    _, op, (left_kind, left), (right_kind, right) = node
+    if left_kind == "property" and right_kind == "value":
+        return lambda e: compare_values(op, e.get(left), right)
+    if left_kind == "property":
+        return lambda e: compare_values(op, e.get(left), e.get(right))
+    result = compare_values(op, left, right)
+    return lambda e: result
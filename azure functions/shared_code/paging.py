@@ -0,0 +1,125 @@
+import base64
+import json
+import os
+
+from shared_code import metrics, serialization
+
+# Table Storage never returns more than 1000 entities per page.
+MAX_PAGE_SIZE = 1000
+
+TOKEN_HEADER = "X-Continuation-Token"
+
+# limit for GETs that don't send one. Off (0) by default: such a GET then
+# returns every match in one response, which is built in memory. Set it
+# to bound that memory; clients must then follow X-Continuation-Token.
+DEFAULT_LIMIT = min(int(os.environ.get("PAGING_DEFAULT_LIMIT", "0")), MAX_PAGE_SIZE) or None
+
+
+def encode_token(token):
+    """Turn the SDK continuation token (a dict) into an opaque URL-safe string."""
+    if not token:
+        return None
+    raw = json.dumps(token, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_token(value):
+    try:
+        token = json.loads(base64.urlsafe_b64decode(value.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise ValueError("continuationToken is invalid")
+    if not isinstance(token, dict):
+        raise ValueError("continuationToken is invalid")
+    return token
+
+
+def parse_paging(req):
+    """
+    Read paging query parameters.
+
+    Query parameters:
+      - limit             -> max entities per response (1..1000)
+      - continuationToken -> token returned in the X-Continuation-Token header
+
+    Returns (limit, token). limit is None when the caller wants everything
+    (no limit sent and no DEFAULT_LIMIT). Raises ValueError with a user
+    facing message on bad input.
+    """
+    limit = req.params.get("limit")
+    token = req.params.get("continuationToken")
+
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValueError("limit must be an integer")
+        if limit < 1 or limit > MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    else:
+        limit = DEFAULT_LIMIT
+
+    if token:
+        token = decode_token(token)
+    else:
+        token = None
+
+    return limit, token
+
+
+def query_pages(table, query_filter=None, limit=None, continuation_token=None, **kwargs):
+    """Page iterator over query_entities / list_entities."""
+    page_size = limit or MAX_PAGE_SIZE
+    if query_filter:
+        pager = table.query_entities(query_filter=query_filter, results_per_page=page_size, **kwargs)
+    else:
+        pager = table.list_entities(results_per_page=page_size, **kwargs)
+    return pager.by_page(continuation_token=continuation_token)
+
+
+def write_json_pages(pages, to_json, limit=None):
+    """
+    Serialize entities into a JSON array one page at a time.
+
+    Each page is mapped and written to the output buffer before the next one
+    is fetched, so only a single page of entities is alive at once.
+    When limit is set only the first page is read. Without it the encoded
+    pages add up to the whole result (see DEFAULT_LIMIT).
+
+    Each page is encoded with a single serialization.dumps call and the
+    page arrays are joined into one.
+
+    Returns (body, next_token): body is UTF-8 bytes, next_token the encoded
+    continuation token or None when there are no more results.
+    """
+    parts = []
+    entities = 0
+    page_iter = iter(pages)
+    while True:
+        with metrics.phase("query"):
+            page = next(page_iter, None)
+            # the SDK fetches lazily, so the first item is what waits on storage
+            items = list(page) if page is not None else None
+        if items is None:
+            break
+        with metrics.phase("materialize"):
+            mapped = [to_json(entity) for entity in items]
+        if mapped:
+            with metrics.phase("serialize"):
+                # "[a,b]" -> "a,b"
+                parts.append(serialization.dumps(mapped)[1:-1])
+        entities += len(items)
+        if limit:
+            break
+
+    metrics.count("entities", entities)
+
+    next_token = encode_token(pages.continuation_token) if limit else None
+    return b"[" + b",".join(parts) + b"]", next_token
+
+
+def page_headers(base_headers, next_token):
+    headers = dict(base_headers)
+    headers["Access-Control-Expose-Headers"] = TOKEN_HEADER
+    if next_token:
+        headers[TOKEN_HEADER] = next_token
+    return headers
@@ -0,0 +1,195 @@
+import datetime
+import logging
+
+from azure.core.exceptions import ResourceNotFoundError
+
+from shared_code import fanout, lookup, odata, storage
+
+# Pending orders indexed by the minute they become due.
+#
+#   PartitionKey = due bucket, UTC "YYYYMMDDHHMM" (sorts by time)
+#   RowKey       = OrderID
+#   Area, CustomerID, HistoryKey -> enough to update the order and its
+#                                   history row without reading OrderTable
+#   PlacedAt, DueAt
+#
+# Rows are deleted once the order is delivered, so everything with
+# PartitionKey <= the current bucket is work the updater has to do.
+# "~backfilled" (in the "~meta" partition, which sorts after every bucket)
+# marks that pending orders from before the index existed were copied in.
+
+TABLE_NAME = "PendingOrderIndex"
+META_PARTITION = "~meta"
+BACKFILL_MARKER = "~backfilled"
+
+_backfilled = False
+
+
+def get_table_client():
+    return storage.get_table_client(TABLE_NAME, create=True)
+
+
+def utc_now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def as_utc(value):
+    if value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(datetime.timezone.utc)
+
+
+def bucket_for(when):
+    return as_utc(when).strftime("%Y%m%d%H%M")
+
+
+def is_pending(status):
+    return str(status or "").lower() == "pending"
+
+
+def build_entity(order_entity, placed_at=None):
+    """
+    Index row of a pending order, in the bucket of its due time.
+
+    Due time is placed_at + EstimatedTime minutes, placed_at defaults to now.
+    """
+    placed_at = as_utc(placed_at or utc_now())
+    minutes = int(order_entity.get("EstimatedTime") or 0)
+    due_at = placed_at + datetime.timedelta(minutes=minutes)
+
+    return {
+        "PartitionKey": bucket_for(due_at),
+        "RowKey": order_entity["RowKey"],
+        "Area": order_entity["PartitionKey"],
+        "CustomerID": order_entity.get("CustomerID", ""),
+        "HistoryKey": order_entity.get("HistoryKey", ""),
+        "PlacedAt": placed_at,
+        "DueAt": due_at,
+    }
+
+
+def schedule(order_entity, placed_at=None):
+    """Add a pending order to the bucket of its due time. Returns the bucket."""
+    entity = build_entity(order_entity, placed_at)
+    get_table_client().upsert_entity(entity=entity)
+    return entity["PartitionKey"]
+
+
+def is_scheduled(bucket, order_id):
+    """True if the order still has its index row in bucket (not delivered since)."""
+    try:
+        get_table_client().get_entity(partition_key=bucket, row_key=order_id, select=["RowKey"])
+    except ResourceNotFoundError:
+        return False
+    return True
+
+
+def unschedule(bucket, order_id):
+    if bucket:
+        get_table_client().delete_entity(partition_key=bucket, row_key=order_id)
+
+
+def reschedule(bucket, order_id, estimated_time):
+    """
+    Move a pending order after its EstimatedTime changed.
+
+    Returns the new bucket, or None if the order was not in the index
+    (already delivered).
+    """
+    table = get_table_client()
+    try:
+        row = table.get_entity(partition_key=bucket, row_key=order_id)
+    except ResourceNotFoundError:
+        return None
+
+    order_entity = {
+        "PartitionKey": row["Area"],
+        "RowKey": order_id,
+        "CustomerID": row.get("CustomerID", ""),
+        "HistoryKey": row.get("HistoryKey", ""),
+        "EstimatedTime": estimated_time,
+    }
+    new_bucket = schedule(order_entity, placed_at=row["PlacedAt"])
+    if new_bucket != bucket:
+        unschedule(bucket, order_id)
+    return new_bucket
+
+
+def due_entries(now=None):
+    """Index rows whose due time has passed, oldest bucket first."""
+    now = as_utc(now or utc_now())
+    rows = get_table_client().query_entities(
+        query_filter=odata.compare("PartitionKey", "le", bucket_for(now))
+    )
+    for row in rows:
+        due_at = row.get("DueAt")
+        if isinstance(due_at, datetime.datetime) and as_utc(due_at) > now:
+            continue
+        yield row
+
+
+def entity_timestamp(entity):
+    """Last-modified time of a table entity (SDK metadata or a Timestamp column)."""
+    metadata = getattr(entity, "metadata", None) or {}
+    ts = metadata.get("timestamp") or entity.get("Timestamp")
+    if isinstance(ts, datetime.datetime):
+        return as_utc(ts)
+    return None
+
+
+def ensure_backfilled(order_table):
+    """
+    Copy pending orders written before the index existed, once.
+
+    Their due time is based on the entity Timestamp, as the updater used to
+    do. Status is matched like the updater did (Status or status, any
+    case). Orders POST / PUT already indexed (a DueBucket column in the
+    lookup, even an empty one) are left alone, so they don't get a second
+    index row that the lookup doesn't point at. A HistoryKey alone doesn't
+    count: the customer history backfill writes it onto legacy orders too.
+    """
+    global _backfilled
+    if _backfilled:
+        return
+
+    table = get_table_client()
+    try:
+        table.get_entity(partition_key=META_PARTITION, row_key=BACKFILL_MARKER)
+        _backfilled = True
+        return
+    except ResourceNotFoundError:
+        pass
+
+    # Status can't be matched case-insensitively in a filter; this runs once
+    orders = [
+        order for order in fanout.query_entities(order_table)
+        if is_pending(order.get("Status") or order.get("status"))
+    ]
+    refs = lookup.resolve_many(order_table.table_name, [order["RowKey"] for order in orders])
+
+    copied = 0
+    for order in orders:
+        if "DueBucket" in refs.get(order["RowKey"], {}):
+            continue
+        placed_at = entity_timestamp(order)
+        if placed_at is None:
+            logging.warning(f"Order {order.get('RowKey')} missing Timestamp")
+            continue
+        estimated_time = order.get("EstimatedTime")
+        if estimated_time is None:
+            estimated_time = order.get("estimatedTime")
+        if estimated_time is None:
+            logging.warning(f"Order {order.get('RowKey')} missing EstimatedTime")
+            continue
+        try:
+            bucket = schedule(dict(order, EstimatedTime=estimated_time), placed_at=placed_at)
+            lookup.remember(order_table.table_name, order["RowKey"], order["PartitionKey"], DueBucket=bucket)
+            copied += 1
+        except (TypeError, ValueError):
+            logging.warning(
+                f"Order {order.get('RowKey')} has invalid EstimatedTime={estimated_time}"
+            )
+
+    table.upsert_entity(entity={"PartitionKey": META_PARTITION, "RowKey": BACKFILL_MARKER})
+    _backfilled = True
+    logging.info(f"Backfilled {copied} pending orders into {TABLE_NAME}")
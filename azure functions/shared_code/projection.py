@@ -0,0 +1,67 @@
+from shared_code import entities
+
+# Field projection for GET endpoints: ?fields=area,dishId,name
+#
+# Each API declares FIELDS, a dict of JSON field -> table column(s) it is
+# read from. The requested fields become a Table Storage $select, so
+# unused columns (long descriptions, image URLs, dish blobs) are neither
+# read from storage nor written into the response.
+
+KEY_COLUMNS = ("PartitionKey", "RowKey")
+
+
+def parse_fields(req, field_map):
+    """
+    Read the fields query parameter.
+
+    Returns (fields, select): the JSON fields to return and the table
+    columns to select, or (None, None) when all fields were requested.
+    Raises ValueError with a user facing message on unknown fields.
+    """
+    raw = req.params.get("fields")
+    if not raw:
+        return None, None
+
+    fields = []
+    for name in raw.split(","):
+        name = name.strip()
+        if name and name not in fields:
+            fields.append(name)
+
+    unknown = [name for name in fields if name not in field_map]
+    if unknown:
+        raise ValueError(
+            f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(field_map)}"
+        )
+    if not fields:
+        return None, None
+
+    # keys are always read, the mappers rely on them
+    select = list(KEY_COLUMNS)
+    for name in fields:
+        columns = field_map[name]
+        if isinstance(columns, str):
+            columns = (columns,)
+        for column in columns:
+            if column not in select:
+                select.append(column)
+    return fields, select
+
+
+def project(to_json, fields):
+    """
+    Entity mapper that only returns the requested fields.
+
+    to_json is an entities.Mapper (which caches the projection) or a
+    plain entity -> dict function (which is wrapped).
+    """
+    if isinstance(to_json, entities.Mapper):
+        return to_json.project(fields)
+    if not fields:
+        return to_json
+
+    def mapper(entity):
+        full = to_json(entity)
+        return {name: full[name] for name in fields}
+
+    return mapper
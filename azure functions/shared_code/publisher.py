@@ -0,0 +1,177 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from azure.core.exceptions import AzureError
+
+from shared_code import storage
+
+# Fire-and-forget queue messages.
+#
+# publish() only appends to a bounded in-memory buffer and returns; one
+# background thread per queue drains it with the pooled QueueClient,
+# retrying failed sends with exponential backoff. When the buffer is full
+# the overflow policy decides what is lost, and the loss is counted:
+#
+#   drop_oldest -> make room by dropping the oldest buffered message
+#   drop_newest -> drop the message being published
+#
+# Messages still buffered when the worker process dies are lost, so this
+# is only for best-effort traffic such as the invalid-orders log.
+
+BUFFER_SIZE = int(os.environ.get("PUBLISHER_BUFFER_SIZE", "1000"))
+OVERFLOW = os.environ.get("PUBLISHER_OVERFLOW", "drop_oldest")
+MAX_RETRIES = int(os.environ.get("PUBLISHER_MAX_RETRIES", "3"))
+# 0 = send as fast as the queue answers
+MAX_PER_SECOND = float(os.environ.get("PUBLISHER_MAX_PER_SECOND", "0"))
+RETRY_BACKOFF_SECONDS = 0.5
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest")
+
+
+class BufferedPublisher:
+    """Bounded buffer of messages for one queue, sent by a background thread."""
+
+    def __init__(self, queue_name, maxsize=BUFFER_SIZE, overflow=OVERFLOW,
+                 max_retries=MAX_RETRIES, max_per_second=MAX_PER_SECOND):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow}")
+        self.queue_name = queue_name
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.max_retries = max_retries
+        self.interval = 1.0 / max_per_second if max_per_second > 0 else 0.0
+        self._buffer = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._sending = 0
+        self._stats = {
+            "published": 0,
+            "sent": 0,
+            "retries": 0,
+            "failed": 0,
+            "dropped_oldest": 0,
+            "dropped_newest": 0,
+        }
+
+    def publish(self, message):
+        """
+        Buffer a message (str) for sending. Never blocks on the network.
+        Returns False when the message itself was dropped.
+        """
+        with self._cond:
+            self._stats["published"] += 1
+            if len(self._buffer) >= self.maxsize:
+                if self.overflow == "drop_newest":
+                    self._stats["dropped_newest"] += 1
+                    logging.warning(f"Publisher buffer for {self.queue_name} full, message dropped")
+                    return False
+                self._buffer.popleft()
+                self._stats["dropped_oldest"] += 1
+                logging.warning(f"Publisher buffer for {self.queue_name} full, oldest message dropped")
+            self._buffer.append(message)
+            self._ensure_worker()
+            self._cond.notify()
+        return True
+
+    def _ensure_worker(self):
+        """Start the sender thread on first use. Caller must hold _cond."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run,
+                name=f"publisher-{self.queue_name}",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._buffer:
+                    self._cond.wait()
+                message = self._buffer.popleft()
+                self._sending += 1
+
+            start = time.monotonic()
+            try:
+                self._send(message)
+            finally:
+                with self._cond:
+                    self._sending -= 1
+                    self._cond.notify_all()
+
+            # smooth bursts out to at most max_per_second sends
+            wait = self.interval - (time.monotonic() - start)
+            if wait > 0:
+                time.sleep(wait)
+
+    def _send(self, message):
+        attempt = 0
+        while True:
+            try:
+                storage.get_queue_client(self.queue_name).send_message(message)
+                self._stats["sent"] += 1
+                return
+            except AzureError as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    self._stats["failed"] += 1
+                    logging.error(f"Failed to send message to {self.queue_name}: {e}")
+                    return
+                self._stats["retries"] += 1
+                time.sleep(RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1)))
+            except Exception as e:
+                self._stats["failed"] += 1
+                logging.error(f"Failed to send message to {self.queue_name}: {e}")
+                return
+
+    def flush(self, timeout=5.0):
+        """Wait until the buffer is empty (or timeout). Returns True if it is."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._buffer or self._sending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["buffered"] = len(self._buffer)
+            stats["maxsize"] = self.maxsize
+            stats["overflow"] = self.overflow
+        return stats
+
+
+_publishers = {}
+_lock = threading.Lock()
+
+
+def get_publisher(queue_name):
+    """The worker's publisher for queue_name, one buffer and thread per queue."""
+    with _lock:
+        publisher = _publishers.get(queue_name)
+        if publisher is None:
+            publisher = BufferedPublisher(queue_name)
+            _publishers[queue_name] = publisher
+        return publisher
+
+
+def get_stats():
+    with _lock:
+        publishers = dict(_publishers)
+    return {name: publisher.stats() for name, publisher in publishers.items()}
+
+
+@atexit.register
+def _flush_all():
+    # best effort on a clean worker shutdown
+    with _lock:
+        publishers = list(_publishers.values())
+    for publisher in publishers:
+        publisher.flush(timeout=2.0)
@@ -0,0 +1,127 @@
+from shared_code import dish_index
+
+# Server side price and delivery time of a cart.
+#
+# Same rules as calculateDeliveryTime in the customer app
+# (src/components/CustomerView/OrderSummary.tsx):
+#
+#   estimatedTime = longest prepTime of any dish
+#                 + 5 min pickup per restaurant in the customer's area
+#                 + 10 min pickup per restaurant in another area
+#                 + delivery: 10 min if any restaurant is in another area, else 5
+#
+#   totalCost     = sum of price * quantity, prices from MenuTable
+
+SAME_AREA_PICKUP = 5
+OTHER_AREA_PICKUP = 10
+SAME_AREA_DELIVERY = 5
+OTHER_AREA_DELIVERY = 10
+
+
+def cart_lines(dishes_ordered):
+    """
+    Normalize dishesOrdered into [(dishId, quantity)].
+
+    Items may be dish ids ("D007") or cart objects
+    ({"dishId": "D007", "quantity": 2, ...}). Bad items are skipped.
+    """
+    lines = []
+    for item in dishes_ordered or []:
+        if isinstance(item, str):
+            dish_id, quantity = item, 1
+        elif isinstance(item, dict):
+            dish_id = item.get("dishId")
+            try:
+                quantity = int(item.get("quantity", 1))
+            except (TypeError, ValueError):
+                quantity = 0
+        else:
+            continue
+        if isinstance(dish_id, str) and dish_id and quantity > 0:
+            lines.append((dish_id, quantity))
+    return lines
+
+
+def cart_areas(dishes_ordered):
+    """{dishId: area} from cart objects that carry the dish's area."""
+    return {
+        item["dishId"]: item["area"]
+        for item in dishes_ordered or []
+        if isinstance(item, dict) and isinstance(item.get("dishId"), str) and isinstance(item.get("area"), str)
+    }
+
+
+def format_cost(total):
+    """Same format the customer app sends, e.g. "19.80€"."""
+    return f"{total:.2f}€"
+
+
+def quote(customer_area, dishes_ordered):
+    """
+    Price and time a cart with one dish index pass.
+
+    Returns:
+    {
+      "items": [{"dishId", "name", "quantity", "unitPrice", "lineTotal",
+                 "prepTime", "restaurantId", "area", "isAvailable"}],
+      "totalCost": 19.8,
+      "estimatedTime": 35,
+      "unknownDishes": ["D999"],
+      "unavailableDishes": ["D012"]
+    }
+    """
+    lines = cart_lines(dishes_ordered)
+    dishes = dish_index.get_many(
+        [dish_id for dish_id, _ in lines],
+        areas=cart_areas(dishes_ordered),
+    )
+
+    items = []
+    unknown = []
+    unavailable = []
+    total = 0.0
+    max_prep = 0
+    same_area = set()
+    other_area = set()
+
+    for dish_id, quantity in lines:
+        dish = dishes.get(dish_id)
+        if dish is None:
+            unknown.append(dish_id)
+            continue
+        if not dish["isAvailable"]:
+            unavailable.append(dish_id)
+
+        line_total = round(dish["price"] * quantity, 2)
+        total += line_total
+        max_prep = max(max_prep, dish["prepTime"])
+        if dish["area"] == customer_area:
+            same_area.add(dish["restaurantId"])
+        else:
+            other_area.add(dish["restaurantId"])
+
+        items.append({
+            "dishId": dish_id,
+            "name": dish["name"],
+            "quantity": quantity,
+            "unitPrice": dish["price"],
+            "lineTotal": line_total,
+            "prepTime": dish["prepTime"],
+            "restaurantId": dish["restaurantId"],
+            "area": dish["area"],
+            "isAvailable": dish["isAvailable"],
+        })
+
+    estimated_time = 0
+    if items:
+        pickup = len(same_area) * SAME_AREA_PICKUP + len(other_area) * OTHER_AREA_PICKUP
+        delivery = OTHER_AREA_DELIVERY if other_area else SAME_AREA_DELIVERY
+        estimated_time = max_prep + pickup + delivery
+
+    return {
+        "items": items,
+        "totalCost": round(total, 2),
+        "estimatedTime": estimated_time,
+        "unknownDishes": unknown,
+        "unavailableDishes": unavailable,
+    }
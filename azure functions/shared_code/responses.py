@@ -0,0 +1,107 @@
+import gzip
+import hashlib
+import os
+
+import azure.functions as func
+
+from shared_code import metrics
+
+try:
+    import brotli
+except ImportError:  # optional, gzip only without it
+    brotli = None
+
+# bodies smaller than this are sent as is, compressing them is not worth it
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "5"))
+
+
+def make_etag(body):
+    """Weak ETag from a hash of the serialized result set."""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return 'W/"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(req, etag):
+    """True when the request's If-None-Match covers etag (weak comparison)."""
+    header = req.headers.get("If-None-Match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+def accepted_encodings(req):
+    """Encodings from Accept-Encoding with q > 0, e.g. {"gzip", "br"}."""
+    accepted = set()
+    for part in (req.headers.get("Accept-Encoding") or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            accepted.add(name)
+    return accepted
+
+
+@metrics.timed("compress")
+def compress_body(req, body, headers):
+    """
+    Compress body with brotli or gzip if the client accepts it and it is
+    big enough. Sets Content-Encoding / Vary on headers. Returns the body.
+    """
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    headers["Vary"] = "Accept-Encoding"
+    if len(body) < COMPRESSION_MIN_BYTES:
+        return body
+
+    accepted = accepted_encodings(req)
+    if brotli is not None and "br" in accepted:
+        headers["Content-Encoding"] = "br"
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if "gzip" in accepted:
+        headers["Content-Encoding"] = "gzip"
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
+
+
+def cached_get_response(req, body, headers, etag=None):
+    """
+    200 with an ETag, or 304 Not Modified without a body when the client
+    already has this exact result set.
+
+    Cache-Control: no-cache lets browsers keep the response but makes them
+    revalidate with If-None-Match every time. The body is compressed when
+    the client allows it.
+    """
+    etag = etag or make_etag(body)
+    headers = dict(headers)
+    headers["ETag"] = etag
+    headers["Cache-Control"] = "no-cache"
+    expose = headers.get("Access-Control-Expose-Headers")
+    headers["Access-Control-Expose-Headers"] = f"{expose}, ETag" if expose else "ETag"
+
+    if etag_matches(req, etag):
+        headers.pop("Content-Type", None)
+        return func.HttpResponse(status_code=304, headers=headers)
+
+    body = compress_body(req, body, headers)
+    return func.HttpResponse(body, headers=headers, status_code=200)
@@ -0,0 +1,369 @@
+import bisect
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+
+from shared_code import fanout, storage
+from shared_code.entities import dish_to_json
+
+# In-memory inverted index over the menu, for SearchApi.
+#
+#   token -> {dishId: weight}     postings; weight is the best field the
+#                                 token appears in: dish name 3,
+#                                 restaurant name 2, description 1
+#   vocabulary                    every token, sorted, so the tokens that
+#                                 start with a prefix are one bisect away
+#
+# Tokens are lower case words with accents stripped ("Crème brûlée" ->
+# "creme", "brulee"). Every query word matches as a prefix, so "chick
+# burg" finds "Chicken Burger" while it is being typed; whole-word
+# matches rank above prefix matches. All words have to match.
+#
+# Loaded from MenuTable and RestaurantTable once per worker (all areas in
+# parallel, only the columns below) and reloaded after SEARCH_INDEX_TTL
+# seconds. MenuApi / RestaurantApi writes of this worker update it right
+# away; other workers catch up on their next reload, like dish_index.
+
+MENU_TABLE = "MenuTable"
+RESTAURANT_TABLE = "RestaurantTable"
+TTL_SECONDS = float(os.environ.get("SEARCH_INDEX_TTL", "300"))
+
+DISH_COLUMNS = [
+    "PartitionKey", "RowKey", "Name", "Description", "Price",
+    "RestaurantID", "ImageURL", "IsAvailable", "PrepTime",
+]
+RESTAURANT_COLUMNS = ["PartitionKey", "RowKey", "Name"]
+
+NAME_WEIGHT = 3.0
+RESTAURANT_WEIGHT = 2.0
+DESCRIPTION_WEIGHT = 1.0
+# a prefix match counts this much of a whole word match, times how much
+# of the word the prefix covers
+PREFIX_FACTOR = 0.75
+# added when the dish name starts with the whole query
+NAME_PREFIX_BONUS = 2.0
+# vocabulary tokens a single query word may expand to: the whole word
+# plus the tokens in the most dishes. Short prefixes ("c") can match more;
+# search() then reports truncated and its total is a lower bound
+MAX_EXPANSIONS = 64
+
+_WORD = re.compile(r"[^\W_]+")
+
+_lock = threading.RLock()
+_docs = {}            # dishId -> dish columns (DISH_COLUMNS)
+_doc_tokens = {}      # dishId -> {token: weight}
+_postings = {}        # token -> {dishId: weight}
+_vocabulary = []      # sorted tokens
+_restaurants = {}     # (area, restaurantId) -> name
+_menus = {}           # (area, restaurantId) -> {dishId}
+_loaded_at = None
+_stats = {"loads": 0, "queries": 0, "updates": 0}
+
+
+def normalize(text):
+    text = unicodedata.normalize("NFKD", str(text or "")).casefold()
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    return _WORD.findall(normalize(text))
+
+
+# --- index maintenance, caller holds _lock ------------------------------------------
+
+
+def _restaurant_key(doc):
+    return (doc.get("PartitionKey"), doc.get("RestaurantID") or "")
+
+
+def _tokens_of(doc):
+    tokens = {}
+    fields = (
+        (doc.get("Name"), NAME_WEIGHT),
+        (_restaurants.get(_restaurant_key(doc)), RESTAURANT_WEIGHT),
+        (doc.get("Description"), DESCRIPTION_WEIGHT),
+    )
+    for text, weight in fields:
+        for token in tokenize(text):
+            if tokens.get(token, 0) < weight:
+                tokens[token] = weight
+    return tokens
+
+
+def _unindex(dish_id):
+    for token in _doc_tokens.pop(dish_id, {}):
+        postings = _postings.get(token)
+        if postings is None:
+            continue
+        postings.pop(dish_id, None)
+        if not postings:
+            del _postings[token]
+            position = bisect.bisect_left(_vocabulary, token)
+            if position < len(_vocabulary) and _vocabulary[position] == token:
+                del _vocabulary[position]
+
+
+def _index(dish_id):
+    tokens = _tokens_of(_docs[dish_id])
+    _doc_tokens[dish_id] = tokens
+    for token, weight in tokens.items():
+        postings = _postings.get(token)
+        if postings is None:
+            postings = _postings[token] = {}
+            bisect.insort(_vocabulary, token)
+        postings[dish_id] = weight
+
+
+def _put(dish_id, doc):
+    old = _docs.get(dish_id)
+    if old is not None:
+        _unindex(dish_id)
+        _menus.get(_restaurant_key(old), set()).discard(dish_id)
+    _docs[dish_id] = doc
+    _menus.setdefault(_restaurant_key(doc), set()).add(dish_id)
+    _index(dish_id)
+
+
+def _remove(dish_id):
+    old = _docs.pop(dish_id, None)
+    if old is not None:
+        _unindex(dish_id)
+        _menus.get(_restaurant_key(old), set()).discard(dish_id)
+
+
+def _clean(entity, columns):
+    return {column: entity.get(column) for column in columns if entity.get(column) is not None}
+
+
+def ensure_loaded():
+    global _loaded_at, _vocabulary
+    if _loaded_at is not None and time.monotonic() - _loaded_at < TTL_SECONDS:
+        return
+
+    with _lock:
+        if _loaded_at is not None and time.monotonic() - _loaded_at < TTL_SECONDS:
+            return
+        start = time.perf_counter()
+        restaurants = storage.get_table_client(RESTAURANT_TABLE)
+        menus = storage.get_table_client(MENU_TABLE)
+        names = {
+            (e["PartitionKey"], e["RowKey"]): e.get("Name") or ""
+            for e in fanout.query_entities(restaurants, select=RESTAURANT_COLUMNS)
+        }
+        dishes = {e["RowKey"]: _clean(e, DISH_COLUMNS) for e in fanout.query_entities(menus, select=DISH_COLUMNS)}
+
+        _docs.clear()
+        _doc_tokens.clear()
+        _postings.clear()
+        _menus.clear()
+        _restaurants.clear()
+        _restaurants.update(names)
+        for dish_id, doc in dishes.items():
+            _docs[dish_id] = doc
+            _menus.setdefault(_restaurant_key(doc), set()).add(dish_id)
+            tokens = _doc_tokens[dish_id] = _tokens_of(doc)
+            for token, weight in tokens.items():
+                _postings.setdefault(token, {})[dish_id] = weight
+        # one sort instead of an insort per new token
+        _vocabulary = sorted(_postings)
+        _loaded_at = time.monotonic()
+        _stats["loads"] += 1
+        logging.info(
+            f"Loaded search index: {len(_docs)} dishes, {len(_vocabulary)} tokens "
+            f"in {(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+
+
+# --- write hooks (MenuApi / RestaurantApi) ---------------------------------------
+
+
+def add_dish(entity):
+    """A dish written in full (POST) by this worker."""
+    if _loaded_at is None:
+        return
+    with _lock:
+        _put(entity["RowKey"], _clean(entity, DISH_COLUMNS))
+        _stats["updates"] += 1
+
+
+def update_dish(changes):
+    """A merge update (PUT): only the columns present in changes are new."""
+    if _loaded_at is None:
+        return
+    with _lock:
+        old = _docs.get(changes["RowKey"])
+        if old is None:
+            # not known here yet (written by another worker); the next reload has it
+            return
+        doc = dict(old)
+        doc.update(_clean(changes, DISH_COLUMNS))
+        _put(changes["RowKey"], doc)
+        _stats["updates"] += 1
+
+
+def remove_dish(dish_id):
+    if _loaded_at is None:
+        return
+    with _lock:
+        _remove(dish_id)
+        _stats["updates"] += 1
+
+
+def update_restaurant(entity):
+    """A restaurant written by this worker; re-indexes its dishes if the name changed."""
+    if _loaded_at is None or "Name" not in entity:
+        return
+    key = (entity["PartitionKey"], entity["RowKey"])
+    with _lock:
+        name = entity.get("Name") or ""
+        if _restaurants.get(key) == name:
+            return
+        _restaurants[key] = name
+        for dish_id in _menus.get(key, ()):
+            _unindex(dish_id)
+            _index(dish_id)
+        _stats["updates"] += 1
+
+
+# --- queries ----------------------------------------------------------------------
+
+
+def _expand(word):
+    """
+    (tokens, truncated): vocabulary tokens starting with word, at most
+    MAX_EXPANSIONS. Over the cap, the whole word is kept and the rest are
+    the tokens in the most dishes.
+    """
+    start = bisect.bisect_left(_vocabulary, word)
+    end = bisect.bisect_left(_vocabulary, word + "\U0010ffff", start)
+    tokens = _vocabulary[start:end]
+    if len(tokens) <= MAX_EXPANSIONS:
+        return tokens, False
+    tokens.sort(key=lambda token: (token != word, -len(_postings[token]), token))
+    return tokens[:MAX_EXPANSIONS], True
+
+
+def _word_scores(word):
+    """({dishId: best score of word in that dish}, truncated)"""
+    scores = {}
+    tokens, truncated = _expand(word)
+    for token in tokens:
+        factor = 1.0 if token == word else PREFIX_FACTOR * len(word) / len(token)
+        for dish_id, weight in _postings[token].items():
+            score = weight * factor
+            if score > scores.get(dish_id, 0.0):
+                scores[dish_id] = score
+    return scores, truncated
+
+
+def _accepts(doc, area, restaurant_id, available_only):
+    if area and doc.get("PartitionKey") != area:
+        return False
+    if restaurant_id and doc.get("RestaurantID") != restaurant_id:
+        return False
+    if available_only and doc.get("IsAvailable") is False:
+        return False
+    return True
+
+
+def search(query, area=None, restaurant_id=None, available_only=False, limit=20):
+    """
+    Dishes matching every word of query, best first.
+
+    Returns (total, results, truncated): results are dish JSON (as MenuApi
+    returns it) plus "restaurantName" and "score", at most limit of them.
+    truncated means a word matched more than MAX_EXPANSIONS tokens, so
+    dishes with only the rarer completions are missing and total is a
+    lower bound.
+    """
+    ensure_loaded()
+    words = list(dict.fromkeys(tokenize(query)))
+    _stats["queries"] += 1
+    if not words:
+        return 0, [], False
+
+    with _lock:
+        matches = None
+        truncated = False
+        for word in sorted(words, key=len, reverse=True):  # longest word: fewest candidates
+            scores, cut = _word_scores(word)
+            truncated = truncated or cut
+            if matches is None:
+                matches = scores
+            else:
+                matches = {dish_id: score + scores[dish_id] for dish_id, score in matches.items() if dish_id in scores}
+            if not matches:
+                return 0, [], truncated
+
+        phrase = " ".join(words)
+        ranked = []
+        for dish_id, score in matches.items():
+            doc = _docs[dish_id]
+            if not _accepts(doc, area, restaurant_id, available_only):
+                continue
+            name = " ".join(tokenize(doc.get("Name")))
+            if name.startswith(phrase):
+                score += NAME_PREFIX_BONUS
+            ranked.append((-score, name, dish_id))
+        ranked.sort()
+
+        results = []
+        for negative_score, _, dish_id in ranked[:limit]:
+            doc = _docs[dish_id]
+            result = dish_to_json(doc)
+            result["restaurantName"] = _restaurants.get(_restaurant_key(doc))
+            result["score"] = round(-negative_score, 3)
+            results.append(result)
+        return len(ranked), results, truncated
+
+
+def suggest(prefix, area=None, available_only=False, limit=10):
+    """
+    Autocomplete: completions of the last word of prefix, most dishes first.
+
+    The words before it narrow the dishes counted, so "spicy chi" suggests
+    "spicy chicken" only if a spicy dish has a word starting with "chi".
+    Completions are taken from the MAX_EXPANSIONS most common tokens.
+    Returns [{"text", "count"}].
+    """
+    ensure_loaded()
+    words = tokenize(prefix)
+    _stats["queries"] += 1
+    if not words:
+        return []
+    head, last = words[:-1], words[-1]
+
+    with _lock:
+        candidates = None
+        for word in head:
+            scores, _ = _word_scores(word)
+            candidates = set(scores) if candidates is None else candidates & set(scores)
+        suggestions = []
+        for token in _expand(last)[0]:
+            dish_ids = _postings[token].keys()
+            if candidates is not None:
+                dish_ids = candidates.intersection(dish_ids)
+            count = sum(1 for dish_id in dish_ids if _accepts(_docs[dish_id], area, None, available_only))
+            if count:
+                suggestions.append((-count, token))
+        suggestions.sort()
+        text = " ".join(head)
+        return [
+            {"text": f"{text} {token}" if text else token, "count": -count}
+            for count, token in suggestions[:limit]
+        ]
+
+
+def get_stats():
+    return {
+        "dishes": len(_docs),
+        "tokens": len(_vocabulary),
+        "restaurants": len(_restaurants),
+        "loads": _stats["loads"],
+        "queries": _stats["queries"],
+        "updates": _stats["updates"],
+        "age_seconds": None if _loaded_at is None else round(time.monotonic() - _loaded_at, 1),
+    }
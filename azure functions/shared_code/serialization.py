@@ -0,0 +1,67 @@
+import json
+import re
+
+try:
+    import orjson
+except ImportError:  # optional, stdlib json without it
+    orjson = None
+
+# JSON encoding of response bodies.
+#
+# dumps() uses orjson when it is installed (several times faster than the
+# stdlib on lists of entities) and falls back to json.dumps. Both produce
+# compact UTF-8 bytes.
+#
+# Fragment wraps text that already is JSON, e.g. the DishesOrdered array
+# an order keeps as a string, or a catalog row. With orjson >= 3.9 it is
+# copied into the output as is; otherwise it is parsed and re-encoded,
+# which is what the handlers did before.
+
+if orjson is not None and hasattr(orjson, "Fragment"):
+    Fragment = orjson.Fragment
+    FRAGMENTS = True
+else:
+    class Fragment:
+        __slots__ = ("contents",)
+
+        def __init__(self, contents):
+            self.contents = contents
+
+    FRAGMENTS = False
+
+# a flat JSON array of strings / numbers, as json.dumps writes it
+_STRING = r'"(?:[^"\\\x00-\x1f]|\\["\\/bfnrt]|\\u[0-9a-fA-F]{4})*"'
+_NUMBER = r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?"
+_SCALAR = rf"(?:{_STRING}|{_NUMBER}|true|false|null)"
+_FLAT_ARRAY = re.compile(rf"\[\s*(?:{_SCALAR}\s*(?:,\s*{_SCALAR}\s*)*)?\]\Z")
+
+
+def _default(value):
+    if isinstance(value, Fragment):
+        contents = value.contents
+        return json.loads(contents.decode("utf-8") if isinstance(contents, bytes) else contents)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value):
+    """value -> compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default)
+    return json.dumps(value, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def json_array(value):
+    """
+    A column holding a JSON array as a string -> value to serialize.
+
+    Flat arrays pass through as a Fragment without being parsed. Anything
+    else is parsed, and strings that are not JSON are returned unchanged.
+    """
+    if not isinstance(value, str):
+        return value
+    if FRAGMENTS and _FLAT_ARRAY.match(value):
+        return Fragment(value)
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
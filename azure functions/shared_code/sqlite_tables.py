@@ -0,0 +1,648 @@
+import asyncio
+import datetime
+import json
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+
+from azure.core import MatchConditions
+from azure.core.async_paging import AsyncItemPaged
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+from azure.core.paging import ItemPaged
+from azure.data.tables import TableEntity, TableErrorCode, TableTransactionError
+
+from shared_code import odata
+
+# Embedded SQLite engine behind the same client interface as Table Storage,
+# for edge / on-prem deployments and local load tests
+# (STORAGE_BACKEND=sqlite, see storage.py).
+#
+# Every table is one SQLite table in a single database file (SQLITE_PATH):
+#
+#   PartitionKey TEXT, RowKey TEXT    primary key, so rows are read in the
+#                                     same order Table Storage returns them
+#   Properties   JSON                 every other property
+#   Types        JSON                 {"Name": "Edm.DateTime"} for values
+#                                     JSON can't carry
+#   ETag, Timestamp
+#
+# Unlike Table Storage, properties can be indexed: each table gets a
+# partial expression index on json_extract(Properties, '$.<column>') for
+# every INDEXED_COLUMNS entry, so "CustomerID eq ..." or "Price le ..."
+# filters are index searches instead of scans. Handlers keep writing
+# OData filters (built with shared_code.odata); they are parsed here and
+# translated into parameterized SQL.
+#
+# Datetimes are stored as fixed-width UTC strings, which sort and compare
+# like the datetimes themselves.
+#
+# Queue messages go to the _QueueMessages table of the same database,
+# for whatever consumes the queue on that deployment.
+#
+# SQLITE_PATH=:memory: keeps everything in memory (tests, benchmarks).
+# Such a database lives only as long as its connection, so the pool then
+# holds exactly one connection and requests take turns on it.
+
+DATABASE_PATH = os.environ.get("SQLITE_PATH", "storage.sqlite3")
+MEMORY = ":memory:"
+POOL_MAXSIZE = int(os.environ.get("SQLITE_POOL_MAXSIZE", "8"))
+BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+INDEXED_COLUMNS = ("CustomerID", "RestaurantID", "Price", "Status")
+
+# the service never returns more than 1000 entities per page
+MAX_PAGE_SIZE = 1000
+MAX_BATCH_SIZE = 100
+
+QUEUE_TABLE = "_QueueMessages"
+
+_TABLE_NAME = re.compile(r"^[A-Za-z][A-Za-z0-9]{2,62}$")
+_PROPERTY_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+_KEY_COLUMNS = ("PartitionKey", "RowKey", "Timestamp")
+_SQL_OPERATORS = {"eq": "=", "ne": "!=", "lt": "<", "le": "<=", "gt": ">", "ge": ">="}
+
+
+def _format_datetime(value):
+    return odata.as_utc(value).strftime(_DATETIME_FORMAT)
+
+
+def _parse_datetime(value):
+    return datetime.datetime.strptime(value, _DATETIME_FORMAT).replace(tzinfo=datetime.timezone.utc)
+
+
+def _now():
+    return _format_datetime(datetime.datetime.now(datetime.timezone.utc))
+
+
+def _new_etag():
+    return f'W/"{uuid.uuid4().hex}"'
+
+
+def _error(cls, message, error_code):
+    error = cls(message=message)
+    error.error_code = error_code
+    return error
+
+
+def _not_found():
+    return _error(ResourceNotFoundError, "The specified resource does not exist.", TableErrorCode.RESOURCE_NOT_FOUND)
+
+
+def _modified():
+    return _error(
+        ResourceModifiedError,
+        "The update condition specified in the request was not satisfied.",
+        TableErrorCode.UPDATE_CONDITION_NOT_SATISFIED,
+    )
+
+
+def _mode(value):
+    return str(getattr(value, "value", value) or "merge").lower()
+
+
+# --- connections ------------------------------------------------------------------
+
+
+class Database:
+    """One SQLite file and a small pool of connections to it."""
+
+    def __init__(self, path):
+        self.path = path
+        self._pool = queue.LifoQueue(maxsize=POOL_MAXSIZE)
+        self._lock = threading.Lock()
+        self._tables = set()
+        self._stats = {"connections": 0, "statements": 0}
+        if path == MEMORY:
+            self._pool = queue.LifoQueue(maxsize=1)
+            self._pool.put_nowait(self._connect())
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        self._stats["connections"] += 1
+        logging.info(f"SQLite storage: opened connection to {self.path}")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._pool.get() if self.path == MEMORY else self._connect()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def execute(self, sql, params=()):
+        self._stats["statements"] += 1
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def ensure_table(self, table_name):
+        """Create the table and its property indexes once per worker."""
+        if table_name in self._tables:
+            return
+        with self._lock:
+            if table_name in self._tables:
+                return
+            statements = [
+                f'CREATE TABLE IF NOT EXISTS "{table_name}" ('
+                "PartitionKey TEXT NOT NULL, RowKey TEXT NOT NULL, "
+                "Properties TEXT NOT NULL DEFAULT '{}', Types TEXT NOT NULL DEFAULT '{}', "
+                "ETag TEXT NOT NULL, Timestamp TEXT NOT NULL, "
+                "PRIMARY KEY (PartitionKey, RowKey)) WITHOUT ROWID"
+            ]
+            for column in INDEXED_COLUMNS:
+                expression = _property_sql(column)
+                statements.append(
+                    f'CREATE INDEX IF NOT EXISTS "{table_name}_{column}" '
+                    f'ON "{table_name}" ({expression}) WHERE {expression} IS NOT NULL'
+                )
+            with self.connection() as conn:
+                for statement in statements:
+                    conn.execute(statement)
+            self._tables.add(table_name)
+
+    def ensure_queue_table(self):
+        with self._lock:
+            if QUEUE_TABLE in self._tables:
+                return
+            with self.connection() as conn:
+                conn.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{QUEUE_TABLE}" ('
+                    "Id INTEGER PRIMARY KEY AUTOINCREMENT, Queue TEXT NOT NULL, "
+                    "Content TEXT NOT NULL, InsertedOn TEXT NOT NULL)"
+                )
+            self._tables.add(QUEUE_TABLE)
+
+    def get_stats(self):
+        return {
+            "path": self.path,
+            "connections": self._stats["connections"],
+            "idle_connections": self._pool.qsize(),
+            "statements": self._stats["statements"],
+            "tables": sorted(self._tables),
+        }
+
+
+_database = None
+_database_lock = threading.Lock()
+
+
+def get_database():
+    global _database
+    if _database is None:
+        with _database_lock:
+            if _database is None:
+                _database = Database(DATABASE_PATH)
+    return _database
+
+
+# --- entities <-> rows ------------------------------------------------------------
+
+
+def _encode(entity):
+    """Entity -> (properties, types) as stored; keys and None values are left out."""
+    properties = {}
+    types = {}
+    for name, value in entity.items():
+        if name in _KEY_COLUMNS or value is None:
+            continue
+        if isinstance(value, datetime.datetime):
+            value = _format_datetime(value)
+            types[name] = "Edm.DateTime"
+        properties[name] = value
+    return properties, types
+
+
+def _decode(row, select=None):
+    partition_key, row_key, properties, types, etag, timestamp = row
+    values = {"PartitionKey": partition_key, "RowKey": row_key}
+    values.update(json.loads(properties))
+    for name, edm_type in json.loads(types).items():
+        if edm_type == "Edm.DateTime" and name in values:
+            values[name] = _parse_datetime(values[name])
+    if select:
+        values = {name: values[name] for name in select if name in values}
+    entity = TableEntity(values)
+    entity._metadata = {"etag": etag, "timestamp": _parse_datetime(timestamp)}
+    return entity
+
+
+# --- $filter -> SQL ---------------------------------------------------------------
+
+
+def _property_sql(name, key_prefix=""):
+    if not _PROPERTY_NAME.match(name):
+        raise ValueError(f"Invalid property name {name!r}")
+    if name in _KEY_COLUMNS:
+        return key_prefix + name
+    # inlined (not a parameter) so the expression matches the index
+    return f"json_extract(Properties, '$.{name}')"
+
+
+def _value_sql(value, params):
+    if isinstance(value, datetime.datetime):
+        value = _format_datetime(value)
+    elif isinstance(value, bool):
+        value = int(value)
+    params.append(value)
+    return "?"
+
+
+def _operand_sql(operand, params, key_prefix):
+    kind, value = operand
+    if kind == "property":
+        return _property_sql(value, key_prefix)
+    return _value_sql(value, params)
+
+
+def _filter_sql(node, params, key_prefix=""):
+    kind = node[0]
+    if kind in ("and", "or"):
+        left = _filter_sql(node[1], params, key_prefix)
+        right = _filter_sql(node[2], params, key_prefix)
+        return f"({left} {kind.upper()} {right})"
+    if kind == "not":
+        return f"NOT ({_filter_sql(node[1], params, key_prefix)})"
+    _, op, left, right = node
+    return f"{_operand_sql(left, params, key_prefix)} {_SQL_OPERATORS[op]} {_operand_sql(right, params, key_prefix)}"
+
+
+def _uses_property_index(node):
+    """True if every match must satisfy a comparison on an indexed property."""
+    kind = node[0]
+    if kind == "and":
+        return _uses_property_index(node[1]) or _uses_property_index(node[2])
+    if kind == "cmp":
+        _, op, (left_kind, left), (right_kind, _) = node
+        return left_kind == "property" and right_kind == "value" and left in INDEXED_COLUMNS and op != "ne"
+    return False
+
+
+class Query:
+    """A $filter translated to a WHERE clause."""
+
+    def __init__(self, expression=None, parameters=None):
+        self.where = ""
+        self.params = []
+        self.order_by = "PartitionKey, RowKey"
+        if expression:
+            tree = odata.parse(expression, parameters)
+            if _uses_property_index(tree):
+                # Ordering by the bare key columns makes the planner walk the
+                # primary key (already sorted) and test every row. With the
+                # unary + the order can't come from the primary key, so the
+                # property index is used and only the matches are sorted.
+                # The same goes for "PartitionKey eq" next to a range on a
+                # property: without the + it would scan the whole partition.
+                self.where = _filter_sql(tree, self.params, key_prefix="+")
+                self.order_by = "+PartitionKey, +RowKey"
+            else:
+                self.where = _filter_sql(tree, self.params)
+
+    def sql(self, table_name, start, limit):
+        clauses = [f"({self.where})"] if self.where else []
+        params = list(self.params)
+        if start is not None:
+            clauses.append("(PartitionKey, RowKey) >= (?, ?)")
+            params += [start[0], start[1]]
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (
+            f'SELECT PartitionKey, RowKey, Properties, Types, ETag, Timestamp FROM "{table_name}"'
+            f"{where} ORDER BY {self.order_by} LIMIT ?"
+        )
+        return sql, params + [limit]
+
+
+# --- tables -----------------------------------------------------------------------
+
+
+def _page_size(results_per_page):
+    return min(results_per_page or MAX_PAGE_SIZE, MAX_PAGE_SIZE)
+
+
+def _start(token):
+    return (token["PartitionKey"], token["RowKey"]) if token else None
+
+
+def _delete_keys(args, kwargs):
+    """delete_entity(pk, rk), delete_entity(partition_key=, row_key=) or delete_entity(entity)."""
+    if args and isinstance(args[0], dict):
+        return args[0]["PartitionKey"], args[0]["RowKey"]
+    if "entity" in kwargs:
+        return kwargs["entity"]["PartitionKey"], kwargs["entity"]["RowKey"]
+    if len(args) >= 2:
+        return args[0], args[1]
+    return kwargs["partition_key"], kwargs["row_key"]
+
+
+class TableClient:
+    """
+    Sync client for one SQLite table. Same methods and errors as
+    azure.data.tables.TableClient, for the calls this app makes.
+    """
+
+    def __init__(self, database, table_name):
+        if not _TABLE_NAME.match(table_name):
+            raise ValueError(f"Invalid table name {table_name!r}")
+        self._db = database
+        self.table_name = table_name
+        database.ensure_table(table_name)
+
+    # statements on an open connection; also used inside transactions
+
+    def _select_one(self, conn, partition_key, row_key):
+        return conn.execute(
+            f'SELECT PartitionKey, RowKey, Properties, Types, ETag, Timestamp FROM "{self.table_name}" '
+            "WHERE PartitionKey = ? AND RowKey = ?",
+            (partition_key, row_key),
+        ).fetchone()
+
+    def _missing_or_modified(self, conn, partition_key, row_key):
+        if self._select_one(conn, partition_key, row_key) is None:
+            return _not_found()
+        return _modified()
+
+    def _create(self, conn, entity):
+        properties, types = _encode(entity)
+        etag = _new_etag()
+        try:
+            conn.execute(
+                f'INSERT INTO "{self.table_name}" (PartitionKey, RowKey, Properties, Types, ETag, Timestamp) '
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (entity["PartitionKey"], entity["RowKey"], json.dumps(properties), json.dumps(types), etag, _now()),
+            )
+        except sqlite3.IntegrityError:
+            raise _error(ResourceExistsError, "The specified entity already exists.", TableErrorCode.ENTITY_ALREADY_EXISTS)
+        return {"etag": etag}
+
+    def _upsert(self, conn, entity, mode="merge"):
+        properties, types = _encode(entity)
+        etag = _new_etag()
+        if _mode(mode) == "merge":
+            # json_patch merges the new properties into the stored ones; the
+            # null entries drop stale Types for properties that are no
+            # longer datetimes
+            types_patch = {name: types.get(name) for name in properties}
+            on_conflict = (
+                "Properties = json_patch(Properties, excluded.Properties), "
+                "Types = json_patch(Types, ?), "
+            )
+            extra = [json.dumps(types_patch)]
+        else:
+            on_conflict = "Properties = excluded.Properties, Types = excluded.Types, "
+            extra = []
+        conn.execute(
+            f'INSERT INTO "{self.table_name}" (PartitionKey, RowKey, Properties, Types, ETag, Timestamp) '
+            "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (PartitionKey, RowKey) DO UPDATE SET "
+            f"{on_conflict}ETag = excluded.ETag, Timestamp = excluded.Timestamp",
+            [entity["PartitionKey"], entity["RowKey"], json.dumps(properties), json.dumps(types), etag, _now()] + extra,
+        )
+        return {"etag": etag}
+
+    def _update(self, conn, entity, mode="merge", etag=None, match_condition=None):
+        properties, types = _encode(entity)
+        new_etag = _new_etag()
+        if _mode(mode) == "merge":
+            types_patch = {name: types.get(name) for name in properties}
+            assignments = "Properties = json_patch(Properties, ?), Types = json_patch(Types, ?)"
+            params = [json.dumps(properties), json.dumps(types_patch)]
+        else:
+            assignments = "Properties = ?, Types = ?"
+            params = [json.dumps(properties), json.dumps(types)]
+        sql = (
+            f'UPDATE "{self.table_name}" SET {assignments}, ETag = ?, Timestamp = ? '
+            "WHERE PartitionKey = ? AND RowKey = ?"
+        )
+        params += [new_etag, _now(), entity["PartitionKey"], entity["RowKey"]]
+        if match_condition == MatchConditions.IfNotModified and etag:
+            sql += " AND ETag = ?"
+            params.append(etag)
+        if conn.execute(sql, params).rowcount == 0:
+            raise self._missing_or_modified(conn, entity["PartitionKey"], entity["RowKey"])
+        return {"etag": new_etag}
+
+    def _delete(self, conn, partition_key, row_key, etag=None, match_condition=None, missing_ok=True):
+        sql = f'DELETE FROM "{self.table_name}" WHERE PartitionKey = ? AND RowKey = ?'
+        params = [partition_key, row_key]
+        if match_condition == MatchConditions.IfNotModified and etag:
+            sql += " AND ETag = ?"
+            params.append(etag)
+        if conn.execute(sql, params).rowcount == 0:
+            error = self._missing_or_modified(conn, partition_key, row_key)
+            if isinstance(error, ResourceNotFoundError) and missing_ok:
+                return
+            raise error
+
+    def _write(self, operation, *args, **kwargs):
+        self._db._stats["statements"] += 1
+        with self._db.connection() as conn:
+            return getattr(self, f"_{operation}")(conn, *args, **kwargs)
+
+    def _page(self, query, start, page_size, select):
+        sql, params = query.sql(self.table_name, start, page_size + 1)
+        rows = self._db.execute(sql, params)
+        next_token = None
+        if len(rows) > page_size:
+            next_token = {"PartitionKey": rows[page_size][0], "RowKey": rows[page_size][1]}
+            rows = rows[:page_size]
+        return [_decode(row, select) for row in rows], next_token
+
+    def _pager(self, query, results_per_page, select):
+        page_size = _page_size(results_per_page)
+
+        def get_next(token=None):
+            return self._page(query, _start(token), page_size, select)
+
+        def extract_data(response):
+            entities, next_token = response
+            return next_token, entities
+
+        return ItemPaged(get_next, extract_data)
+
+    # TableClient interface
+
+    def query_entities(self, query_filter, *, parameters=None, select=None, results_per_page=None, **kwargs):
+        return self._pager(Query(query_filter, parameters), results_per_page, select)
+
+    def list_entities(self, *, select=None, results_per_page=None, **kwargs):
+        return self._pager(Query(), results_per_page, select)
+
+    def get_entity(self, partition_key, row_key, *, select=None, **kwargs):
+        with self._db.connection() as conn:
+            row = self._select_one(conn, partition_key, row_key)
+        if row is None:
+            raise _not_found()
+        return _decode(row, select)
+
+    def create_entity(self, entity, **kwargs):
+        return self._write("create", entity)
+
+    def upsert_entity(self, entity, mode="merge", **kwargs):
+        return self._write("upsert", entity, mode=mode)
+
+    def update_entity(self, entity, mode="merge", *, etag=None, match_condition=None, **kwargs):
+        return self._write("update", entity, mode=mode, etag=etag, match_condition=match_condition)
+
+    def delete_entity(self, *args, etag=None, match_condition=None, **kwargs):
+        partition_key, row_key = _delete_keys(args, kwargs)
+        self._write("delete", partition_key, row_key, etag=etag, match_condition=match_condition)
+
+    def submit_transaction(self, operations, **kwargs):
+        """Up to 100 operations on one partition, all or none."""
+        operations = list(operations)
+        if not operations:
+            return []
+        if len(operations) > MAX_BATCH_SIZE:
+            raise ValueError(f"A transaction can hold at most {MAX_BATCH_SIZE} operations")
+        if len({op[1]["PartitionKey"] for op in operations}) != 1:
+            raise _error(
+                TableTransactionError,
+                "0:All operations in a transaction must share a PartitionKey.",
+                TableErrorCode.COMMAND_DISALLOWED,
+            )
+
+        self._db._stats["statements"] += 1
+        with self._db.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            results = []
+            for index, operation in enumerate(operations):
+                kind = str(getattr(operation[0], "value", operation[0])).lower()
+                entity = operation[1]
+                options = operation[2] if len(operation) > 2 else {}
+                # callers share option dicts between kinds, e.g. {"mode": ...} on a delete
+                condition = {name: options[name] for name in ("etag", "match_condition") if name in options}
+                try:
+                    if kind == "create":
+                        results.append(self._create(conn, entity))
+                    elif kind == "upsert":
+                        results.append(self._upsert(conn, entity, mode=options.get("mode", "merge")))
+                    elif kind == "update":
+                        results.append(self._update(conn, entity, mode=options.get("mode", "merge"), **condition))
+                    elif kind == "delete":
+                        self._delete(conn, entity["PartitionKey"], entity["RowKey"], missing_ok=False, **condition)
+                        results.append({})
+                    else:
+                        raise ValueError(f"Unknown transaction operation {kind}")
+                except (ResourceExistsError, ResourceNotFoundError, ResourceModifiedError) as e:
+                    conn.rollback()
+                    raise _error(
+                        TableTransactionError,
+                        f"{index}:{e.message}",
+                        getattr(e, "error_code", None) or TableErrorCode.UPDATE_CONDITION_NOT_SATISFIED,
+                    )
+                except (KeyError, TypeError, ValueError) as e:
+                    # a malformed operation fails the transaction, as the service would
+                    conn.rollback()
+                    raise _error(TableTransactionError, f"{index}:{e}", TableErrorCode.INVALID_INPUT)
+            conn.commit()
+        return results
+
+
+class AsyncTableClient:
+    """aio twin of TableClient; the SQLite calls run in worker threads."""
+
+    def __init__(self, client):
+        self._client = client
+        self.table_name = client.table_name
+
+    async def _call(self, function, *args, **kwargs):
+        """One round trip to the sync client."""
+        return await asyncio.to_thread(function, *args, **kwargs)
+
+    def _pager(self, query, results_per_page, select):
+        page_size = _page_size(results_per_page)
+
+        async def get_next(token=None):
+            return await self._call(self._client._page, query, _start(token), page_size, select)
+
+        async def extract_data(response):
+            entities, next_token = response
+            return next_token, entities
+
+        return AsyncItemPaged(get_next, extract_data)
+
+    def query_entities(self, query_filter, *, parameters=None, select=None, results_per_page=None, **kwargs):
+        return self._pager(Query(query_filter, parameters), results_per_page, select)
+
+    def list_entities(self, *, select=None, results_per_page=None, **kwargs):
+        return self._pager(Query(), results_per_page, select)
+
+    async def get_entity(self, partition_key, row_key, *, select=None, **kwargs):
+        return await self._call(self._client.get_entity, partition_key, row_key, select=select)
+
+    async def create_entity(self, entity, **kwargs):
+        return await self._call(self._client.create_entity, entity)
+
+    async def upsert_entity(self, entity, mode="merge", **kwargs):
+        return await self._call(self._client.upsert_entity, entity, mode=mode)
+
+    async def update_entity(self, entity, mode="merge", *, etag=None, match_condition=None, **kwargs):
+        return await self._call(
+            self._client.update_entity, entity, mode=mode, etag=etag, match_condition=match_condition
+        )
+
+    async def delete_entity(self, *args, etag=None, match_condition=None, **kwargs):
+        partition_key, row_key = _delete_keys(args, kwargs)
+        await self._call(
+            self._client.delete_entity, partition_key, row_key, etag=etag, match_condition=match_condition
+        )
+
+    async def submit_transaction(self, operations, **kwargs):
+        return await self._call(self._client.submit_transaction, list(operations))
+
+
+# --- queues -----------------------------------------------------------------------
+
+
+class QueueClient:
+    """send_message for one queue, stored in the _QueueMessages table."""
+
+    def __init__(self, database, queue_name):
+        self._db = database
+        self.queue_name = queue_name
+        database.ensure_queue_table()
+
+    def send_message(self, content, **kwargs):
+        inserted_on = _now()
+        with self._db.connection() as conn:
+            cursor = conn.execute(
+                f'INSERT INTO "{QUEUE_TABLE}" (Queue, Content, InsertedOn) VALUES (?, ?, ?)',
+                (self.queue_name, content, inserted_on),
+            )
+        return {"id": str(cursor.lastrowid), "content": content, "inserted_on": _parse_datetime(inserted_on)}
+
+
+class AsyncQueueClient:
+    def __init__(self, client):
+        self._client = client
+        self.queue_name = client.queue_name
+
+    async def _call(self, function, *args, **kwargs):
+        return await asyncio.to_thread(function, *args, **kwargs)
+
+    async def send_message(self, content, **kwargs):
+        return await self._call(self._client.send_message, content)
+
+
+def get_table_client(table_name):
+    return TableClient(get_database(), table_name)
+
+
+def get_queue_client(queue_name):
+    return QueueClient(get_database(), queue_name)
@@ -0,0 +1,107 @@
+import importlib
+import logging
+import sys
+import threading
+import time
+
+# Cold start bookkeeping for this worker process.
+#
+# The storage SDKs, requests and aiohttp are only imported when a client
+# is first built (storage.py, aio_storage.py use deferred_import), so
+# loading a function module is cheap and a request pays only for the
+# clients it uses. This module records where the start-up time goes:
+#
+#   imports    first-time cost of each deferred import, milliseconds
+#   functions  per function: when its module finished loading and how
+#              long its first invocation took (metrics.instrument reports
+#              both), counted from the first shared_code import
+#
+# The Warmup function runs warm_imports() so that new instances take the
+# import cost before they get traffic. MetricsApi returns snapshot().
+
+# what a request may import on first use, in dependency order
+DEFERRED_IMPORTS = (
+    "azure.core.pipeline.transport",
+    "requests",
+    "azure.data.tables",
+    "azure.storage.queue",
+    "aiohttp",
+    "azure.data.tables.aio",
+    "azure.storage.queue.aio",
+)
+
+_started = time.perf_counter()
+_lock = threading.Lock()
+_imports = {}
+_functions = {}
+_warmup = {}
+
+
+def _since_start_ms():
+    return round((time.perf_counter() - _started) * 1000, 1)
+
+
+def deferred_import(name):
+    """importlib.import_module(name), recording what it cost the first time."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    elapsed = round((time.perf_counter() - start) * 1000, 1)
+    with _lock:
+        _imports.setdefault(name, elapsed)
+    logging.info(f"Deferred import of {name} took {elapsed} ms")
+    return module
+
+
+def warm_imports(names=DEFERRED_IMPORTS):
+    """Import names (default: everything deferred) now. Returns {module: ms} of this call."""
+    costs = {}
+    for name in names:
+        start = time.perf_counter()
+        try:
+            deferred_import(name)
+        except ImportError as e:
+            logging.warning(f"Warmup could not import {name}: {e}")
+            continue
+        costs[name] = round((time.perf_counter() - start) * 1000, 1)
+    return costs
+
+
+def loaded(function):
+    """A function module finished loading."""
+    with _lock:
+        _functions.setdefault(function, {})["loaded_at_ms"] = _since_start_ms()
+
+
+def first_call(function, seconds):
+    """
+    Record the first invocation of a function in this process.
+    Returns True only for that first call.
+    """
+    with _lock:
+        entry = _functions.setdefault(function, {})
+        if "first_call_ms" in entry:
+            return False
+        entry["first_call_ms"] = round(seconds * 1000, 1)
+        entry["first_call_at_ms"] = _since_start_ms()
+    return True
+
+
+def record_warmup(steps):
+    """Durations (ms) of the Warmup function's steps."""
+    with _lock:
+        _warmup.clear()
+        _warmup.update(steps)
+        _warmup["finished_at_ms"] = _since_start_ms()
+
+
+def snapshot():
+    with _lock:
+        return {
+            "imports": dict(_imports),
+            "imports_total_ms": round(sum(_imports.values()), 1),
+            "functions": {name: dict(entry) for name, entry in sorted(_functions.items())},
+            "warmup": dict(_warmup) or None,
+        }
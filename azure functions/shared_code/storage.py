@@ -0,0 +1,152 @@
+import logging
+import os
+import threading
+
+from shared_code import metrics, startup
+
+# One pool of storage clients per worker process. Building a
+# TableServiceClient parses the connection string and sets up a new HTTP
+# session, so we do it once and hand out the same clients to every request.
+#
+# STORAGE_BACKEND picks what the clients talk to: "azure" (Table / Queue
+# Storage, the default) or "sqlite" (the embedded engine in
+# sqlite_tables.py, with secondary indexes). Both hand out clients with the
+# same methods, so the functions don't know which one they run on.
+#
+# The SDKs (and requests) are imported when the first client is built, not
+# with this module: a function that never touches a queue doesn't load
+# azure.storage.queue, and the SQLite backend loads neither.
+
+CONNECTION_SETTING = "AzureWebJobsStorage"
+BACKEND = os.environ.get("STORAGE_BACKEND", "azure").lower()
+POOL_MAXSIZE = int(os.environ.get("STORAGE_POOL_MAXSIZE", "32"))
+
+_lock = threading.Lock()
+_transport = None
+_service = None
+_tables = {}
+_created = set()
+_queues = {}
+# own lock for the counters: the pool lock can be held through a table
+# creation round trip, and a hit must not wait for that
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def get_connection_string():
+    connection_string = os.environ.get(CONNECTION_SETTING)
+    if not connection_string:
+        raise RuntimeError(f"Missing {CONNECTION_SETTING} setting")
+    return connection_string
+
+
+def _get_transport():
+    """Shared keep-alive HTTP transport. Caller must hold _lock."""
+    global _transport
+    if _transport is None:
+        requests = startup.deferred_import("requests")
+        transport = startup.deferred_import("azure.core.pipeline.transport")
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=POOL_MAXSIZE, pool_maxsize=POOL_MAXSIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _transport = transport.RequestsTransport(session=session, session_owner=False)
+    return _transport
+
+
+def _get_service():
+    """Shared TableServiceClient. Caller must hold _lock."""
+    global _service
+    if _service is None:
+        tables = startup.deferred_import("azure.data.tables")
+        _service = tables.TableServiceClient.from_connection_string(
+            conn_str=get_connection_string(),
+            transport=_get_transport(),
+        )
+    return _service
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def _sqlite():
+    return startup.deferred_import("shared_code.sqlite_tables")
+
+
+@metrics.timed("client")
+def get_table_client(table_name, create=False):
+    """
+    Return the pooled TableClient for table_name, creating it on first use.
+
+    create=True also creates the table in the storage account (once per
+    worker). Used for the index tables this app maintains itself.
+    """
+    client = _tables.get(table_name)
+    if client is not None and (not create or table_name in _created):
+        _count("hits")
+        return client
+
+    with _lock:
+        if create and table_name not in _created:
+            # SQLite tables are created with their client
+            if BACKEND != "sqlite":
+                _get_service().create_table_if_not_exists(table_name=table_name)
+            _created.add(table_name)
+        client = _tables.get(table_name)
+        if client is None:
+            _count("misses")
+            if BACKEND == "sqlite":
+                client = _sqlite().get_table_client(table_name)
+            else:
+                client = _get_service().get_table_client(table_name=table_name)
+            _tables[table_name] = client
+            logging.info(f"Storage pool miss: created table client for {table_name}")
+        else:
+            _count("hits")
+    return client
+
+
+@metrics.timed("client")
+def get_queue_client(queue_name):
+    """Return the pooled QueueClient for queue_name, creating it on first use."""
+    client = _queues.get(queue_name)
+    if client is not None:
+        _count("hits")
+        return client
+
+    with _lock:
+        client = _queues.get(queue_name)
+        if client is None:
+            _count("misses")
+            if BACKEND == "sqlite":
+                client = _sqlite().get_queue_client(queue_name)
+            else:
+                queues = startup.deferred_import("azure.storage.queue")
+                client = queues.QueueClient.from_connection_string(
+                    conn_str=get_connection_string(),
+                    queue_name=queue_name,
+                    transport=_get_transport(),
+                )
+            _queues[queue_name] = client
+            logging.info(f"Storage pool miss: created queue client for {queue_name}")
+        else:
+            _count("hits")
+    return client
+
+
+def get_pool_stats():
+    """Hit / miss counters for the client pool of this worker."""
+    with _stats_lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+    stats = {
+        "backend": BACKEND,
+        "hits": hits,
+        "misses": misses,
+        "tables": sorted(_tables),
+        "queues": sorted(_queues),
+    }
+    if BACKEND == "sqlite":
+        stats["sqlite"] = _sqlite().get_database().get_stats()
+    return stats
@@ -0,0 +1,55 @@
+import json
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+# Handlers run on the SQLite backend against a throwaway database, so the
+# tests need no Azure account or Azurite. The settings are read when the
+# shared_code modules are imported, hence before anything else.
+_DIRECTORY = tempfile.mkdtemp(prefix="functions-tests-")
+os.environ["STORAGE_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(_DIRECTORY, "storage.sqlite3")
+os.environ.setdefault("AREAS", "North,East,West")
+os.environ["ASYNC_STORAGE"] = "0"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import azure.functions as func  # noqa: E402
+
+
+def request(method, params=None, body=None, route_params=None):
+    return func.HttpRequest(
+        method=method,
+        url="/api/test",
+        params=params or {},
+        route_params=route_params or {},
+        body=json.dumps(body).encode("utf-8") if body is not None else b"",
+    )
+
+
+def read_json(response):
+    return json.loads(response.get_body())
+
+
+@pytest.fixture
+def new_id():
+    """Ids unique to the test: every test shares one database."""
+    def make(prefix):
+        return f"{prefix}{uuid.uuid4().hex[:10]}"
+    return make
+
+
+@pytest.fixture
+def fresh_backfills():
+    """Let the one-off backfills run again, as on a worker that never ran them."""
+    from shared_code import customer_orders, pending_orders
+
+    pending_orders._backfilled = False
+    pending_orders.get_table_client().delete_entity(
+        partition_key=pending_orders.META_PARTITION, row_key=pending_orders.BACKFILL_MARKER
+    )
+    customer_orders._backfilled.clear()
+    yield
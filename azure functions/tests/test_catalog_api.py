@@ -0,0 +1,63 @@
+from conftest import read_json, request
+
+import CatalogApi
+import MenuApi
+import RestaurantApi
+from shared_code import catalog
+
+
+def get(area, version=None):
+    params = {"area": area}
+    if version:
+        params["version"] = version
+    return CatalogApi.handle_get(request("GET", params))
+
+
+def menus(area):
+    response = get(area)
+    assert response.status_code == 200
+    body = read_json(response)
+    return body["version"], {r["restaurantId"]: [d["dishId"] for d in r["menu"]] for r in body["restaurants"]}
+
+
+def add_restaurant(new_id, area):
+    restaurant_id = new_id("R")
+    response = RestaurantApi.handle_post(request("POST", body={"area": area, "restaurantId": restaurant_id, "name": "Cafe"}))
+    assert response.status_code == 200
+    return restaurant_id
+
+
+def test_dish_moving_between_restaurants_updates_both_menus(new_id):
+    first, second = add_restaurant(new_id, "East"), add_restaurant(new_id, "East")
+    dish_id = new_id("D")
+    MenuApi.handle_post(request("POST", body={
+        "area": "East", "dishId": dish_id, "name": "Soup", "price": 5, "restaurantId": first,
+    }))
+    version, before = menus("East")
+    assert before[first] == [dish_id]
+
+    response = MenuApi.handle_put(request("PUT", body={"dishId": dish_id, "restaurantId": second}))
+    assert response.status_code == 200
+    new_version, after = menus("East")
+    assert new_version != version
+    assert (after[first], after[second]) == ([], [dish_id])
+
+
+def test_current_version_is_answered_from_the_marker(new_id, monkeypatch):
+    add_restaurant(new_id, "West")
+    version, _ = menus("West")
+
+    def no_rows(area):
+        raise AssertionError("snapshot rows read for a current version")
+
+    monkeypatch.setattr(catalog, "get_snapshot", no_rows)
+    response = get("West", version)
+    assert response.status_code == 304
+    assert response.headers["X-Catalog-Version"] == version
+
+
+def test_unknown_area_is_empty():
+    response = get("Atlantis")
+    assert response.status_code == 200
+    assert read_json(response)["restaurants"] == []
+    assert get("Atlantis", read_json(response)["version"]).status_code == 304
@@ -0,0 +1,42 @@
+from conftest import request
+
+import MenuApi
+import OrderApi
+from shared_code import dish_index
+
+
+def post_order(new_id, dish_id, area="North"):
+    return OrderApi.handle_post(request("POST", body={
+        "area": "North", "orderId": new_id("O"), "customerId": new_id("C"),
+        "dishesOrdered": [{"dishId": dish_id, "area": area}],
+    })).status_code
+
+
+def test_unknown_dishes_are_read_once(new_id, monkeypatch):
+    fetches = []
+    fetch = dish_index._fetch
+    monkeypatch.setattr(dish_index, "_fetch", lambda ids, areas=None: fetches.append(ids) or fetch(ids, areas))
+    dish_id = new_id("D")
+
+    assert post_order(new_id, dish_id) == 400
+    # the North hint, then every area
+    assert fetches == [[dish_id], [dish_id]]
+    assert post_order(new_id, dish_id) == 400
+    assert post_order(new_id, dish_id, area="West") == 400
+    assert len(fetches) == 2
+
+    # created by this worker: known right away
+    MenuApi.handle_post(request("POST", body={"area": "East", "dishId": dish_id, "name": "Tea", "price": 2}))
+    assert post_order(new_id, dish_id) == 200
+
+
+def test_unknown_ids_are_forgotten_on_reload(new_id, monkeypatch):
+    dish_id = new_id("D")
+    assert dish_index.get_many([dish_id]) == {}
+    MenuApi.get_table_client().upsert_entity(
+        entity={"PartitionKey": "West", "RowKey": dish_id, "Name": "Pie", "Price": 3}
+    )
+    assert dish_index.get_many([dish_id]) == {}
+
+    monkeypatch.setattr(dish_index, "_loaded_at", None)
+    assert dish_index.get_many([dish_id])[dish_id]["area"] == "West"
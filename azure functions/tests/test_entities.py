@@ -0,0 +1,22 @@
+import itertools
+
+from shared_code import entities
+
+
+def test_order_id_falls_back_to_row_key():
+    order = {"PartitionKey": "North", "RowKey": "O1", "OrderID": "", "DishesOrdered": '["D1"]'}
+    result = entities.order_to_json(order)
+    assert (result["orderId"], result["area"], result["status"]) == ("O1", "North", None)
+
+
+def test_projection_keeps_the_requested_order():
+    dish = {"PartitionKey": "North", "RowKey": "D1", "Name": "Soup", "Price": 5}
+    assert list(entities.DISH.project(["price", "dishId"])(dish).items()) == [("price", 5), ("dishId", "D1")]
+    assert entities.DISH.project([]) is entities.dish_to_json
+
+
+def test_projection_cache_is_bounded():
+    mapper = entities.Mapper(entities.DISH_FIELDS)
+    for fields in itertools.islice(itertools.permutations(entities.DISH_FIELDS, 3), 500):
+        mapper.project(list(fields))
+    assert mapper._projections.cache_info().currsize == entities.MAX_PROJECTIONS
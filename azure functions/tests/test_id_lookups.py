@@ -0,0 +1,61 @@
+import time
+
+from conftest import read_json, request
+
+import CustomerApi
+import MenuApi
+from shared_code import fanout, lookup, storage
+
+
+def no_fanout(*args, **kwargs):
+    raise AssertionError("id lookup queried every area")
+
+
+def test_get_by_id_reads_one_partition(new_id, monkeypatch):
+    dish_id = new_id("D")
+    MenuApi.handle_post(request("POST", body={"area": "East", "dishId": dish_id, "name": "Tea", "price": 2}))
+    monkeypatch.setattr(fanout, "query_pages", no_fanout)
+
+    response = MenuApi.handle_get(request("GET", {"dishId": dish_id}))
+    assert [dish["area"] for dish in read_json(response)] == ["East"]
+
+
+def test_get_by_unknown_id_is_empty(new_id):
+    assert read_json(MenuApi.handle_get(request("GET", {"dishId": new_id("D")}))) == []
+
+
+def test_get_by_id_finds_rows_written_before_the_lookup(new_id):
+    customer_id = new_id("C")
+    storage.get_table_client("CustomerTable").upsert_entity(
+        entity={"PartitionKey": "West", "RowKey": customer_id, "Name": "Ann"}
+    )
+
+    response = CustomerApi.handle_get(request("GET", {"customerId": customer_id}))
+    assert [customer["name"] for customer in read_json(response)] == ["Ann"]
+    assert lookup.resolve("CustomerTable", customer_id)["Area"] == "West"
+
+
+def test_ordered_listing_reads_a_bounded_number_of_pages_ahead(monkeypatch):
+    table = storage.get_table_client("FanoutPages")
+    for area in ("North", "East", "West"):
+        for i in range(30):
+            table.upsert_entity(entity={"PartitionKey": area, "RowKey": f"{i:03d}"})
+    pages = []
+    page_of = table._page
+
+    def counted(*args):
+        pages.append(1)
+        return page_of(*args)
+
+    monkeypatch.setattr(table, "_page", counted)
+    listing = fanout.query_pages(table, ordered=True, results_per_page=2)
+
+    first = next(listing)
+    assert [e["PartitionKey"] for e in first] == ["East", "East"]
+    time.sleep(0.3)
+    # 15 pages per area; each stops PREFETCH_PAGES queued pages plus one
+    # waiting to be queued ahead of the caller (plus one empty page per gap range)
+    assert len(pages) <= 3 * (fanout.PREFETCH_PAGES + 2) + 4
+
+    rest = [e["RowKey"] for page in listing for e in page]
+    assert len(rest) == 88
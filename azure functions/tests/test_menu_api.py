@@ -0,0 +1,49 @@
+from conftest import request
+
+import MenuApi
+from shared_code import fanout, lookup
+
+
+def add_dish(new_id):
+    dish_id = new_id("D")
+    response = MenuApi.handle_post(request("POST", body={
+        "area": "North", "dishId": dish_id, "name": "Soup", "price": 5, "restaurantId": new_id("R"),
+    }))
+    assert response.status_code == 200
+    return dish_id
+
+
+def delete(body):
+    return MenuApi.handle_delete(request("DELETE", body=body)).status_code
+
+
+def test_delete_of_a_missing_dish_is_not_found(new_id):
+    dish_id = add_dish(new_id)
+
+    assert delete({"dishId": dish_id}) == 200
+    assert delete({"dishId": dish_id}) == 404
+    assert delete({"dishId": dish_id, "area": "North"}) == 404
+    assert delete({"dishId": new_id("D"), "area": "East"}) == 404
+
+
+def test_delete_drops_a_lookup_row_that_outlived_the_dish(new_id):
+    dish_id = add_dish(new_id)
+    MenuApi.get_table_client().delete_entity(partition_key="North", row_key=dish_id)
+
+    assert delete({"dishId": dish_id}) == 404
+    assert lookup.resolve("MenuTable", dish_id) is None
+
+
+def test_unknown_ids_are_scanned_for_once(new_id, monkeypatch):
+    scans = []
+    query_entities = fanout.query_entities
+    monkeypatch.setattr(fanout, "query_entities", lambda *a, **kw: scans.append(1) or query_entities(*a, **kw))
+    dish_id = new_id("D")
+
+    assert delete({"dishId": dish_id}) == 404
+    assert delete({"dishId": dish_id}) == 404
+    assert len(scans) == 1
+
+    # a dish created in the meantime is found through the lookup row
+    MenuApi.handle_post(request("POST", body={"area": "West", "dishId": dish_id, "name": "Tea", "price": 2}))
+    assert delete({"dishId": dish_id}) == 200
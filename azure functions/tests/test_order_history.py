@@ -0,0 +1,63 @@
+from conftest import read_json, request
+
+import OrderApi
+import OrderStatusUpdater
+from shared_code import customer_orders, lookup, storage
+
+
+def history(customer_id):
+    response = OrderApi.handle_get(request("GET", {"customerId": customer_id}))
+    assert response.status_code == 200
+    return {order["orderId"]: order for order in read_json(response)}
+
+
+def test_backfilled_history_follows_put_and_delivery(new_id, fresh_backfills):
+    orders = storage.get_table_client("OrderTable")
+    customer_id, order_id = new_id("C"), new_id("O")
+    # written before the history index existed: no HistoryKey, no lookup row
+    orders.upsert_entity(entity={
+        "PartitionKey": "North",
+        "RowKey": order_id,
+        "OrderID": order_id,
+        "CustomerID": customer_id,
+        "DishesOrdered": "[]",
+        "EstimatedTime": 0,
+        "TotalCost": "10.00€",
+        "Status": "Pending",
+    })
+
+    assert history(customer_id)[order_id]["status"] == "Pending"
+    key = orders.get_entity(partition_key="North", row_key=order_id)["HistoryKey"]
+    ref = lookup.resolve("OrderTable", order_id)
+    assert (ref["HistoryKey"], ref["CustomerID"]) == (key, customer_id)
+
+    response = OrderApi.handle_put(request("PUT", body={"orderId": order_id, "totalCost": "12.00€"}))
+    assert response.status_code == 200
+    assert history(customer_id)[order_id]["totalCost"] == "12.00€"
+
+    OrderStatusUpdater.main(None)
+    assert orders.get_entity(partition_key="North", row_key=order_id)["Status"] == "delivered"
+    assert history(customer_id)[order_id]["status"] == "delivered"
+
+
+def test_backfill_rerun_does_not_copy_orders_again(new_id, fresh_backfills):
+    orders = storage.get_table_client("OrderTable")
+    customer_id, order_id = new_id("C"), new_id("O")
+    orders.upsert_entity(entity={
+        "PartitionKey": "East",
+        "RowKey": order_id,
+        "CustomerID": customer_id,
+        "Status": "delivered",
+    })
+
+    customer_orders.ensure_backfilled(orders, customer_id)
+    # the order changes (new Timestamp), then the marker row is lost
+    orders.update_entity(entity={"PartitionKey": "East", "RowKey": order_id, "TotalCost": "9.00€"}, mode="merge")
+    customer_orders._backfilled.clear()
+    customer_orders.get_table_client().delete_entity(partition_key=customer_id, row_key=customer_orders.BACKFILL_MARKER)
+    customer_orders.ensure_backfilled(orders, customer_id)
+
+    rows = customer_orders.get_table_client().query_entities(
+        query_filter=f"PartitionKey eq '{customer_id}' and RowKey lt '~'"
+    )
+    assert len(list(rows)) == 1
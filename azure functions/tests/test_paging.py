@@ -0,0 +1,28 @@
+from conftest import read_json, request
+
+import RestaurantApi
+from shared_code import paging
+
+
+def test_default_limit_pages_listings_without_a_limit(new_id, monkeypatch):
+    area = new_id("Area")
+    for _ in range(3):
+        RestaurantApi.handle_post(request("POST", body={"area": area, "restaurantId": new_id("R"), "name": "Cafe"}))
+    monkeypatch.setattr(paging, "DEFAULT_LIMIT", 2)
+
+    first = RestaurantApi.handle_get(request("GET", {"area": area}))
+    token = first.headers[paging.TOKEN_HEADER]
+    second = RestaurantApi.handle_get(request("GET", {"area": area, "continuationToken": token}))
+
+    assert [len(read_json(first)), len(read_json(second))] == [2, 1]
+    assert paging.TOKEN_HEADER not in second.headers
+
+
+def test_without_default_limit_everything_comes_at_once(new_id):
+    area = new_id("Area")
+    for _ in range(3):
+        RestaurantApi.handle_post(request("POST", body={"area": area, "restaurantId": new_id("R"), "name": "Cafe"}))
+
+    response = RestaurantApi.handle_get(request("GET", {"area": area}))
+    assert len(read_json(response)) == 3
+    assert paging.TOKEN_HEADER not in response.headers
@@ -0,0 +1,73 @@
+from conftest import request
+
+import MenuApi
+import OrderApi
+import OrderStatusUpdater
+from shared_code import lookup, pending_orders, storage
+
+
+def place_order(new_id):
+    dish_id, order_id = new_id("D"), new_id("O")
+    response = MenuApi.handle_post(request("POST", body={
+        "area": "North", "dishId": dish_id, "name": "Soup", "price": 5, "restaurantId": new_id("R"),
+    }))
+    assert response.status_code == 200
+    response = OrderApi.handle_post(request("POST", body={
+        "area": "North", "orderId": order_id, "customerId": new_id("C"), "dishesOrdered": [dish_id],
+    }))
+    assert response.status_code == 200
+    # due right away
+    put(order_id, estimatedTime=0)
+    return order_id
+
+
+def put(order_id, **changes):
+    response = OrderApi.handle_put(request("PUT", body=dict(changes, orderId=order_id)))
+    assert response.status_code == 200
+
+
+def status(order_id):
+    return storage.get_table_client("OrderTable").get_entity(partition_key="North", row_key=order_id)["Status"]
+
+
+def test_delivered_order_put_back_to_pending_is_delivered_again(new_id):
+    order_id = place_order(new_id)
+
+    OrderStatusUpdater.main(None)
+    assert status(order_id) == "delivered"
+    assert lookup.resolve("OrderTable", order_id)["DueBucket"] == ""
+
+    put(order_id, status="Pending")
+    bucket = lookup.resolve("OrderTable", order_id)["DueBucket"]
+    assert bucket and pending_orders.is_scheduled(bucket, order_id)
+
+    OrderStatusUpdater.main(None)
+    assert status(order_id) == "delivered"
+
+
+def test_put_ignores_a_stale_due_bucket(new_id):
+    order_id = place_order(new_id)
+    OrderStatusUpdater.main(None)
+    # a lookup row written before the updater cleared DueBucket
+    stale = lookup.resolve("OrderTable", order_id)
+    lookup.remember("OrderTable", order_id, stale["Area"], DueBucket="202001010000")
+
+    put(order_id, status="pending")
+    bucket = lookup.resolve("OrderTable", order_id)["DueBucket"]
+    assert bucket != "202001010000" and pending_orders.is_scheduled(bucket, order_id)
+
+    OrderStatusUpdater.main(None)
+    assert status(order_id) == "delivered"
+
+
+def test_updater_leaves_orders_that_are_no_longer_pending(new_id):
+    order_id = place_order(new_id)
+    bucket = lookup.resolve("OrderTable", order_id)["DueBucket"]
+    # cancelled behind the index's back (half-finished PUT)
+    storage.get_table_client("OrderTable").update_entity(
+        entity={"PartitionKey": "North", "RowKey": order_id, "Status": "cancelled"}, mode="merge"
+    )
+
+    OrderStatusUpdater.main(None)
+    assert status(order_id) == "cancelled"
+    assert not pending_orders.is_scheduled(bucket, order_id)
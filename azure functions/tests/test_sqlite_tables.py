@@ -0,0 +1,66 @@
+import pytest
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceModifiedError
+from azure.data.tables import TableTransactionError
+
+from shared_code import odata, sqlite_tables
+
+
+@pytest.fixture
+def table():
+    client = sqlite_tables.TableClient(sqlite_tables.Database(sqlite_tables.MEMORY), "Orders")
+    for i in range(200):
+        client.create_entity({
+            "PartitionKey": ("North", "East")[i % 2],
+            "RowKey": f"O{i:04d}",
+            "CustomerID": f"C{i % 20}",
+            "RestaurantID": f"R{i % 10}",
+            "Price": i / 2,
+            "Status": ("pending", "delivered")[i % 2],
+        })
+    return client
+
+
+def plan(client, expression):
+    sql, params = sqlite_tables.Query(expression).sql(client.table_name, None, 1000)
+    rows = client._db.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+    return " / ".join(row[-1] for row in rows)
+
+
+@pytest.mark.parametrize("expression, column", [
+    (odata.eq("CustomerID", "C3"), "CustomerID"),
+    (odata.eq("Status", "pending"), "Status"),
+    (odata.compare("Price", "le", 5), "Price"),
+    (odata.all_of(odata.eq("PartitionKey", "North"), odata.eq("CustomerID", "C4")), "CustomerID"),
+    (odata.all_of(odata.eq("PartitionKey", "North"), odata.eq("RestaurantID", "R2")), "RestaurantID"),
+    (odata.all_of(odata.eq("PartitionKey", "North"), odata.compare("Price", "le", 5)), "Price"),
+])
+def test_property_filters_use_their_index(table, expression, column):
+    assert f"USING INDEX Orders_{column}" in plan(table, expression)
+
+
+def test_filters_on_other_columns_scan_in_key_order(table):
+    assert "USING INDEX" not in plan(table, odata.eq("Name", "x"))
+    assert "TEMP B-TREE" not in plan(table, odata.eq("Name", "x"))
+
+
+def test_indexed_query_pages_in_key_order(table):
+    pages = table.query_entities(odata.eq("CustomerID", "C3"), results_per_page=4).by_page()
+    keys = [(e["PartitionKey"], e["RowKey"]) for page in pages for e in page]
+    assert keys == sorted(keys) and len(keys) == 10
+
+
+def test_failed_transaction_changes_nothing(table):
+    stale = table.get_entity("North", "O0000").metadata["etag"]
+    table.update_entity({"PartitionKey": "North", "RowKey": "O0000", "Status": "delivered"})
+
+    with pytest.raises(TableTransactionError) as raised:
+        table.submit_transaction([
+            ("upsert", {"PartitionKey": "North", "RowKey": "O9999"}),
+            ("update", {"PartitionKey": "North", "RowKey": "O0000", "Status": "x"},
+             {"etag": stale, "match_condition": MatchConditions.IfNotModified}),
+        ])
+    assert str(raised.value.message).startswith("1:")
+    assert len(list(table.query_entities(odata.eq("RowKey", "O9999")))) == 0
+    with pytest.raises(ResourceModifiedError):
+        table.delete_entity("North", "O0000", etag=stale, match_condition=MatchConditions.IfNotModified)
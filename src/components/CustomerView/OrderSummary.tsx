@@ -99,7 +99,8 @@ export function OrderSummary({ customer, cart, onBack, onClearCart, onUpdateQuan
     try {
       const res = await fetch(`${API_BASE}/orderapi`, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        // retries of the same order get the first response instead of a second write
+        headers: { 'Content-Type': 'application/json', 'Idempotency-Key': newOrder.orderId },
         body: JSON.stringify({
           area: newOrder.area,
           orderId: newOrder.orderId,
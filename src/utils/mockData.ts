@@ -11,18 +11,28 @@ async function handleJsonResponse<T>(res: Response): Promise<T> {
   return res.json() as Promise<T>;
 }
 
+// every page of a listing: follows X-Continuation-Token, which the API
+// sends when the server pages listings (PAGING_DEFAULT_LIMIT)
+async function fetchAllPages<T>(url: string): Promise<T[]> {
+  const items: T[] = [];
+  let next: string | null = url;
+  while (next) {
+    const res = await fetch(next);
+    items.push(...((await handleJsonResponse<T[]>(res)) ?? []));
+    const token = res.headers.get('X-Continuation-Token');
+    next = token ? `${url}?continuationToken=${encodeURIComponent(token)}` : null;
+  }
+  return items;
+}
+
 export async function initializeMockData() {
   try {
-    const [restaurantsRes, mealsRes, customersRes] = await Promise.all([
-      fetch(`${API_BASE}/restaurantapi`),
-      fetch(`${API_BASE}/menuapi`),
-      fetch(`${API_BASE}/customerapi`)
+    const [restaurantsRaw, mealsRaw, customers] = await Promise.all([
+      fetchAllPages<any>(`${API_BASE}/restaurantapi`),
+      fetchAllPages<any>(`${API_BASE}/menuapi`),
+      fetchAllPages<Customer>(`${API_BASE}/customerapi`)
     ]);
 
-    const restaurantsRaw = await handleJsonResponse<any[]>(restaurantsRes);
-    const mealsRaw = await handleJsonResponse<any[]>(mealsRes);
-    const customers = await handleJsonResponse<Customer[]>(customersRes);
-
     const restaurants: Restaurant[] = (restaurantsRaw ?? []).map(r => ({
       area: r.area,
       restaurantId: r.restaurantId,